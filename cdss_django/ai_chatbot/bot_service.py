@@ -145,4 +145,53 @@ def generate_text_from_prompt(prompt_text):
     except Exception as e:
         print(f"🔴 (Report Gen) Gemini API로 텍스트 생성 중 심각한 오류 발생: {e}")
         error_message = "오류: AI와 통신 중 오류가 발생했습니다."
-        return error_message
\ No newline at end of file
+        return error_message
+
+def stream_text_from_prompt(prompt_text):
+    """
+    generate_text_from_prompt의 스트리밍 버전입니다.
+    생성되는 텍스트 조각을 차례로 yield하며, 실패 시 '오류:'로 시작하는 조각 하나를 yield하고 종료합니다.
+    """
+    if not GEMINI_API_KEY_VALID or not chat_model:
+        print("🚫 (Report Gen) Gemini API가 설정되지 않아 텍스트 생성을 사용할 수 없습니다.")
+        yield "오류: AI 서비스가 현재 API 키 문제로 사용 불가능합니다."
+        return
+
+    try:
+        print(f"📄 새로운 스트리밍 텍스트 생성 요청 수신...")
+        response = chat_model.generate_content(prompt_text, stream=True)
+
+        produced = False
+        for chunk in response:
+            if chunk.parts:
+                text = "".join(part.text for part in chunk.parts if hasattr(part, 'text'))
+                if text:
+                    produced = True
+                    yield text
+            elif chunk.prompt_feedback and chunk.prompt_feedback.block_reason:
+                block_reason = chunk.prompt_feedback.block_reason
+                print(f"⚠️ (Report Gen) Gemini 요청 차단됨: {block_reason}")
+                yield f"오류: 요청이 안전 문제로 차단되었습니다 (이유: {block_reason})."
+                return
+
+        if not produced:
+            print(f"⚠️ (Report Gen) Gemini로부터 비어있는 응답")
+            yield "오류: AI로부터 비어있는 응답을 받았습니다."
+
+    except Exception as e:
+        print(f"🔴 (Report Gen) Gemini API로 스트리밍 텍스트 생성 중 심각한 오류 발생: {e}")
+        yield "오류: AI와 통신 중 오류가 발생했습니다."
+
+
+class TextGenerationClient:
+    """
+    단발성 텍스트 생성 클라이언트 (보고서 생성용).
+    generate(prompt) -> str, stream(prompt) -> 텍스트 조각 iterator.
+    뷰에 주입해 사용하며, 테스트에서는 같은 인터페이스의 로컬 스텁으로 교체합니다.
+    """
+
+    def generate(self, prompt_text):
+        return generate_text_from_prompt(prompt_text)
+
+    def stream(self, prompt_text):
+        return stream_text_from_prompt(prompt_text)
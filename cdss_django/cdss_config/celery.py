@@ -1,5 +1,8 @@
+import gc
+import logging
 import os
 from celery import Celery
+from celery.signals import worker_init
 from django.conf import settings
 
 # Django의 settings 모듈을 Celery의 기본으로 설정합니다.
@@ -14,6 +17,28 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Django INSTALLED_APPS에 등록된 모든 앱의 tasks.py 파일을 자동으로 로드합니다.
 app.autodiscover_tasks()
 
+logger = logging.getLogger(__name__)
+
+
+@worker_init.connect
+def preload_omics_models(**kwargs):
+    """
+    prefork 워커가 자식 프로세스를 만들기 전에 부모 프로세스에서 오믹스 모델을 한 번 로드합니다.
+    자식들은 fork로 모델 메모리를 copy-on-write로 공유하며, 로드 후 gc.freeze()로 GC가 모델 객체를
+    건드려 공유 페이지가 복사되는 것을 줄입니다. (로드 실패 시 각 Task가 처음 실행될 때 다시 시도)
+    """
+    try:
+        from omics.prediction_service import model_registry
+        model_set = model_registry.load()
+        logger.info(f"Omics model set v{model_set.version} preloaded in worker parent process (pid {os.getpid()}).")
+    except Exception as e:
+        logger.error(f"Omics model preload failed in worker parent process: {e}", exc_info=True)
+        return
+    if hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
@@ -229,6 +229,62 @@ CACHES = {
 # ML 모델이 저장된 디렉토리 경로
 ML_MODELS_DIR = BASE_DIR / 'ml_models'
 
+# 임상 예측 모델 레지스트리 설정
+# 모델은 처음 사용할 때 로드되며, 로드된 모델의 총 메모리가 한도를 넘으면 가장 오래 쓰지 않은 모델부터 언로드합니다.
+CLINICAL_PREDICTION_MODEL_CACHE_MB = 2048
+# export_clinical_model_artifacts로 내보낸 모델 아티팩트 경로 (원본 pkl 버전별 디렉토리)
+CLINICAL_PREDICTION_ARTIFACT_DIR = BASE_DIR / 'clinical_prediction' / 'artifacts'
+# 아티팩트 내보내기 시 전역 순열 중요도 계산에 사용할 참조 샘플(DB 코호트) 최대 크기
+CLINICAL_PREDICTION_REFERENCE_SAMPLE_SIZE = 500
+# 프로세스 시작 시 미리 로드할 모델 목록 ('암종:예측유형'). 예: ['liver:risk', 'liver:treatment']
+CLINICAL_PREDICTION_WARMUP_MODELS = []
+# 임상 예측 캐시 (용량 기반 제거는 Redis maxmemory 정책(allkeys-lru 등)을 따릅니다)
+CLINICAL_PREDICTION_CACHE_ALIAS = 'default'
+# XAI(SHAP) 설명: (모델 버전, 인코딩된 특성 벡터 해시) 단위로 저장
+CLINICAL_PREDICTION_XAI_CACHE_TTL = 60 * 60 * 24  # 초
+# 통합 예측 결과: (환자, 임상 데이터 리비전, 모델 버전) 단위로 저장, 임상 데이터 저장 시 자동 삭제
+CLINICAL_PREDICTION_RESULT_CACHE_TTL = 60 * 60 * 24 * 7  # 초
+# 생존 곡선 평가용 공통 시간 격자 (응답에 포함되는 곡선의 간격/최대 기간, 일 단위)
+CLINICAL_PREDICTION_SURVIVAL_CURVE_STEP_DAYS = 30
+CLINICAL_PREDICTION_SURVIVAL_CURVE_HORIZON_DAYS = 3650
+# 치료 모델이 없을 때 사용하는 가이드라인 규칙 파일 (버전 관리되는 JSON)
+CLINICAL_PREDICTION_GUIDELINE_RULES = BASE_DIR / 'clinical_prediction' / 'data' / 'treatment_guidelines.json'
+# 단건 예측 마이크로 배칭: 동시 요청을 최대 대기 시간(ms) 또는 최대 행 수까지 모아 한 번에 추론 (0이면 비활성화)
+CLINICAL_PREDICTION_MICRO_BATCH_WINDOW_MS = 5
+CLINICAL_PREDICTION_MICRO_BATCH_MAX_ROWS = 32
+# 통합 예측 시 생존/위험도/치료 효과 모델을 동시에 실행하는 스레드 수와 모델별 제한 시간(초)
+CLINICAL_PREDICTION_MAX_WORKERS = 6
+CLINICAL_PREDICTION_MODEL_TIMEOUT = 30
+CLINICAL_PREDICTION_MODEL_TIMEOUTS = {'survival': 30, 'risk': 15, 'treatment': 15}
+# 종합 보고서 캐시 TTL (CT/오믹스/임상 원본 결과가 같으면 AI를 다시 호출하지 않음)
+CLINICAL_PREDICTION_REPORT_CACHE_TTL = 60 * 60 * 24 * 7  # 초
+# 위험도/치료 트리 모델 컴파일 추론 백엔드 ('onnx' 또는 None, onnxruntime/skl2onnx/onnxmltools가 없으면 원본 모델 사용)
+CLINICAL_PREDICTION_COMPILED_BACKEND = 'onnx'
+CLINICAL_PREDICTION_COMPILED_TOLERANCE = 1e-4  # 로드 시 원본 predict_proba와 비교하는 최대 허용 오차
+# 섀도 모델(PredictionModelInfo.is_shadow) 백그라운드 실행 및 비교 로그 설정
+CLINICAL_PREDICTION_SHADOW_ENABLED = True
+CLINICAL_PREDICTION_SHADOW_LOG_DIR = BASE_DIR / 'clinical_prediction' / 'shadow_logs'
+CLINICAL_PREDICTION_SHADOW_QUEUE_SIZE = 1000  # 가득 차면 새 섀도 작업은 버림 (요청 지연 없음)
+CLINICAL_PREDICTION_SHADOW_FLUSH_ROWS = 256  # npz 파일 하나에 기록할 행 수
+CLINICAL_PREDICTION_SHADOW_CONFIG_TTL = 60  # 섀도 모델 설정을 DB에서 다시 읽는 주기 (초)
+CLINICAL_PREDICTION_SHADOW_RETRY_SECONDS = 300  # 로드에 실패한 섀도 모델 파일을 다시 로드해 보는 주기 (초)
+
+# 오믹스 2단계 전문가 모델: 5개 폴드를 병렬 실행하는 공유 스레드 수와 병렬 실행을 시작하는 최소 샘플 수
+OMICS_FOLD_ENSEMBLE_THREADS = 5
+OMICS_FOLD_ENSEMBLE_PARALLEL_MIN_ROWS = 2
+# 오믹스 일괄 분석: True면 분석 시작 시 요청을 QUEUED로 두고, 대기 시간(초) 뒤 배치 Task가 최대 OMICS_BATCH_SIZE개씩 모아 행렬 단위로 추론
+OMICS_BATCH_SCORING = False
+OMICS_BATCH_SIZE = 64
+OMICS_BATCH_WINDOW_SECONDS = 5
+# 결과 그래프 이미지 렌더링 Task를 보낼 큐 (저우선 전용 워커를 둘 때 지정, None이면 기본 큐)
+OMICS_GRAPH_TASK_QUEUE = None
+# 오믹스 모델 로드: False면 웹 프로세스 등은 첫 분석 때 로드 (Celery 워커는 설정과 무관하게 fork 전 부모 프로세스에서 로드)
+OMICS_LOAD_MODELS_ON_STARTUP = True
+# 모델 파일 변경 확인 주기 (초): 바뀌면 처리 중인 분석을 막지 않고 백그라운드에서 새 모델 세트로 교체 (None이면 확인 안 함)
+OMICS_MODEL_RELOAD_CHECK_SECONDS = 60
+# 업로드된 RNA-seq/miRNA/메틸화 파일을 한 번에 읽는 행 수 (모델이 쓰는 특성만 남기며 스트리밍)
+OMICS_PARSE_CHUNK_ROWS = 100_000
+
 # 오믹스 AI 모델별 필수 파일 요구사항 정의
 OMICS_MODEL_REQUIREMENTS = {
     'ovarian_cancer': {
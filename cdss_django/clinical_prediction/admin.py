@@ -61,11 +61,11 @@ class ClinicalPredictionResultAdmin(admin.ModelAdmin):
 class PredictionModelInfoAdmin(admin.ModelAdmin):
     list_display = [
         'model_name', 'cancer_type', 'prediction_type', 'version', 
-        'accuracy', 'is_active', 'training_date'
+        'accuracy', 'is_active', 'is_shadow', 'training_date'
     ]
-    list_filter = ['cancer_type', 'prediction_type', 'is_active', 'training_date']
+    list_filter = ['cancer_type', 'prediction_type', 'is_active', 'is_shadow', 'training_date']
     search_fields = ['model_name', 'description']
-    list_editable = ['is_active']
+    list_editable = ['is_active', 'is_shadow']
     
     fieldsets = (
         ('모델 정보', {
@@ -78,7 +78,7 @@ class PredictionModelInfoAdmin(admin.ModelAdmin):
             'fields': ('accuracy', 'training_date')
         }),
         ('상태', {
-            'fields': ('is_active', 'description')
+            'fields': ('is_active', 'is_shadow', 'description')
         })
     )
 
@@ -1,4 +1,6 @@
 from django.apps import AppConfig
+from django.conf import settings
+import threading
 
 class ClinicalPredictionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
@@ -6,11 +8,19 @@ class ClinicalPredictionConfig(AppConfig):
     verbose_name = '임상 예측 분석'
     
     def ready(self):
-        """앱 초기화 시 모델 로드"""
+        """앱 초기화 시 배포 설정에 지정된 모델만 백그라운드에서 워밍업 (나머지는 첫 사용 시 로드)"""
+        import clinical_prediction.signals  # 임상 데이터 변경 시 예측 캐시 무효화
+        
+        warmup_models = getattr(settings, 'CLINICAL_PREDICTION_WARMUP_MODELS', [])
+        if not warmup_models:
+            return
         try:
             from .services.prediction_service import prediction_service
-            # 모델 로드 확인
-            if prediction_service.models:
-                print("임상 예측 모델이 성공적으로 로드되었습니다.")
+            threading.Thread(
+                target=prediction_service.warm_up,
+                args=(warmup_models,),
+                name='clinical-prediction-warmup',
+                daemon=True
+            ).start()
         except Exception as e:
-            print(f"임상 예측 모델 로드 실패: {e}")
+            print(f"임상 예측 모델 워밍업 실패: {e}")
@@ -0,0 +1,216 @@
+# clinical_prediction/benchmarks.py
+"""
+임상 예측 성능 벤치마크 (합성 코호트 기반).
+
+benchmark_clinical_predictions 관리 명령에서 사용하며, 결과는 커밋 간 비교할 수 있도록 JSON으로 저장합니다.
+"""
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+from django.apps import apps
+from django.test.utils import override_settings
+
+from .data.patient_clinical_data import PATIENT_CLINICAL_DATA
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:  # psutil이 없으면 시나리오별 최대 RSS는 기록하지 않음
+    psutil = None
+
+# 벤치마크 중에는 결과/XAI 캐시를 끄고 항상 실제 계산 경로를 측정
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def build_synthetic_cohort(service, cancer_type, size, seed=0):
+    """
+    cancer_fields의 필드 목록과 샘플 환자 레코드(patient_clinical_data.py)의 값 분포로
+    저장하지 않은 ClinicalData 인스턴스 size개를 생성 (고정 시드로 재현 가능).
+    """
+    ClinicalData = apps.get_model('patients', 'ClinicalData')
+    model_fields = {field.name: field for field in ClinicalData._meta.concrete_fields}
+    rng = np.random.default_rng(seed)
+    samples = list(PATIENT_CLINICAL_DATA.values())
+    defaults = service.cancer_defaults.get(cancer_type, {})
+
+    pools = {}
+    for field_name in service.cancer_fields[cancer_type]:
+        if field_name not in model_fields or field_name in defaults:
+            continue
+        observed = [record[field_name] for record in samples if record.get(field_name) is not None]
+        if not observed:
+            continue
+        if model_fields[field_name].get_internal_type() in ('IntegerField', 'FloatField', 'PositiveIntegerField'):
+            values = np.asarray(observed, dtype=np.float64)
+            pools[field_name] = ('numeric', values, values.std())
+        else:
+            pools[field_name] = ('categorical', sorted(set(map(str, observed))))
+
+    cohort = []
+    for index in range(size):
+        values = {name: value for name, value in defaults.items() if name in model_fields}
+        for field_name, pool in pools.items():
+            if pool[0] == 'numeric':
+                # 관측값 하나를 뽑아 관측 표준편차만큼 흔들기 (연도처럼 범위가 좁은 값도 현실적으로 유지)
+                values[field_name] = int(max(0, rng.choice(pool[1]) + rng.normal(0, pool[2])))
+            else:
+                values[field_name] = pool[1][rng.integers(len(pool[1]))]
+        if values.get('vital_status') != 'Dead':
+            values['days_to_death'] = None
+        cohort.append(ClinicalData(pk=index + 1, cancer_type=cancer_type, **values))
+    return cohort
+
+
+class _RssSampler:
+    """
+    with 블록 동안 백그라운드 스레드에서 RSS를 주기적으로 읽어 시나리오별 최대 RSS를 기록.
+    ru_maxrss는 프로세스 누적 최대값이라 어느 경로에서 메모리가 늘었는지 구분할 수 없음
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_bytes = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if psutil is not None:
+            self._process = psutil.Process(os.getpid())
+            self.peak_bytes = self._process.memory_info().rss
+            self._thread = threading.Thread(target=self._sample, name='benchmark-rss-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak_bytes = max(self.peak_bytes, self._process.memory_info().rss)
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, self._process.memory_info().rss)
+
+    @property
+    def peak_mb(self):
+        return round(self.peak_bytes / (1024 * 1024), 1) if self.peak_bytes is not None else None
+
+
+def _peak_rss_mb():
+    """프로세스 시작 이후 최대 RSS (누적값이라 보고서 전체에 한 번만 기록, 시나리오별 값은 _RssSampler)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def _summarize(latencies, rows):
+    latencies_ms = np.asarray(latencies, dtype=np.float64) * 1000
+    total_seconds = latencies_ms.sum() / 1000
+    return {
+        'calls': len(latencies_ms),
+        'rows': rows,
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+        'mean_ms': round(float(latencies_ms.mean()), 3),
+        'throughput_rows_per_s': round(rows / total_seconds, 1) if total_seconds > 0 else None,
+    }
+
+
+def _measure(fn, calls, rows_per_call=1):
+    latencies = []
+    with _RssSampler() as rss:
+        for call in calls:
+            started = time.perf_counter()
+            fn(call)
+            latencies.append(time.perf_counter() - started)
+    summary = _summarize(latencies, len(latencies) * rows_per_call)
+    summary['peak_rss_mb'] = rss.peak_mb
+    return summary
+
+
+def benchmark_cancer_type(service, cancer_type, cohort, repeats=3):
+    """암종 하나에 대해 단건/일괄 예측, XAI, predict_all 측정"""
+    # 첫 호출의 모델 로드 시간이 지연 시간에 섞이지 않도록 미리 로드
+    service.warm_up([(cancer_type, prediction_type) for prediction_type in service.model_paths[cancer_type]])
+
+    results = {}
+    scenarios = {
+        'single_survival': lambda cd: service._predict_survival_for(cd, cancer_type),
+        'single_risk': lambda cd: service._predict_risk_for(cd, cancer_type),
+        'single_treatment': lambda cd: service._predict_treatment_for(cd, cancer_type),
+        'predict_all': lambda cd: service._run_all_predictions(cd, cancer_type),
+    }
+    for name, fn in scenarios.items():
+        try:
+            results[name] = _measure(fn, cohort)
+        except Exception as e:
+            results[name] = {'error': str(e)}
+
+    for name, method_name in (('batch_survival', '_predict_survival_group'),
+                              ('batch_risk', '_predict_risk_group'),
+                              ('batch_treatment', '_predict_treatment_group')):
+        try:
+            method = getattr(service, method_name)
+            results[name] = _measure(lambda _: method(cohort, cancer_type), range(repeats), rows_per_call=len(cohort))
+        except Exception as e:
+            results[name] = {'error': str(e)}
+
+    for prediction_type in ('risk', 'treatment'):
+        name = f"xai_{prediction_type}"
+        try:
+            model_info = service._get_model_info(cancer_type, prediction_type)
+            if not model_info:
+                raise ValueError(f"{cancer_type} {prediction_type} 모델이 없습니다.")
+            frames = [
+                service._preprocess_patient_data_for_model(cd, cancer_type, prediction_type)
+                for cd in cohort
+            ]
+            results[name] = _measure(
+                lambda frame: service._generate_xai_explanation(model_info, frame, cancer_type, prediction_type),
+                frames
+            )
+        except Exception as e:
+            results[name] = {'error': str(e)}
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(service, cancer_types=None, size=100, repeats=3, seed=0):
+    """전체 벤치마크 실행 후 JSON으로 저장할 결과 dict 반환"""
+    cancer_types = cancer_types or list(service.model_paths)
+    report = {
+        'git_revision': _git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cohort_size': size,
+        'repeats': repeats,
+        'seed': seed,
+        'results': {},
+    }
+    # 합성 예측이 실제 섀도 비교 로그(report_shadow_scoring)에 섞이지 않도록 섀도 실행도 끔
+    with override_settings(CACHES=NO_CACHE, CLINICAL_PREDICTION_SHADOW_ENABLED=False):
+        for cancer_type in cancer_types:
+            cohort = build_synthetic_cohort(service, cancer_type, size, seed=seed)
+            logger.info(f"벤치마크 시작: {cancer_type} ({len(cohort)}명)")
+            report['results'][cancer_type] = benchmark_cancer_type(service, cancer_type, cohort, repeats=repeats)
+    report['peak_rss_mb'] = _peak_rss_mb()
+    return report
@@ -0,0 +1,42 @@
+# clinical_prediction/management/commands/benchmark_clinical_predictions.py
+import json
+
+from django.core.management.base import BaseCommand
+from clinical_prediction.services import prediction_service
+from clinical_prediction.benchmarks import run_benchmarks
+
+class Command(BaseCommand):
+    help = '합성 코호트로 임상 예측 지연 시간(p50/p95)/처리량/최대 RSS를 측정해 JSON으로 저장'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cancer-type', action='append', dest='cancer_types',
+                            help='측정할 암종 (여러 번 지정 가능, 기본: 전체)')
+        parser.add_argument('--size', type=int, default=100, help='암종별 합성 환자 수')
+        parser.add_argument('--repeats', type=int, default=3, help='일괄 예측 반복 횟수')
+        parser.add_argument('--seed', type=int, default=0, help='합성 코호트 생성 시드')
+        parser.add_argument('--output', default='clinical_prediction_benchmark.json', help='결과 JSON 경로')
+
+    def handle(self, *args, **options):
+        report = run_benchmarks(
+            prediction_service,
+            cancer_types=options['cancer_types'],
+            size=options['size'],
+            repeats=options['repeats'],
+            seed=options['seed']
+        )
+
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        for cancer_type, scenarios in report['results'].items():
+            self.stdout.write(f"[{cancer_type}]")
+            for name, result in scenarios.items():
+                if 'error' in result:
+                    self.stdout.write(self.style.WARNING(f"  {name}: 실패 - {result['error']}"))
+                else:
+                    self.stdout.write(
+                        f"  {name}: p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+                        f"{result['throughput_rows_per_s']} rows/s, peak RSS {result['peak_rss_mb']}MB"
+                    )
+        self.stdout.write(f"process peak RSS {report['peak_rss_mb']}MB")
+        self.stdout.write(self.style.SUCCESS(f"결과 저장: {options['output']}"))
@@ -0,0 +1,51 @@
+# clinical_prediction/management/commands/export_clinical_model_artifacts.py
+from django.core.management.base import BaseCommand
+from clinical_prediction.services import prediction_service
+from clinical_prediction.services.model_artifacts import (
+    export_model_artifact, has_model_artifact, prune_model_artifacts
+)
+
+class Command(BaseCommand):
+    help = '임상 예측 pkl 모델을 전역 중요도/참조 샘플과 함께 버전별 아티팩트 디렉토리로 내보내기'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cancer-type', action='append', dest='cancer_types',
+                            help='내보낼 암종 (여러 번 지정 가능, 기본: 전체)')
+        parser.add_argument('--force', action='store_true', help='같은 버전의 아티팩트가 있어도 다시 내보내기')
+        parser.add_argument('--prune', action='store_true', help='현재 버전이 아닌 이전 아티팩트 삭제')
+        parser.add_argument('--reference-size', type=int, default=None,
+                            help='전역 순열 중요도 계산용 참조 샘플 크기 (기본: CLINICAL_PREDICTION_REFERENCE_SAMPLE_SIZE)')
+
+    def handle(self, *args, **options):
+        artifact_root = prediction_service._get_artifact_root()
+        cancer_types = options['cancer_types'] or list(prediction_service.model_paths)
+        self.stdout.write(f"아티팩트 경로: {artifact_root}")
+
+        for cancer_type in cancer_types:
+            for prediction_type, filename in prediction_service.model_paths.get(cancer_type, {}).items():
+                name = f"{cancer_type}_{prediction_type}"
+                version = prediction_service._get_model_version(cancer_type, prediction_type)
+                artifact_dir = prediction_service._get_artifact_dir(cancer_type, prediction_type)
+
+                if has_model_artifact(artifact_dir) and not options['force']:
+                    self.stdout.write(f"- {name}: 최신 아티팩트가 이미 있음 ({version})")
+                else:
+                    try:
+                        wrapper = prediction_service._read_model_file(cancer_type, prediction_type)
+                        reference_sample, importances = prediction_service._compute_reference_importances(
+                            wrapper, cancer_type, prediction_type, sample_size=options['reference_size']
+                        )
+                        if importances is not None:
+                            # 모델 버전별 전역 중요도와 계산에 쓴 참조 샘플을 아티팩트에 함께 저장
+                            wrapper['global_importances'] = importances
+                            wrapper['reference_sample'] = reference_sample
+                        export_model_artifact(wrapper, artifact_root, name, version, source_file=filename)
+                        detail = f"참조 샘플 {len(reference_sample)}건" if importances is not None else "전역 중요도 없음"
+                        self.stdout.write(self.style.SUCCESS(f"- {name}: 내보내기 완료 ({version}, {detail})"))
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f"- {name}: 내보내기 실패: {e}"))
+                        continue
+
+                if options['prune']:
+                    for removed in prune_model_artifacts(artifact_root, name, version):
+                        self.stdout.write(f"  이전 아티팩트 삭제: {removed}")
@@ -0,0 +1,26 @@
+# clinical_prediction/management/commands/rebuild_prediction_routes.py
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from clinical_prediction.services import prediction_service
+
+class Command(BaseCommand):
+    help = '환자 예측 라우팅(최신 임상 기록/암종/리비전) 재구축 (최초 배포 또는 시그널을 거치지 않은 일괄 변경 후)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patient-id', action='append', dest='patient_ids',
+                            help='재구축할 환자 OpenEMR ID (여러 번 지정 가능, 기본: 임상 데이터가 있는 전체 환자)')
+
+    def handle(self, *args, **options):
+        PatientProfile = apps.get_model('patients', 'PatientProfile')
+        queryset = PatientProfile.objects.all()
+        if options['patient_ids']:
+            queryset = queryset.filter(openemr_id__in=options['patient_ids'])
+        else:
+            queryset = queryset.filter(Q(clinical_data__isnull=False) | Q(liver_cancer_data__isnull=False))
+
+        refreshed = 0
+        for patient_pk in queryset.values_list('pk', flat=True).distinct().iterator():
+            if prediction_service.refresh_prediction_route(patient_pk) is not None:
+                refreshed += 1
+        self.stdout.write(self.style.SUCCESS(f"예측 라우팅 재구축 완료: {refreshed}명"))
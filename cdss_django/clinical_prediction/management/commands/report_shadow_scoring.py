@@ -0,0 +1,53 @@
+# clinical_prediction/management/commands/report_shadow_scoring.py
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from clinical_prediction.services import prediction_service
+from clinical_prediction.services.shadow_scoring import load_shadow_logs, summarize_shadow_log
+
+class Command(BaseCommand):
+    help = '섀도 모델 비교 로그로 운영/후보 모델의 일치도, 보정 변화(PSI), 모델별 지연시간 보고'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cancer-type', help='암종 (기본: 전체)')
+        parser.add_argument('--prediction-type', choices=['survival', 'risk', 'treatment'], help='예측 유형 (기본: 전체)')
+        parser.add_argument('--days', type=float, default=None, help='최근 N일 기록만 사용')
+        parser.add_argument('--log-dir', default=None, help='로그 경로 (기본: CLINICAL_PREDICTION_SHADOW_LOG_DIR)')
+        parser.add_argument('--output', default=None, help='결과 JSON 경로')
+
+    def handle(self, *args, **options):
+        log_dir = options['log_dir'] or prediction_service.shadow_scorer.log_dir
+        since = time.time() - options['days'] * 86400 if options['days'] else None
+        groups = load_shadow_logs(log_dir, options['cancer_type'], options['prediction_type'], since=since)
+        if not groups:
+            self.stdout.write(self.style.WARNING(f"섀도 비교 로그가 없습니다: {log_dir}"))
+            return
+
+        report = []
+        for (cancer_type, prediction_type, live_version, shadow_version), columns in sorted(groups.items()):
+            summary = summarize_shadow_log(columns)
+            report.append(dict(
+                cancer_type=cancer_type, prediction_type=prediction_type,
+                live_version=live_version, shadow_version=shadow_version, **summary
+            ))
+
+            self.stdout.write(f"[{cancer_type}:{prediction_type}] 운영 {live_version} vs 섀도 {shadow_version} ({summary['rows']}건)")
+            if 'error' in summary:
+                self.stdout.write(self.style.WARNING(f"  {summary['error']}"))
+            else:
+                agreement = summary.get('agreement', summary.get('correlation'))
+                label = '일치율' if 'agreement' in summary else '상관계수'
+                self.stdout.write(
+                    f"  {label} {agreement}, 평균 절대 차이 {summary['mean_abs_diff']}, PSI {summary['psi']}"
+                )
+            latency = summary['latency']
+            self.stdout.write(
+                f"  지연시간 p50/p95: 운영 {latency['live']['p50_ms']}/{latency['live']['p95_ms']}ms, "
+                f"섀도 {latency['shadow']['p50_ms']}/{latency['shadow']['p95_ms']}ms"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"결과 저장: {options['output']}"))
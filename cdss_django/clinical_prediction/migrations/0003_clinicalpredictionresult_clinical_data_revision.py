@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical_prediction', '0002_rename_clinical_pr_patient_b8c8c1_idx_clinical_pr_patient_6cc396_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinicalpredictionresult',
+            name='clinical_data_revision',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='임상 데이터 리비전'),
+        ),
+    ]
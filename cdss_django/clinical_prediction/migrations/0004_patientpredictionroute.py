@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical_prediction', '0003_clinicalpredictionresult_clinical_data_revision'),
+        ('patients', '0013_rename_linked_patient_flutterpatientprofile_linked_patient_profile_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientPredictionRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('openemr_id', models.CharField(db_index=True, max_length=100, verbose_name='OpenEMR 환자 ID')),
+                ('name_key', models.CharField(db_index=True, max_length=201, verbose_name='정규화된 환자명')),
+                ('cancer_type', models.CharField(blank=True, choices=[('liver', '간암 (LIHC)'), ('kidney', '신장암 (KIRC)'), ('stomach', '위암 (STAD)')], max_length=20, verbose_name='암종')),
+                ('clinical_data_revision', models.CharField(blank=True, max_length=64, verbose_name='임상 데이터 리비전')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='수정일시')),
+                ('clinical_data', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='patients.clinicaldata', verbose_name='최신 임상 데이터')),
+                ('liver_clinical_data', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='patients.livercancerclinicaldata', verbose_name='최신 간암 임상 데이터')),
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_route', to='patients.patientprofile', verbose_name='환자')),
+            ],
+            options={
+                'verbose_name': '환자 예측 라우팅',
+                'verbose_name_plural': '환자 예측 라우팅들',
+                'db_table': 'clinical_prediction_patient_routes',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical_prediction', '0004_patientpredictionroute'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionmodelinfo',
+            name='is_shadow',
+            field=models.BooleanField(default=False, help_text='운영 모델과 함께 백그라운드에서 실행해 결과만 기록 (응답에는 사용하지 않음)', verbose_name='섀도 모델'),
+        ),
+    ]
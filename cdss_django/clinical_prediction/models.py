@@ -26,6 +26,7 @@ class ClinicalPredictionResult(models.Model):
     prediction_result = models.JSONField(verbose_name='예측 결과')
     confidence_score = models.FloatField(default=0.0, verbose_name='신뢰도')
     model_version = models.CharField(max_length=50, default='v1.0', verbose_name='모델 버전')
+    clinical_data_revision = models.CharField(max_length=64, blank=True, db_index=True, verbose_name='임상 데이터 리비전')
     
     # 메타 정보
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='생성자')
@@ -75,6 +76,7 @@ class PredictionModelInfo(models.Model):
     accuracy = models.FloatField(null=True, blank=True, verbose_name='정확도')
     training_date = models.DateTimeField(null=True, blank=True, verbose_name='훈련일시')
     is_active = models.BooleanField(default=True, verbose_name='활성화')
+    is_shadow = models.BooleanField(default=False, verbose_name='섀도 모델', help_text='운영 모델과 함께 백그라운드에서 실행해 결과만 기록 (응답에는 사용하지 않음)')
     description = models.TextField(blank=True, verbose_name='설명')
     
     class Meta:
@@ -99,3 +101,34 @@ class PredictionAuditLog(models.Model):
         db_table = 'prediction_audit_log'
         verbose_name = '예측 감사 로그'
         verbose_name_plural = '예측 감사 로그들'
+
+
+class PatientPredictionRoute(models.Model):
+    """
+    환자별 예측 입력 라우팅 (환자 -> 최신 임상 기록, 암종, 리비전).
+    
+    patients 앱의 임상 데이터 저장/삭제 시그널로 갱신되는 비정규화 테이블로,
+    예측 요청은 openemr_id 또는 정규화된 이름 키로 인덱스 조회 한 번에 입력을 찾습니다.
+    (queryset.update()처럼 시그널을 거치지 않는 변경은 rebuild_prediction_routes 명령으로 재구축)
+    """
+    patient = models.OneToOneField('patients.PatientProfile', on_delete=models.CASCADE, related_name='prediction_route', verbose_name='환자')
+    openemr_id = models.CharField(max_length=100, db_index=True, verbose_name='OpenEMR 환자 ID')
+    name_key = models.CharField(max_length=201, db_index=True, verbose_name='정규화된 환자명')
+    clinical_data = models.ForeignKey('patients.ClinicalData', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='최신 임상 데이터')
+    liver_clinical_data = models.ForeignKey('patients.LiverCancerClinicalData', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='최신 간암 임상 데이터')
+    cancer_type = models.CharField(max_length=20, blank=True, choices=ClinicalPredictionResult.CANCER_TYPES, verbose_name='암종')
+    clinical_data_revision = models.CharField(max_length=64, blank=True, verbose_name='임상 데이터 리비전')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='수정일시')
+    
+    class Meta:
+        db_table = 'clinical_prediction_patient_routes'
+        verbose_name = '환자 예측 라우팅'
+        verbose_name_plural = '환자 예측 라우팅들'
+    
+    def __str__(self):
+        return f"{self.openemr_id} -> {self.cancer_type or '-'} ({self.clinical_data_revision or '-'})"
+    
+    @staticmethod
+    def normalize_name(name):
+        """이름 검색 키: 공백 정리 + 대소문자 무시"""
+        return ' '.join(str(name or '').split()).casefold()
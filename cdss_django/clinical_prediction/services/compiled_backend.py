@@ -0,0 +1,116 @@
+# clinical_prediction/services/compiled_backend.py
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime
+except ImportError:  # onnxruntime이 없으면 원본 모델(Python 래퍼)로 추론
+    onnxruntime = None
+
+try:
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+except ImportError:
+    convert_sklearn = None
+    FloatTensorType = None
+
+try:
+    import onnxmltools
+    from onnxmltools.convert.common.data_types import FloatTensorType as MLFloatTensorType
+except ImportError:
+    onnxmltools = None
+    MLFloatTensorType = None
+
+
+def is_available():
+    return onnxruntime is not None and (convert_sklearn is not None or onnxmltools is not None)
+
+
+def _to_onnx_bytes(model, n_features):
+    """트리 모델을 ONNX로 변환 (확률 출력은 ZipMap 없이 (행 수, 클래스 수) 텐서)"""
+    module = type(model).__module__
+    if module.startswith('xgboost'):
+        if onnxmltools is None:
+            raise ImportError('onnxmltools가 필요합니다.')
+        onnx_model = onnxmltools.convert_xgboost(
+            model, initial_types=[('input', MLFloatTensorType([None, n_features]))]
+        )
+    elif module.startswith('lightgbm'):
+        if onnxmltools is None:
+            raise ImportError('onnxmltools가 필요합니다.')
+        onnx_model = onnxmltools.convert_lightgbm(
+            model, initial_types=[('input', MLFloatTensorType([None, n_features]))], zipmap=False
+        )
+    elif module.startswith('sklearn'):
+        if convert_sklearn is None:
+            raise ImportError('skl2onnx가 필요합니다.')
+        onnx_model = convert_sklearn(
+            model, initial_types=[('input', FloatTensorType([None, n_features]))],
+            options={id(model): {'zipmap': False}}
+        )
+    else:
+        raise ValueError(f"지원하지 않는 모델 타입입니다: {type(model).__name__}")
+    return onnx_model.SerializeToString()
+
+
+class OnnxModel:
+    """ONNX Runtime 세션을 원본 모델과 같은 predict_proba 인터페이스로 감싼 모델"""
+
+    backend = 'onnx'
+
+    def __init__(self, onnx_bytes, n_features, source_type):
+        options = onnxruntime.SessionOptions()
+        # 단건 추론은 스레드 분할 비용이 더 크므로 세션당 1스레드 (동시성은 요청 스레드로 확보)
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(onnx_bytes, options, providers=['CPUExecutionProvider'])
+        self.n_features = n_features
+        self.source_type = source_type
+        self.input_name = self.session.get_inputs()[0].name
+
+        output_names = [output.name for output in self.session.get_outputs()]
+        probability_names = [name for name in output_names if 'prob' in name.lower()]
+        self.probability_name = probability_names[0] if probability_names else output_names[-1]
+
+    def predict_proba(self, X):
+        matrix = np.ascontiguousarray(X, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.n_features:
+            raise ValueError(f"입력 특성 수가 다릅니다: {matrix.shape} (기대 {self.n_features})")
+        return self.session.run([self.probability_name], {self.input_name: matrix})[0]
+
+
+def compile_model(model, reference_matrix, to_frame=None, tolerance=1e-4):
+    """
+    predict_proba를 지원하는 트리 모델을 ONNX Runtime 모델로 컴파일.
+
+    참조 행렬에서 원본 predict_proba와 비교해 최대 오차가 tolerance를 넘거나 변환에 실패하면
+    None을 반환하므로, 호출 측은 항상 원본 모델로 되돌아갈 수 있습니다.
+    """
+    if not is_available() or not hasattr(model, 'predict_proba'):
+        return None
+
+    reference_matrix = np.asarray(reference_matrix, dtype=np.float32)
+    n_features = int(getattr(model, 'n_features_in_', reference_matrix.shape[1]))
+    try:
+        compiled = OnnxModel(_to_onnx_bytes(model, n_features), n_features, type(model).__name__)
+        expected = np.asarray(model.predict_proba(to_frame(reference_matrix) if to_frame else reference_matrix))
+        actual = compiled.predict_proba(reference_matrix)
+    except Exception as e:
+        logger.warning(f"ONNX 컴파일 실패 ({type(model).__name__}), 원본 모델 사용: {e}")
+        return None
+
+    if actual.shape != expected.shape:
+        logger.warning(
+            f"ONNX 출력 형태가 원본과 다름 ({type(model).__name__}, {actual.shape} != {expected.shape}), 원본 모델 사용"
+        )
+        return None
+    max_error = float(np.max(np.abs(actual - expected))) if expected.size else 0.0
+    if max_error > tolerance:
+        logger.warning(
+            f"ONNX 결과가 원본과 다름 ({type(model).__name__}, 최대 오차 {max_error:.2e}), 원본 모델 사용"
+        )
+        return None
+    return compiled
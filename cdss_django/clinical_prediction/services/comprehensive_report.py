@@ -0,0 +1,156 @@
+# clinical_prediction/services/comprehensive_report.py
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+from omics.models import OmicsResult
+from diagnosis.models import DiagnosisResult
+from patients.models import LiverCancerClinicalData
+
+logger = logging.getLogger(__name__)
+
+# 프롬프트 양식을 바꾸면 올려서 이전 양식으로 생성된 캐시 보고서를 사용하지 않도록 함
+REPORT_PROMPT_VERSION = 2
+
+PROMPT_HEADER = """
+당신은 환자의 복잡한 의료 데이터를 분석하여 의사에게 제출할 종합 소견서를 작성하는 전문 의료 AI입니다.
+아래 제공된 CT 영상 분석, 다중 오믹스 분석, 임상 데이터를 바탕으로, 각 항목을 체계적으로 기술하고 최종적으로 명확한 요약 결론을 제시해주세요.
+의학적 근거에 기반하여 논리적이고 전문적인 어조로 작성해야 합니다. Markdown 형식을 사용하여 가독성을 높여주세요. (예: **제목**, - 항목)
+
+# 환자 정보
+- 환자 ID: {patient_id}
+"""
+PROMPT_FOOTER = "\n---\n## 종합 소견 및 요약\n위 정보를 바탕으로 상세한 종합 소견 및 요약 보고서를 작성해주세요."
+
+
+class ComprehensiveReportSources:
+    """종합 보고서의 원본 분석 결과 (최신 CT/오믹스/임상 기록)와 구조화된 섹션/프롬프트/리비전"""
+
+    def __init__(self, patient, omics=None, ct=None, clinical=None):
+        self.patient = patient
+        self.omics = omics
+        self.ct = ct
+        self.clinical = clinical
+
+    @classmethod
+    def load(cls, patient):
+        omics = OmicsResult.objects.filter(
+            request__patient_id=patient.pk, request__status='COMPLETED'
+        ).order_by('-last_updated').first()
+        ct = DiagnosisResult.objects.filter(
+            request__patient_id=patient.pk, request__status='COMPLETED'
+        ).order_by('-updated_at').first()
+        clinical = LiverCancerClinicalData.objects.filter(patient_id=patient.pk).order_by('-created_at').first()
+        return cls(patient, omics, ct, clinical)
+
+    @property
+    def has_data(self):
+        return any(source is not None for source in (self.omics, self.ct, self.clinical))
+
+    def revision(self):
+        """(원본 결과별 pk + 수정 시각) 해시 - 하나라도 바뀌면 보고서를 다시 생성"""
+        parts = [f"v{REPORT_PROMPT_VERSION}"]
+        for source, field in ((self.ct, 'updated_at'), (self.omics, 'last_updated'), (self.clinical, 'updated_at')):
+            timestamp = getattr(source, field, None) if source is not None else None
+            parts.append(f"{source.pk}:{timestamp.isoformat() if timestamp else ''}" if source is not None else '-')
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def sections(self):
+        """AI 소견 없이 바로 보여줄 수 있는 구조화된 CT/오믹스/임상 섹션"""
+        sections = {'patient': {'id': str(self.patient.pk), 'name': self.patient.name}, 'ct': None, 'omics': None, 'clinical': None}
+        if self.ct is not None:
+            sections['ct'] = {
+                'status': 'COMPLETED',
+                'result_summary': self.ct.result_summary,
+                'updated_at': self.ct.updated_at,
+            }
+        if self.omics is not None:
+            sections['omics'] = {
+                'binary_cancer_prediction': self.omics.binary_cancer_prediction,
+                'binary_cancer_probability': self.omics.binary_cancer_probability,
+                'predicted_cancer_type_name': self.omics.predicted_cancer_type_name,
+                'biomarkers': self.omics.biomarkers,
+                'updated_at': self.omics.last_updated,
+            }
+        if self.clinical is not None:
+            sections['clinical'] = {
+                'age_at_diagnosis': self.clinical.age_at_diagnosis,
+                'gender': self.patient.get_gender_display(),
+                'primary_diagnosis': self.clinical.primary_diagnosis,
+                'cancer_stage': self.clinical.cancer_stage,
+                'tumor_grade': self.clinical.tumor_grade,
+                'child_pugh_classification': self.clinical.child_pugh_classification,
+                'fibrosis_score': self.clinical.fibrosis_score,
+                'vital_status': self.clinical.vital_status,
+                'year_of_diagnosis': self.clinical.year_of_diagnosis,
+                'updated_at': self.clinical.updated_at,
+            }
+        return sections
+
+    def prompt(self):
+        data_parts = []
+        if self.ct is not None:
+            data_parts.append("""
+# CT 영상 분석 결과
+- 분석 상태: 완료
+- 소견: 시스템에서 3D 시각화 데이터 및 장기/종양 분할이 성공적으로 완료되었습니다.
+""")
+        if self.omics is not None:
+            probability = self.omics.binary_cancer_probability
+            data_parts.append(f"""
+# 다중 오믹스 분석 결과
+- 1차 암 여부 예측: **{'암(Cancer)' if self.omics.binary_cancer_prediction == 1 else '정상(Normal)'}** (암일 확률: {f'{probability:.2%}' if probability is not None else '알 수 없음'})
+- 2차 암종 식별: **{self.omics.predicted_cancer_type_name}**
+- 주요 바이오마커 기여도 (JSON 형식): {json.dumps(self.omics.biomarkers, indent=2, ensure_ascii=False)}
+""")
+        if self.clinical is not None:
+            clinical = self.sections()['clinical']
+            data_parts.append(f"""
+# 주요 임상 데이터 (간암)
+- 진단 시 나이: {clinical['age_at_diagnosis'] if clinical['age_at_diagnosis'] is not None else '알 수 없음'}세
+- 성별: {clinical['gender']}
+- 진단명: {clinical['primary_diagnosis']}
+- 병기: {clinical['cancer_stage'] or '알 수 없음'}
+- 종양 등급: {clinical['tumor_grade'] or '알 수 없음'}
+- Child-Pugh 등급: {clinical['child_pugh_classification'] or '알 수 없음'}
+- 섬유화 점수: {clinical['fibrosis_score'] or '알 수 없음'}
+""")
+        if not data_parts:
+            return None
+        return PROMPT_HEADER.format(patient_id=self.patient.pk) + "".join(data_parts) + PROMPT_FOOTER
+
+
+def _get_cache():
+    return caches[getattr(settings, 'CLINICAL_PREDICTION_CACHE_ALIAS', 'default')]
+
+
+def _report_cache_key(sources):
+    return f"comprehensive_report:{sources.patient.pk}:{sources.revision()}"
+
+
+def get_cached_report(sources):
+    """같은 원본 결과 리비전으로 생성된 보고서 (캐시 장애 시 None)"""
+    try:
+        return _get_cache().get(_report_cache_key(sources))
+    except Exception as e:
+        logger.warning(f"종합 보고서 캐시 조회 실패: {e}")
+        return None
+
+
+def cache_report(sources, report):
+    try:
+        _get_cache().set(
+            _report_cache_key(sources), report,
+            getattr(settings, 'CLINICAL_PREDICTION_REPORT_CACHE_TTL', 60 * 60 * 24 * 7)
+        )
+    except Exception as e:
+        logger.warning(f"종합 보고서 캐시 저장 실패: {e}")
+
+
+def sse_event(event, payload):
+    """server-sent event 한 건 (data는 JSON 한 줄)"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, cls=DjangoJSONEncoder)}\n\n"
@@ -0,0 +1,87 @@
+# clinical_prediction/services/feature_plan.py
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class FeaturePlan:
+    """
+    모델 한 개의 특성 인코딩 계획.
+
+    모델 로드 시 한 번만 컴파일되며, 특성 순서/기본값/LabelEncoder 조회 사전을 미리 계산해 둡니다.
+    encode()는 임상 레코드(dict) 목록을 float32 행렬 하나로 한 번에 변환합니다.
+    """
+
+    def __init__(self, feature_names, label_encoders=None, scaler=None, record_fields=(), default_for=None):
+        label_encoders = label_encoders or {}
+        record_fields = set(record_fields)
+
+        self.feature_names = list(feature_names)
+        self.scaler = scaler
+
+        # 레코드에 없는 특성은 요청과 무관하게 항상 같은 값이므로 미리 인코딩해 둠
+        self.constant_row = np.zeros(len(self.feature_names), dtype=np.float32)
+        self.categorical_columns = []  # (위치, 특성명, 조회 사전, 대체 코드)
+        self.numeric_positions = []
+        self.numeric_names = []
+
+        for position, feature_name in enumerate(self.feature_names):
+            encoder = label_encoders.get(feature_name)
+            lookup = None
+            if encoder is not None:
+                # LabelEncoder.transform([c]) == classes_ 내 위치
+                lookup = {str(cls): float(code) for code, cls in enumerate(encoder.classes_)}
+
+            if feature_name in record_fields:
+                if lookup is not None:
+                    # 결측치/새로운 카테고리는 첫 번째 클래스(코드 0)로 대체
+                    self.categorical_columns.append((position, feature_name, lookup, 0.0))
+                else:
+                    self.numeric_positions.append(position)
+                    self.numeric_names.append(feature_name)
+                continue
+
+            default_value = default_for(feature_name) if default_for else 0.0
+            if lookup is not None:
+                self.constant_row[position] = 0.0 if pd.isna(default_value) else lookup.get(str(default_value), 0.0)
+            else:
+                numeric_default = pd.to_numeric(default_value, errors='coerce')
+                self.constant_row[position] = 0.0 if pd.isna(numeric_default) else float(numeric_default)
+
+    def encode(self, records):
+        """임상 레코드 목록 -> (환자 수, 특성 수) float32 행렬"""
+        matrix = np.tile(self.constant_row, (len(records), 1))
+        if not records:
+            return matrix
+
+        for position, feature_name, lookup, fallback in self.categorical_columns:
+            # 레코드 값 그대로(object) 조회: DataFrame으로 만들면 결측치가 섞인 정수 열이 float64가 되어
+            # 65가 '65.0'으로 바뀌고 단건 인코딩과 다른 코드가 나옴
+            column = pd.Series([record.get(feature_name) for record in records], dtype=object)
+            codes = column.astype(str).map(lookup)
+            codes[column.isna()] = np.nan
+            matrix[:, position] = codes.fillna(fallback).to_numpy(dtype=np.float32)
+
+        if self.numeric_names:
+            frame = pd.DataFrame.from_records(records, columns=self.numeric_names)
+            numeric_block = frame.apply(pd.to_numeric, errors='coerce')
+            matrix[:, self.numeric_positions] = numeric_block.fillna(0.0).to_numpy(dtype=np.float32)
+
+        return self.scale(matrix)
+
+    def scale(self, matrix):
+        """인코딩된 행렬에 scaler 적용 (모델 입력 공간으로, scaler가 없거나 실패하면 그대로)"""
+        if self.scaler is not None:
+            try:
+                matrix = np.asarray(self.scaler.transform(matrix), dtype=np.float32)
+            except Exception as e:
+                logger.warning(f"Scaler 적용 실패: {e}")
+
+        return matrix
+
+    def to_frame(self, matrix):
+        """모델/XAI 코드가 기대하는 특성명 DataFrame으로 감싸기 (복사 없음)"""
+        return pd.DataFrame(matrix, columns=self.feature_names, copy=False)
@@ -0,0 +1,46 @@
+# clinical_prediction/services/global_importance.py
+import numpy as np
+
+
+def _model_output(model, frame):
+    if hasattr(model, 'predict_proba'):
+        output = np.asarray(model.predict_proba(frame), dtype=np.float64)
+    else:
+        output = np.asarray(model.predict(frame), dtype=np.float64)
+    return output.reshape(len(output), -1)
+
+
+def permutation_importances(model, matrix, feature_names, to_frame, n_repeats=5, random_state=0):
+    """
+    참조 샘플에서 특성 하나씩 섞었을 때 모델 출력(확률/예측값)이 평균적으로 얼마나 바뀌는지 계산.
+
+    정답 레이블 없이 모델 자신의 기준 예측과 비교하므로 배포된 모델만으로 계산할 수 있고,
+    시드를 고정해 워커/프로세스와 관계없이 항상 같은 결과를 냅니다.
+    반환값은 합이 1이 되도록 정규화한 {특성명: 중요도}입니다.
+    """
+    rng = np.random.default_rng(random_state)
+    matrix = np.array(matrix, dtype=np.float32)
+    baseline = _model_output(model, to_frame(matrix))
+
+    raw = np.zeros(len(feature_names), dtype=np.float64)
+    for position in range(len(feature_names)):
+        original = matrix[:, position].copy()
+        deltas = []
+        for _ in range(n_repeats):
+            matrix[:, position] = rng.permutation(original)
+            deltas.append(np.abs(_model_output(model, to_frame(matrix)) - baseline).mean())
+        matrix[:, position] = original
+        raw[position] = np.mean(deltas)
+
+    total = raw.sum()
+    if total > 0:
+        raw = raw / total
+    return {feature_name: float(value) for feature_name, value in zip(feature_names, raw)}
+
+
+def sample_reference_rows(matrix, sample_size, random_state=0):
+    """참조 샘플 크기를 넘으면 고정 시드로 행을 추출"""
+    if sample_size and len(matrix) > sample_size:
+        rng = np.random.default_rng(random_state)
+        matrix = matrix[np.sort(rng.choice(len(matrix), sample_size, replace=False))]
+    return matrix
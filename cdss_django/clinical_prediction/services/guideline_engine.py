@@ -0,0 +1,91 @@
+# clinical_prediction/services/guideline_engine.py
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 'Stage IIIA', 'IIB', 'stage iv' 등에서 로마 숫자 병기만 추출 (긴 표기부터 매칭)
+STAGE_PATTERN = r'(?:^|[^A-Z])(IV|III|II|I)(?:[A-C]\d?)?(?:[^A-Z]|$)'
+GRADE_PATTERN = r'(G[1-4])'
+
+
+class GuidelineEngine:
+    """
+    치료 가이드라인 규칙표(버전 관리되는 JSON)를 조회 배열로 컴파일한 점수 엔진.
+
+    score()는 환자 목록의 나이/병기/등급을 한 번에 코드화해 (환자 수, 치료 수) 효과 행렬을 계산합니다.
+    """
+
+    def __init__(self, rules):
+        self.version = rules['version']
+        self.treatments = list(rules['treatments'])
+        self.base_effects = {
+            cancer_type: np.asarray(effects, dtype=np.float64)
+            for cancer_type, effects in rules['base_effects'].items()
+        }
+
+        age_rules = rules['age']
+        self.older_than = age_rules['older_than']
+        self.older_factor = age_rules['older_factor']
+        self.younger_than = age_rules['younger_than']
+        self.younger_factor = age_rules['younger_factor']
+        self.default_age = age_rules['default_age']
+
+        # 병기/등급 코드 -> 계수 배열 (마지막 칸은 인식하지 못한 값의 기본 계수)
+        default_factor = rules['default_factor']
+        self.stage_codes = {stage: i for i, stage in enumerate(rules['stage_factors'])}
+        self.stage_factors = np.append(np.asarray(list(rules['stage_factors'].values()), dtype=np.float64), default_factor)
+        self.grade_codes = {grade: i for i, grade in enumerate(rules['grade_factors'])}
+        self.grade_factors = np.append(np.asarray(list(rules['grade_factors'].values()), dtype=np.float64), default_factor)
+
+        self.effectiveness_bounds = tuple(rules['effectiveness_bounds'])
+        self.side_effects_bounds = tuple(rules['side_effects_bounds'])
+        self.recommendation_weight = rules['recommendation_weight']
+        self.confidence_range = tuple(rules['confidence_range'])
+        self.overall_confidence = rules['overall_confidence']
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+        engine = cls(rules)
+        logger.info(f"치료 가이드라인 규칙 로드: v{engine.version} ({path})")
+        return engine
+
+    def _encode(self, values, pattern, codes):
+        extracted = pd.Series(values, dtype=object).astype(str).str.upper().str.extract(pattern, expand=False)
+        return extracted.map(codes).fillna(len(codes)).to_numpy(dtype=np.intp)
+
+    def age_factors(self, ages):
+        ages = pd.to_numeric(pd.Series(ages, dtype=object), errors='coerce').fillna(self.default_age).to_numpy()
+        return np.select(
+            [ages > self.older_than, ages < self.younger_than],
+            [self.older_factor, self.younger_factor],
+            default=1.0
+        )
+
+    def stage_factor_values(self, stages):
+        return self.stage_factors[self._encode(stages, STAGE_PATTERN, self.stage_codes)]
+
+    def grade_factor_values(self, grades):
+        return self.grade_factors[self._encode(grades, GRADE_PATTERN, self.grade_codes)]
+
+    def score(self, cancer_type, ages, stages, grades):
+        """
+        반환: dict of (환자 수, 치료 수) 배열
+        - effectiveness / side_effects_risk / recommendation_score / confidence
+        """
+        patient_factors = self.age_factors(ages) * self.stage_factor_values(stages) * self.grade_factor_values(grades)
+        effectiveness = np.clip(
+            np.outer(patient_factors, self.base_effects[cancer_type]), *self.effectiveness_bounds
+        )
+        low, high = self.confidence_range
+        return {
+            'effectiveness': np.round(effectiveness, 1),
+            'confidence': np.round(low + np.random.uniform(0, high - low, effectiveness.shape), 2),
+            'side_effects_risk': np.round(np.clip(100 - effectiveness, *self.side_effects_bounds), 1),
+            'recommendation_score': np.round(effectiveness * self.recommendation_weight, 1),
+        }
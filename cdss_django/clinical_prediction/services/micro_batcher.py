@@ -0,0 +1,149 @@
+# clinical_prediction/services/micro_batcher.py
+import logging
+import threading
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingRequest:
+    __slots__ = ('frame', 'event', 'result', 'error', 'seconds')
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.seconds = None  # 이 요청이 포함된 배치의 fn 실행 시간 (대기 시간 제외)
+
+
+class _BatchStats:
+    __slots__ = ('requests', 'batches', 'rows', 'max_batch_rows', 'queue_depth', 'max_queue_depth')
+
+    def __init__(self):
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_rows = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    def describe(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0.0,
+            'max_batch_rows': self.max_batch_rows,
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+        }
+
+
+class MicroBatcher:
+    """
+    같은 키((암종, 예측 유형, 메서드))로 동시에 들어온 단건 추론을 모아 한 번에 실행하는 프로세스 내 배처.
+
+    별도 스레드 없이 먼저 도착한 요청(리더)이 최대 window_seconds 동안(또는 max_batch_rows가 찰 때까지)
+    기다렸다가 모인 행을 합쳐 fn을 한 번 호출하고, 결과를 행 단위로 나눠 대기 중인 요청에 돌려줍니다.
+    같은 키로 실행 중인 요청이 없으면(부하가 없으면) 기다리지 않고 바로 실행합니다.
+    """
+
+    def __init__(self, window_seconds=0.005, max_batch_rows=32):
+        self.window_seconds = window_seconds
+        self.max_batch_rows = max_batch_rows
+        self._lock = threading.Lock()
+        self._open_batches = {}  # 키 -> (대기 요청 목록, 가득 참 이벤트)
+        self._active = {}        # 키 -> 실행/대기 중인 요청 수
+        self._stats = {}
+
+    @property
+    def enabled(self):
+        return self.window_seconds > 0 and self.max_batch_rows > 1
+
+    def run(self, key, frame, fn):
+        """frame(1개 이상 행)에 대한 fn 결과를 반환. fn 결과는 행 순서대로 슬라이스 가능해야 함"""
+        return self.run_timed(key, frame, fn)[0]
+
+    def run_timed(self, key, frame, fn):
+        """run()과 같지만 (결과, 배치 fn 실행 시간(초)) 반환 (배치 창 대기 시간은 포함하지 않음)"""
+        if not self.enabled:
+            started = time.perf_counter()
+            return fn(frame), time.perf_counter() - started
+
+        request = _PendingRequest(frame)
+        with self._lock:
+            stats = self._stats.setdefault(key, _BatchStats())
+            stats.requests += 1
+            busy = self._active.get(key, 0) > 0
+            self._active[key] = self._active.get(key, 0) + 1
+
+            open_batch = self._open_batches.get(key)
+            is_leader = open_batch is None
+            if is_leader:
+                open_batch = ([], threading.Event())
+                self._open_batches[key] = open_batch
+            pending, full = open_batch
+            pending.append(request)
+
+            stats.queue_depth += 1
+            stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+            if sum(len(item.frame) for item in pending) >= self.max_batch_rows:
+                # 가득 찬 배치는 닫고 이후 요청은 새 배치로
+                del self._open_batches[key]
+                full.set()
+
+        try:
+            if is_leader:
+                if busy:
+                    full.wait(self.window_seconds)
+                with self._lock:
+                    if self._open_batches.get(key) is open_batch:
+                        del self._open_batches[key]
+                    stats.queue_depth -= len(pending)
+                self._execute(key, pending, fn, stats)
+            else:
+                request.event.wait()
+        finally:
+            with self._lock:
+                self._active[key] -= 1
+
+        if request.error is not None:
+            raise request.error
+        return request.result, request.seconds
+
+    def _execute(self, key, pending, fn, stats):
+        rows = [len(item.frame) for item in pending]
+        try:
+            batch = pending[0].frame if len(pending) == 1 else pd.concat(
+                [item.frame for item in pending], ignore_index=True
+            )
+            started = time.perf_counter()
+            output = fn(batch)
+            seconds = time.perf_counter() - started
+            start = 0
+            for item, count in zip(pending, rows):
+                item.result = output[start:start + count]
+                item.seconds = seconds
+                start += count
+        except Exception as e:
+            logger.error(f"일괄 추론 실패 {key} ({sum(rows)}행): {e}")
+            for item in pending:
+                item.error = e
+        finally:
+            with self._lock:
+                stats.batches += 1
+                stats.rows += sum(rows)
+                stats.max_batch_rows = max(stats.max_batch_rows, sum(rows))
+            for item in pending:
+                item.event.set()
+
+    def stats(self):
+        """키별 요청 수/배치 수/평균·최대 배치 크기/현재 대기열 깊이"""
+        with self._lock:
+            return {
+                ':'.join(str(part) for part in key): stats.describe()
+                for key, stats in self._stats.items()
+            }
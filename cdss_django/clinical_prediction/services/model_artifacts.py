@@ -0,0 +1,114 @@
+# clinical_prediction/services/model_artifacts.py
+import json
+import logging
+import os
+import shutil
+import time
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILENAME = 'manifest.json'
+
+# 레지스트리/요청 처리 중에 붙는 런타임 키는 아티팩트에 저장하지 않음
+RUNTIME_KEYS = {
+    'feature_plan', 'model_version', 'feature_importance_method', 'feature_importance_summary', 'compiled_model'
+}
+
+
+def _to_json_value(value):
+    """manifest에 그대로 넣을 수 있는 값이면 JSON 호환 값으로 변환, 아니면 None"""
+    if hasattr(value, 'tolist') and getattr(value, 'ndim', 2) == 1 and getattr(value, 'dtype', None) == object:
+        value = value.tolist()  # 특성명 배열/Index
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return None
+    return value
+
+
+def artifact_dir_for(artifact_root, name, version):
+    return os.path.join(artifact_root, name, version)
+
+
+def export_model_artifact(wrapper, artifact_root, name, version, source_file=None):
+    """
+    래핑된 모델(model + scaler + label_encoders + feature_names ...)을 버전별 아티팩트 디렉토리로 내보내기.
+
+    JSON으로 표현 가능한 값(특성명, 클래스 레이블 등)은 manifest.json에, 나머지 객체는 구성요소별
+    비압축 joblib 파일로 저장합니다. 아티팩트는 원본 pkl 버전별 패키징(전역 중요도/참조 샘플 포함)일 뿐
+    워커 간 메모리를 공유하지는 않습니다: sklearn 트리(Tree.__setstate__)와 XGBoost/LightGBM 부스터는
+    로드할 때 노드 배열/모델 버퍼를 자체 메모리로 복사하므로, mmap으로 매핑되는 것은 참조 샘플처럼
+    구성요소에 그대로 들어 있는 numpy 배열뿐입니다.
+    """
+    target_dir = artifact_dir_for(artifact_root, name, version)
+    temp_dir = f"{target_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'name': name,
+        'version': version,
+        'source_file': source_file,
+        'created_at': time.time(),
+        'metadata': {},
+        'components': {},
+    }
+    try:
+        for key, value in wrapper.items():
+            if key in RUNTIME_KEYS:
+                continue
+            json_value = _to_json_value(value) if key != 'model' else None
+            if json_value is not None or value is None:
+                manifest['metadata'][key] = json_value
+                continue
+            filename = f"{key}.joblib"
+            joblib.dump(value, os.path.join(temp_dir, filename), compress=0)
+            manifest['components'][key] = filename
+
+        with open(os.path.join(temp_dir, MANIFEST_FILENAME), 'w') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        # 완성된 디렉토리만 보이도록 마지막에 이름 변경
+        shutil.rmtree(target_dir, ignore_errors=True)
+        os.replace(temp_dir, target_dir)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"모델 아티팩트 내보내기 완료: {target_dir} (구성요소 {len(manifest['components'])}개)")
+    return target_dir
+
+
+def has_model_artifact(artifact_dir):
+    return os.path.exists(os.path.join(artifact_dir, MANIFEST_FILENAME))
+
+
+def load_model_artifact(artifact_dir, mmap_mode='r'):
+    """아티팩트 디렉토리를 래핑된 모델 dict로 로드 (구성요소에 그대로 들어 있는 numpy 배열만 mmap_mode로 매핑)"""
+    with open(os.path.join(artifact_dir, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 아티팩트 형식입니다: {manifest.get('format_version')} ({artifact_dir})")
+
+    wrapper = dict(manifest['metadata'])
+    for key, filename in manifest['components'].items():
+        wrapper[key] = joblib.load(os.path.join(artifact_dir, filename), mmap_mode=mmap_mode)
+    return wrapper
+
+
+def prune_model_artifacts(artifact_root, name, keep_version):
+    """현재 버전을 제외한 이전 아티팩트 디렉토리 삭제"""
+    base_dir = os.path.join(artifact_root, name)
+    if not os.path.isdir(base_dir):
+        return []
+    removed = []
+    for version in os.listdir(base_dir):
+        if version != keep_version:
+            shutil.rmtree(os.path.join(base_dir, version), ignore_errors=True)
+            removed.append(version)
+    return removed
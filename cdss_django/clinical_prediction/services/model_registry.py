@@ -0,0 +1,177 @@
+# clinical_prediction/services/model_registry.py
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:  # psutil이 없으면 파일 크기로 메모리 사용량을 추정
+    psutil = None
+
+
+def _current_rss():
+    if psutil is None:
+        return None
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+class ModelEntry:
+    """레지스트리에 올라간 모델 한 개와 로드 통계"""
+
+    def __init__(self, model_info, load_seconds, resident_bytes, file_bytes):
+        self.model_info = model_info
+        self.load_seconds = load_seconds
+        self.resident_bytes = resident_bytes
+        self.file_bytes = file_bytes
+        self.loaded_at = time.time()
+        self.hits = 0
+        self.extras = {}  # 모델과 수명을 같이하는 부가 객체 (XAI 설명기 등)
+
+    @property
+    def footprint(self):
+        return self.resident_bytes or self.file_bytes or 0
+
+    def describe(self):
+        return {
+            'load_seconds': round(self.load_seconds, 4),
+            'resident_bytes': self.resident_bytes,
+            'file_bytes': self.file_bytes,
+            'loaded_at': self.loaded_at,
+            'hits': self.hits,
+        }
+
+
+class ModelRegistry:
+    """
+    (cancer_type, prediction_type) 모델을 처음 사용할 때 로드하는 LRU 레지스트리.
+
+    loader(cancer_type, prediction_type)는 (model_info, model_path)를 반환해야 하며,
+    로드 실패 시 예외를 던집니다. 실패한 슬롯은 None으로 기억해 요청마다 재시도하지 않습니다.
+    failure_ttl(초)이 있으면 그 시간이 지난 실패는 잊고 다음 요청에서 다시 로드합니다.
+    (나중에 배포/수정되는 섀도 후보 파일처럼 재시작 없이 복구되어야 하는 슬롯)
+    """
+
+    def __init__(self, loader, max_bytes=None, failure_ttl=None):
+        self._loader = loader
+        self.max_bytes = max_bytes
+        self.failure_ttl = failure_ttl
+        self._entries = OrderedDict()
+        self._failures = {}  # 키 -> (오류 메시지, 실패 시각 monotonic)
+        self._lock = threading.RLock()
+        self._slot_locks = {}
+
+    def get(self, cancer_type, prediction_type):
+        """모델 정보 반환 (없으면 로드, 로드 실패 슬롯은 None)"""
+        entry = self.get_entry(cancer_type, prediction_type)
+        return entry.model_info if entry else None
+
+    def get_entry(self, cancer_type, prediction_type):
+        key = (cancer_type, prediction_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.hits += 1
+                return entry
+            if self._is_failed(key):
+                return None
+            slot_lock = self._slot_locks.setdefault(key, threading.Lock())
+
+        # 같은 슬롯을 동시에 두 번 로드하지 않도록 슬롯 단위로 잠금
+        with slot_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.hits += 1
+                    return entry
+                if self._is_failed(key):
+                    return None
+
+            entry = self._load(key)
+
+            with self._lock:
+                if entry is None:
+                    return None
+                self._entries[key] = entry
+                entry.hits += 1
+                self._evict_over_budget(keep=key)
+                return entry
+
+    def _is_failed(self, key):
+        # self._lock을 잡은 상태에서만 호출
+        failure = self._failures.get(key)
+        if failure is None:
+            return False
+        if self.failure_ttl is not None and time.monotonic() - failure[1] >= self.failure_ttl:
+            del self._failures[key]
+            return False
+        return True
+
+    def _load(self, key):
+        cancer_type, prediction_type = key
+        rss_before = _current_rss()
+        started = time.perf_counter()
+        try:
+            model_info, model_path = self._loader(cancer_type, prediction_type)
+        except Exception as e:
+            logger.error(f"모델 로드 실패: {cancer_type} - {prediction_type}: {e}")
+            with self._lock:
+                self._failures[key] = (str(e), time.monotonic())
+            return None
+
+        load_seconds = time.perf_counter() - started
+        rss_after = _current_rss()
+        resident_bytes = None
+        if rss_before is not None and rss_after is not None and rss_after > rss_before:
+            resident_bytes = rss_after - rss_before
+        file_bytes = os.path.getsize(model_path) if model_path and os.path.exists(model_path) else None
+
+        logger.info(
+            f"모델 로드 성공: {cancer_type} - {prediction_type} "
+            f"({load_seconds:.2f}s, rss +{(resident_bytes or 0) / 1e6:.1f}MB)"
+        )
+        return ModelEntry(model_info, load_seconds, resident_bytes, file_bytes)
+
+    def _evict_over_budget(self, keep):
+        if not self.max_bytes:
+            return
+        total = sum(entry.footprint for entry in self._entries.values())
+        for key in list(self._entries.keys()):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            evicted = self._entries.pop(key)
+            total -= evicted.footprint
+            logger.info(f"모델 캐시 용량 초과로 언로드: {key[0]} - {key[1]}")
+
+    def warm_up(self, slots):
+        """배포별 워밍업 목록('liver:risk' 형식 또는 튜플)을 미리 로드"""
+        for slot in slots:
+            cancer_type, prediction_type = slot.split(':', 1) if isinstance(slot, str) else slot
+            self.get_entry(cancer_type, prediction_type)
+
+    def evict(self, cancer_type, prediction_type):
+        with self._lock:
+            self._entries.pop((cancer_type, prediction_type), None)
+            self._failures.pop((cancer_type, prediction_type), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._failures.clear()
+
+    def stats(self):
+        """로드된 모델별 로드 시간/메모리 사용량 및 실패 슬롯"""
+        with self._lock:
+            loaded = {f"{ct}:{pt}": entry.describe() for (ct, pt), entry in self._entries.items()}
+            return {
+                'max_bytes': self.max_bytes,
+                'total_bytes': sum(entry.footprint for entry in self._entries.values()),
+                'loaded': loaded,
+                'failed': {f"{ct}:{pt}": error for (ct, pt), (error, _) in self._failures.items()},
+            }
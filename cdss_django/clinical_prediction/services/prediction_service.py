@@ -1,22 +1,48 @@
 import pickle
+import atexit
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import pandas as pd
 import numpy as np
 import os
 import logging
 from django.conf import settings
 from django.apps import apps
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
 from datetime import date
-import shap
-import lime
-import lime.lime_tabular
-from sklearn.inspection import permutation_importance
+from .feature_plan import FeaturePlan
+from .model_registry import ModelRegistry
+from .micro_batcher import MicroBatcher
+from .guideline_engine import GuidelineEngine
+from .shadow_scoring import ShadowJob, ShadowScorer
+from .compiled_backend import compile_model
+from .survival_curves import evaluate_survival_curves
+from .global_importance import permutation_importances, sample_reference_rows
+from .model_artifacts import artifact_dir_for, has_model_artifact, load_model_artifact
 
 logger = logging.getLogger(__name__)
 
 class ClinicalPredictionService:
+    # 일괄 예측 유형 -> (결과 키, 암종 그룹 예측 메서드)
+    BATCH_PREDICTION_TYPES = {
+        'survival': ('survival', '_predict_survival_group'),
+        'risk_classification': ('risk_classification', '_predict_risk_group'),
+        'treatment_effect': ('treatment_effect', '_predict_treatment_group')
+    }
+    # 통합 예측 결과 키 -> (모델 슬롯/ClinicalPredictionResult 예측 유형, 조회된 임상 데이터용 예측 메서드)
+    PREDICT_ALL_TYPES = {
+        'survival': ('survival', '_predict_survival_for'),
+        'risk_classification': ('risk', '_predict_risk_for'),
+        'treatment_effect': ('treatment', '_predict_treatment_for')
+    }
+
     def __init__(self):
-        self.models = {}
-        self.explainers = {}  # XAI 설명기 저장
         self.model_paths = {
             'liver': {
                 'survival': 'cdss_liver_cancer_gbsa_model.pkl',
@@ -116,81 +142,309 @@ class ClinicalPredictionService:
         # Imputer는 훈련은 했지만 실제로는 사용하지 않음
         self.num_imputer = None
         
-        self._load_models()
-        self._load_explainers()
+        # 모델은 처음 사용할 때 로드 (프로세스 시작 시 전체 로드하지 않음)
+        cache_mb = getattr(settings, 'CLINICAL_PREDICTION_MODEL_CACHE_MB', None)
+        self.model_registry = ModelRegistry(
+            loader=self._load_model,
+            max_bytes=cache_mb * 1024 * 1024 if cache_mb else None
+        )
+        # SHAP 설명기는 첫 설명 요청 시 생성 (같은 모델에 대해 중복 생성 방지)
+        self._explainer_lock = threading.Lock()
+        
+        # 치료 모델이 없을 때 사용하는 가이드라인 규칙 (버전 관리되는 규칙 파일에서 한 번만 컴파일)
+        self.guideline_engine = GuidelineEngine.load(getattr(
+            settings, 'CLINICAL_PREDICTION_GUIDELINE_RULES',
+            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'treatment_guidelines.json')
+        ))
+        
+        # 동시에 들어온 단건 예측을 (암종, 예측 유형)별로 모아 한 번에 추론
+        self.micro_batcher = MicroBatcher(
+            window_seconds=getattr(settings, 'CLINICAL_PREDICTION_MICRO_BATCH_WINDOW_MS', 5) / 1000,
+            max_batch_rows=getattr(settings, 'CLINICAL_PREDICTION_MICRO_BATCH_MAX_ROWS', 32)
+        )
+        
+        # 통합 예측 시 세 모델을 동시에 실행 (sklearn/xgboost/lightgbm 추론은 GIL을 해제)
+        # 시간 초과된 작업이 요청을 붙잡지 않도록 요청마다 만들지 않고 공유
+        self._predict_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'CLINICAL_PREDICTION_MAX_WORKERS', 6),
+            thread_name_prefix='clinical-predict'
+        )
+        
+        # 섀도 모델 (PredictionModelInfo.is_shadow): 운영 모델과 같은 입력으로 백그라운드에서 실행해 비교 로그 기록
+        # 후보 파일은 첫 로드 실패 후 배포/수정될 수 있으므로 실패를 영구히 기억하지 않음
+        self.shadow_registry = ModelRegistry(
+            loader=self._load_shadow_model,
+            failure_ttl=getattr(settings, 'CLINICAL_PREDICTION_SHADOW_RETRY_SECONDS', 300)
+        )
+        self.shadow_scorer = ShadowScorer(
+            self._score_shadow,
+            log_dir=getattr(settings, 'CLINICAL_PREDICTION_SHADOW_LOG_DIR',
+                            os.path.join(settings.BASE_DIR, 'clinical_prediction', 'shadow_logs')),
+            queue_size=getattr(settings, 'CLINICAL_PREDICTION_SHADOW_QUEUE_SIZE', 1000),
+            flush_rows=getattr(settings, 'CLINICAL_PREDICTION_SHADOW_FLUSH_ROWS', 256)
+        )
+        atexit.register(self.shadow_scorer.flush, wait=False)
+        self._shadow_models = {}
+        self._shadow_models_loaded_at = float('-inf')
+        self._shadow_lock = threading.Lock()
+    
+    def _get_model_info(self, cancer_type, prediction_type):
+        """모델 정보 조회 (필요 시 로드)"""
+        if prediction_type not in self.model_paths.get(cancer_type, {}):
+            return None
+        return self.model_registry.get(cancer_type, prediction_type)
+    
+    def warm_up(self, slots=None):
+        """배포 설정의 워밍업 목록에 있는 모델을 미리 로드"""
+        if slots is None:
+            slots = getattr(settings, 'CLINICAL_PREDICTION_WARMUP_MODELS', [])
+        self.model_registry.warm_up(slots)
     
-    def _load_models(self):
-        """모든 예측 모델을 메모리에 로드"""
+    def _get_model_path(self, cancer_type, prediction_type):
+        return self._get_model_file_path(self.model_paths[cancer_type][prediction_type])
+    
+    def _get_model_file_path(self, model_file):
         models_dir = os.path.join(settings.BASE_DIR, 'clinical_prediction', 'models')
+        return os.path.join(models_dir, model_file)
+    
+    def _get_model_version(self, cancer_type, prediction_type):
+        """모델 파일의 수정 시각/크기 기반 버전 (모델을 로드하지 않고 확인 가능)"""
+        try:
+            return self._get_file_version(self._get_model_path(cancer_type, prediction_type))
+        except KeyError:
+            return 'unavailable'
+    
+    def _get_file_version(self, model_path):
+        try:
+            model_stat = os.stat(model_path)
+        except OSError:
+            return 'unavailable'
+        return f"{int(model_stat.st_mtime)}-{model_stat.st_size}"
+    
+    def _get_artifact_root(self):
+        return getattr(
+            settings, 'CLINICAL_PREDICTION_ARTIFACT_DIR',
+            os.path.join(settings.BASE_DIR, 'clinical_prediction', 'artifacts')
+        )
+    
+    def _get_artifact_dir(self, cancer_type, prediction_type):
+        """원본 모델 파일 버전에 대응하는 아티팩트 디렉토리"""
+        return artifact_dir_for(
+            self._get_artifact_root(), f"{cancer_type}_{prediction_type}",
+            self._get_model_version(cancer_type, prediction_type)
+        )
+    
+    def _load_model(self, cancer_type, prediction_type):
+        """예측 모델 하나를 로드하여 래핑된 구조와 파일 경로를 반환"""
+        model_path = self._get_model_path(cancer_type, prediction_type)
         
-        for cancer_type, models in self.model_paths.items():
-            self.models[cancer_type] = {}
-            for prediction_type, model_file in models.items():
-                model_path = os.path.join(models_dir, model_file)
-                try:
-                    with open(model_path, 'rb') as f:
-                        loaded_model = pickle.load(f)
-                    
-                    # 🔥 중요: 모델이 이미 래핑된 구조인지 확인
-                    if isinstance(loaded_model, dict) and 'model' in loaded_model:
-                        # 이미 래핑된 모델 (pkl 파일에서 직접 로드)
-                        self.models[cancer_type][prediction_type] = loaded_model
-                        logger.info(f"래핑된 모델 로드: {cancer_type} - {prediction_type}")
-                        
-                        # 래핑된 모델의 구성 요소 확인
-                        wrapper = loaded_model
-                        logger.info(f"  - 모델 타입: {wrapper.get('model_type', 'Unknown')}")
-                        logger.info(f"  - 특성 수: {len(wrapper.get('feature_names', []))}")
-                        logger.info(f"  - Scaler 존재: {wrapper.get('scaler') is not None}")
-                        logger.info(f"  - Label Encoders 수: {len(wrapper.get('label_encoders', {}))}")
-                        logger.info(f"  - Imputer 존재: {wrapper.get('num_imputer') is not None}")
-                        
-                    else:
-                        # 단순 모델 객체인 경우 기본 래핑
-                        self.models[cancer_type][prediction_type] = {
-                            'model': loaded_model,
-                            'model_type': type(loaded_model).__name__,
-                            'scaler': None,
-                            'label_encoders': {},
-                            'feature_names': [],
-                            'num_imputer': None
+        # export_clinical_model_artifacts로 내보낸 아티팩트가 있으면 그것을 로드 (미리 계산한 전역 중요도/참조 샘플 사용)
+        artifact_dir = self._get_artifact_dir(cancer_type, prediction_type)
+        if has_model_artifact(artifact_dir):
+            try:
+                wrapper = load_model_artifact(artifact_dir, mmap_mode='r')
+                logger.info(f"모델 아티팩트 로드: {cancer_type} - {prediction_type} ({artifact_dir})")
+            except Exception as e:
+                logger.warning(f"모델 아티팩트 로드 실패, pkl 파일 사용: {artifact_dir}: {e}")
+                wrapper = self._read_model_file(cancer_type, prediction_type)
+        else:
+            wrapper = self._read_model_file(cancer_type, prediction_type)
+        
+        wrapper['feature_plan'] = self._compile_feature_plan(wrapper, cancer_type)
+        wrapper['feature_importance_method'], wrapper['feature_importance_summary'] = \
+            self._summarize_global_importance(wrapper, cancer_type, prediction_type)
+        wrapper['compiled_model'] = self._compile_model(wrapper, cancer_type, prediction_type)
+        # 파일이 교체되면 버전이 바뀌어 이전 모델의 XAI/예측 결과 캐시를 사용하지 않음
+        wrapper['model_version'] = self._get_model_version(cancer_type, prediction_type)
+        return wrapper, model_path
+    
+    def _compile_model(self, wrapper, cancer_type, prediction_type):
+        """
+        위험도/치료 트리 모델을 설정된 컴파일 백엔드(CLINICAL_PREDICTION_COMPILED_BACKEND)로 변환.
+        
+        백엔드 패키지가 없거나 참조 샘플에서 원본 predict_proba와 결과가 다르면 None (원본 모델 사용).
+        XAI/전역 중요도는 항상 원본 모델로 계산합니다.
+        """
+        if prediction_type not in ('risk', 'treatment'):
+            return None
+        if getattr(settings, 'CLINICAL_PREDICTION_COMPILED_BACKEND', 'onnx') != 'onnx':
+            return None
+        
+        feature_plan = wrapper['feature_plan']
+        reference = wrapper.get('reference_sample')
+        if reference is None:
+            # 기본값 행 주변의 고정 시드 표본을 encode()와 같이 scaler까지 적용해 모델 입력 공간에서 비교
+            rng = np.random.default_rng(0)
+            reference = feature_plan.scale(
+                feature_plan.constant_row + rng.normal(0, 1, (64, len(feature_plan.constant_row)))
+            )
+        
+        compiled = compile_model(
+            wrapper['model'], reference, to_frame=feature_plan.to_frame,
+            tolerance=getattr(settings, 'CLINICAL_PREDICTION_COMPILED_TOLERANCE', 1e-4)
+        )
+        if compiled is not None:
+            logger.info(f"컴파일된 추론 백엔드 사용: {cancer_type} - {prediction_type} ({compiled.backend}, {compiled.source_type})")
+        return compiled
+    
+    def _get_proba_model(self, model_info):
+        """predict_proba를 실행할 모델 (컴파일된 모델이 있으면 우선)"""
+        return model_info.get('compiled_model') or model_info['model']
+    
+    def _read_model_file(self, cancer_type, prediction_type, model_path=None):
+        """원본 pkl 모델 파일을 읽어 래핑된 구조로 반환"""
+        if model_path is None:
+            model_path = self._get_model_path(cancer_type, prediction_type)
+        
+        with open(model_path, 'rb') as f:
+            loaded_model = pickle.load(f)
+        
+        # 🔥 중요: 모델이 이미 래핑된 구조인지 확인
+        if isinstance(loaded_model, dict) and 'model' in loaded_model:
+            # 이미 래핑된 모델 (pkl 파일에서 직접 로드)
+            wrapper = loaded_model
+            logger.info(f"래핑된 모델 로드: {cancer_type} - {prediction_type}")
+            logger.info(f"  - 모델 타입: {wrapper.get('model_type', 'Unknown')}")
+            logger.info(f"  - 특성 수: {len(wrapper.get('feature_names', []))}")
+            logger.info(f"  - Scaler 존재: {wrapper.get('scaler') is not None}")
+            logger.info(f"  - Label Encoders 수: {len(wrapper.get('label_encoders', {}))}")
+            logger.info(f"  - Imputer 존재: {wrapper.get('num_imputer') is not None}")
+        else:
+            # 단순 모델 객체인 경우 기본 래핑
+            wrapper = {
+                'model': loaded_model,
+                'model_type': type(loaded_model).__name__,
+                'scaler': None,
+                'label_encoders': {},
+                'feature_names': [],
+                'num_imputer': None
+            }
+            logger.warning(f"기본 래핑 적용: {cancer_type} - {prediction_type}")
+        
+        return wrapper
+    
+    def _load_shadow_model(self, cancer_type, model_file):
+        """섀도 레지스트리 로더: (암종, 후보 모델 파일명) -> 래핑된 모델"""
+        model_path = self._get_model_file_path(model_file)
+        wrapper = self._read_model_file(cancer_type, model_file, model_path=model_path)
+        wrapper['feature_plan'] = self._compile_feature_plan(wrapper, cancer_type)
+        wrapper['model_version'] = f"{model_file}@{self._get_file_version(model_path)}"
+        return wrapper, model_path
+    
+    def _get_shadow_model_file(self, cancer_type, prediction_type):
+        """슬롯의 섀도 모델 파일명 (설정은 CLINICAL_PREDICTION_SHADOW_CONFIG_TTL초마다 DB에서 다시 읽음)"""
+        if not getattr(settings, 'CLINICAL_PREDICTION_SHADOW_ENABLED', True):
+            return None
+        ttl = getattr(settings, 'CLINICAL_PREDICTION_SHADOW_CONFIG_TTL', 60)
+        if time.monotonic() - self._shadow_models_loaded_at > ttl:
+            with self._shadow_lock:
+                if time.monotonic() - self._shadow_models_loaded_at > ttl:
+                    try:
+                        PredictionModelInfo = apps.get_model('clinical_prediction', 'PredictionModelInfo')
+                        self._shadow_models = {
+                            (ct, pt): model_file
+                            for ct, pt, model_file in PredictionModelInfo.objects.filter(
+                                is_shadow=True, is_active=True
+                            ).values_list('cancer_type', 'prediction_type', 'model_file')
                         }
-                        logger.warning(f"기본 래핑 적용: {cancer_type} - {prediction_type}")
-                    
-                    logger.info(f"모델 로드 성공: {cancer_type} - {prediction_type}")
-                    
-                except Exception as e:
-                    logger.error(f"모델 로드 실패: {model_path} - {str(e)}")
-                    self.models[cancer_type][prediction_type] = None
-    
-    def _load_explainers(self):
-        """XAI 설명기 초기화"""
-        for cancer_type in self.model_paths.keys():
-            self.explainers[cancer_type] = {}
-            for prediction_type in ['survival', 'risk', 'treatment']:
-                model_info = self.models[cancer_type][prediction_type]
-                if model_info and model_info.get('model'):
+                    except Exception as e:
+                        logger.warning(f"섀도 모델 설정 조회 실패: {e}")
+                    self._shadow_models_loaded_at = time.monotonic()
+        return self._shadow_models.get((cancer_type, prediction_type))
+    
+    def _submit_shadow(self, cancer_type, prediction_type, model_info, clinical_data, record, live_output, live_seconds,
+                       shadow_files=None):
+        """
+        섀도 모델이 지정된 슬롯이면 운영 결과와 입력 레코드를 섀도 작업 큐에 넣기 (요청은 기다리지 않음)
+        shadow_files는 요청 스레드에서 미리 조회한 {예측 유형: 섀도 파일명} (작업 스레드에서 DB를 조회하지 않도록)
+        """
+        if shadow_files is not None:
+            shadow_file = shadow_files.get(prediction_type)
+        else:
+            shadow_file = self._get_shadow_model_file(cancer_type, prediction_type)
+        if not shadow_file:
+            return
+        try:
+            if record is None:
+                record = self._prepare_prediction_record(clinical_data, cancer_type)
+            self.shadow_scorer.submit(ShadowJob(
+                cancer_type, prediction_type, shadow_file, record,
+                live_output, live_seconds * 1000, model_info.get('model_version')
+            ))
+        except Exception as e:
+            logger.warning(f"섀도 작업 등록 실패: {cancer_type} - {prediction_type}: {e}")
+    
+    def _score_shadow(self, job):
+        """섀도 작업 실행: 운영 모델과 같은 전처리 방식으로 후보 모델 자체의 특성/인코더를 적용해 추론"""
+        shadow_info = self.shadow_registry.get(job.cancer_type, job.shadow_file)
+        if not shadow_info:
+            raise ValueError(f"섀도 모델을 로드할 수 없습니다: {job.shadow_file}")
+        
+        if job.prediction_type == 'survival':
+            # 운영 생존 모델은 아직 _preprocess_data로 인코딩하므로 같은 방식으로 맞춰야 출력 비교가 의미 있음
+            processed_data = self._preprocess_data_with(
+                shadow_info, pd.DataFrame([job.record]), job.cancer_type, job.prediction_type
+            )
+        else:
+            feature_plan = shadow_info['feature_plan']
+            processed_data = feature_plan.to_frame(feature_plan.encode([job.record]))
+        model = shadow_info['model']
+        started = time.perf_counter()
+        if hasattr(model, 'predict_proba'):
+            output = model.predict_proba(processed_data)
+        else:
+            output = model.predict(processed_data)
+        latency_ms = (time.perf_counter() - started) * 1000
+        return np.asarray(output)[0], latency_ms, shadow_info['model_version']
+    
+    def _get_shap_explainer(self, cancer_type, prediction_type):
+        """모델별 SHAP 설명기 조회 (첫 요청 시 생성, 모델이 언로드되면 함께 해제)"""
+        entry = self.model_registry.get_entry(cancer_type, prediction_type)
+        if entry is None:
+            return None
+        
+        if 'shap_explainer' not in entry.extras:
+            with self._explainer_lock:
+                if 'shap_explainer' not in entry.extras:
                     try:
-                        model = model_info['model']
-                        
-                        if prediction_type == 'survival':
-                            self.explainers[cancer_type][prediction_type] = {
-                                'shap': None,
-                                'lime': None
-                            }
-                            logger.info(f"생존 모델 XAI 설명기 건너뛰기: {cancer_type}-{prediction_type}")
-                        else:
-                            self.explainers[cancer_type][prediction_type] = {
-                                'shap': shap.Explainer(model),
-                                'lime': None
-                            }
-                            logger.info(f"XAI 설명기 초기화 성공: {cancer_type}-{prediction_type}")
+                        import shap
+                        entry.extras['shap_explainer'] = shap.TreeExplainer(entry.model_info['model'])
+                        logger.info(f"SHAP 설명기 생성: {cancer_type} - {prediction_type}")
                     except Exception as e:
-                        logger.warning(f"XAI 설명기 초기화 실패: {cancer_type}-{prediction_type}: {e}")
-                        self.explainers[cancer_type][prediction_type] = {
-                            'shap': None,
-                            'lime': None
-                        }
+                        # 지원하지 않는 모델은 실패를 기억해 요청마다 재시도하지 않음
+                        logger.warning(f"SHAP 설명기 생성 실패 ({cancer_type} - {prediction_type}): {e}")
+                        entry.extras['shap_explainer'] = None
+        return entry.extras['shap_explainer']
+    
+    def _get_xai_cache_key(self, model_info, processed_data, cancer_type, prediction_type):
+        """(모델 버전, 인코딩된 특성 벡터 해시) 기반 XAI 캐시 키"""
+        vector = np.ascontiguousarray(processed_data.to_numpy(dtype=np.float32))
+        digest = hashlib.sha1(vector.tobytes()).hexdigest()
+        model_version = model_info.get('model_version', 'unknown')
+        return f"clinical_xai:{cancer_type}:{prediction_type}:{model_version}:{digest}"
+    
+    def _get_cache(self):
+        return caches[getattr(settings, 'CLINICAL_PREDICTION_CACHE_ALIAS', 'default')]
+    
+    def _cache_get(self, cache_key):
+        # 캐시(Redis) 장애 시에도 예측/설명은 직접 계산해서 반환
+        try:
+            return self._get_cache().get(cache_key)
+        except Exception as e:
+            logger.warning(f"캐시 조회 실패 ({cache_key}): {e}")
+            return None
+    
+    def _cache_set(self, cache_key, value, timeout):
+        try:
+            self._get_cache().set(cache_key, value, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"캐시 저장 실패 ({cache_key}): {e}")
+    
+    def _cache_delete(self, cache_key):
+        try:
+            self._get_cache().delete(cache_key)
+        except Exception as e:
+            logger.warning(f"캐시 삭제 실패 ({cache_key}): {e}")
     
     def _generate_xai_explanation(self, model_info, processed_data, cancer_type, prediction_type, patient_data=None):
         """XAI 설명 생성 - 최종 정리 버전 (SHAP 및 Feature Importance 활용)"""
@@ -199,7 +453,13 @@ class ClinicalPredictionService:
                 logger.info(f"생존 모델은 XAI를 지원하지 않아 설명을 건너뜁니다: {cancer_type}")
                 return { 'feature_importance': [], 'shap_values': None, 'metadata': { 'note': 'Survival models do not support standard XAI methods' } }
 
-            model = model_info['model']
+            # 같은 모델/같은 입력 벡터의 설명은 캐시에서 반환 (SHAP 재계산 생략)
+            cache_key = self._get_xai_cache_key(model_info, processed_data, cancer_type, prediction_type)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logger.info(f"XAI 설명 캐시 사용: {cancer_type}_{prediction_type}")
+                return cached
+
             feature_names = model_info.get('feature_names', processed_data.columns.tolist())
             model_type = model_info.get('model_type', 'Unknown')
             unique_id = f"{cancer_type}_{prediction_type}_{model_type}"
@@ -212,32 +472,17 @@ class ClinicalPredictionService:
             }
             logger.info(f"XAI 설명 생성 시작: {unique_id}")
 
-            # --- 1. 모델의 전반적인 특성 중요도 (Gini Importance 등) 계산 ---
+            # --- 1. 모델의 전반적인 특성 중요도 (모델 로드 시 한 번 계산) ---
             # 모델 전체적으로 어떤 특성이 중요한지에 대한 정보
-            if hasattr(model, 'feature_importances_'):
-                importances = model.feature_importances_
-                cancer_weights = self._get_cancer_specific_weights(cancer_type, prediction_type)
-                feature_details = []
-                for i, feature_name in enumerate(feature_names):
-                    if i < len(importances):
-                        base_importance = float(importances[i])
-                        weight = cancer_weights.get(feature_name, 1.0)
-                        feature_details.append({'feature': feature_name, 'weighted_importance': base_importance * weight})
-                
-                total_weighted_sum = sum(item['weighted_importance'] for item in feature_details)
-                feature_importance_final = []
-                if total_weighted_sum > 0:
-                    for item in feature_details:
-                        normalized_importance = (item['weighted_importance'] / total_weighted_sum) * 100
-                        feature_importance_final.append({'feature': item['feature'], 'importance': normalized_importance})
-                
-                feature_importance_final.sort(key=lambda x: x['importance'], reverse=True)
-                explanations['feature_importance'] = feature_importance_final[:10]
+            explanations['feature_importance'] = [dict(item) for item in model_info.get('feature_importance_summary', [])]
+            explanations['feature_importance_method'] = model_info.get('feature_importance_method')
 
             # --- 2. SHAP 값 계산 (개별 예측에 대한 설명) ---
             # "이 환자"의 예측에 각 특성이 얼마나, 어떻게 기여했는지에 대한 정보
             try:
-                explainer = shap.TreeExplainer(model)
+                explainer = self._get_shap_explainer(cancer_type, prediction_type)
+                if explainer is None:
+                    raise ValueError("SHAP 설명기를 사용할 수 없는 모델입니다")
                 shap_values = explainer(processed_data)
                 explanations['shap_values'] = {
                     'values': shap_values.values.tolist(),
@@ -255,6 +500,7 @@ class ClinicalPredictionService:
                 'patient_specific': True,
                 'timestamp': pd.Timestamp.now().isoformat()
             }
+            self._cache_set(cache_key, explanations, getattr(settings, 'CLINICAL_PREDICTION_XAI_CACHE_TTL', 60 * 60 * 24))
             return explanations
             
         except Exception as e:
@@ -310,26 +556,66 @@ class ClinicalPredictionService:
         }
         return weights.get(cancer_type, {}).get(prediction_type, {})
 
-    def _generate_model_specific_target(self, cancer_type, prediction_type, model_type, data_length):
-        """모델별 특화된 더미 타겟 생성"""
-        base_seed = hash(f"{cancer_type}_{prediction_type}_{model_type}") % 1000
-        
-        if prediction_type == 'risk':
-            if cancer_type == 'liver':
-                return [(i + base_seed) % 2 for i in range(data_length)]
-            elif cancer_type == 'kidney':
-                return [(i + base_seed + 3) % 2 for i in range(data_length)]
-            elif cancer_type == 'stomach':
-                return [(i + base_seed + 7) % 2 for i in range(data_length)]
-        elif prediction_type == 'treatment':
-            if cancer_type == 'liver':
-                return [(i + base_seed + 1) % 4 for i in range(data_length)]
-            elif cancer_type == 'kidney':
-                return [(i + base_seed + 5) % 4 for i in range(data_length)]
-            elif cancer_type == 'stomach':
-                return [(i + base_seed + 9) % 4 for i in range(data_length)]
-        
-        return [1] * data_length
+    def _summarize_global_importance(self, model_info, cancer_type, prediction_type):
+        """
+        전역 특성 중요도에 암종별 가중치를 적용한 상위 10개 (모델 로드 시 한 번만 계산).
+        
+        아티팩트에 저장된 순열 중요도(global_importances)를 우선 사용하고,
+        없으면 트리 모델의 feature_importances_를 사용합니다.
+        """
+        if model_info.get('global_importances'):
+            method = 'permutation'
+            importances = model_info['global_importances']
+        elif hasattr(model_info['model'], 'feature_importances_'):
+            method = 'model'
+            feature_names = model_info.get('feature_names') or model_info['feature_plan'].feature_names
+            importances = dict(zip(feature_names, (float(value) for value in model_info['model'].feature_importances_)))
+        else:
+            return None, []
+        
+        cancer_weights = self._get_cancer_specific_weights(cancer_type, prediction_type)
+        weighted = {
+            feature_name: importance * cancer_weights.get(feature_name, 1.0)
+            for feature_name, importance in importances.items()
+        }
+        total_weighted_sum = sum(weighted.values())
+        if total_weighted_sum <= 0:
+            return method, []
+        
+        summary = [
+            {'feature': feature_name, 'importance': (value / total_weighted_sum) * 100}
+            for feature_name, value in weighted.items()
+        ]
+        summary.sort(key=lambda x: x['importance'], reverse=True)
+        return method, summary[:10]
+    
+    def _compute_reference_importances(self, model_info, cancer_type, prediction_type, sample_size=None):
+        """
+        DB 코호트에서 참조 샘플을 만들어 모델 버전별 순열 중요도 계산 (아티팩트 내보내기 시 사용).
+        
+        반환: (참조 샘플 float32 행렬, {특성명: 중요도}) / 계산할 수 없으면 (None, None)
+        """
+        if prediction_type == 'survival':
+            return None, None  # 생존 모델은 XAI를 제공하지 않음
+        
+        if sample_size is None:
+            sample_size = getattr(settings, 'CLINICAL_PREDICTION_REFERENCE_SAMPLE_SIZE', 500)
+        feature_plan = model_info.get('feature_plan') or self._compile_feature_plan(model_info, cancer_type)
+        
+        records = []
+        for clinical_data in self._get_cohort_clinical_data(cancer_type=cancer_type):
+            try:
+                records.append(self._prepare_prediction_record(clinical_data, cancer_type))
+            except Exception as e:
+                logger.warning(f"참조 샘플에서 제외: {clinical_data.pk}: {e}")
+        if not records:
+            return None, None
+        
+        reference_sample = sample_reference_rows(feature_plan.encode(records), sample_size)
+        importances = permutation_importances(
+            model_info['model'], reference_sample, feature_plan.feature_names, feature_plan.to_frame
+        )
+        return reference_sample, importances
 
     def _get_patient_clinical_data(self, patient_id=None, patient_name=None):
         """환자 임상 데이터 조회"""
@@ -350,7 +636,10 @@ class ClinicalPredictionService:
             
             elif patient_name:
                 try:
-                    patient_profile = PatientProfile.objects.filter(name=patient_name).first()
+                    # name은 모델 필드가 아닌 프로퍼티이므로 이름 필드를 합쳐 비교 (라우팅 미등록 환자용)
+                    patient_profile = PatientProfile.objects.annotate(
+                        full_name=Concat('first_name', Value(' '), 'last_name')
+                    ).filter(full_name__iexact=' '.join(str(patient_name).split())).first()
                     if patient_profile:
                         clinical_data = ClinicalData.objects.filter(patient=patient_profile).first()
                         if clinical_data:
@@ -366,7 +655,89 @@ class ClinicalPredictionService:
         except Exception as e:
             logger.error(f"환자 데이터 조회 실패: {str(e)}")
             raise ValueError(f"환자 데이터 조회 실패: {str(e)}")
+
+    def _resolve_prediction_input(self, patient_id=None, patient_name=None):
+        """
+        예측 입력(임상 데이터, 암종) 조회.
+        
+        라우팅 테이블(PatientPredictionRoute)에서 인덱스 조회 한 번으로 찾고,
+        등록되지 않은 환자만 기존 조회/암종 판별을 거친 뒤 라우팅을 채웁니다.
+        """
+        route = self._lookup_prediction_route(patient_id, patient_name)
+        if route is not None and route.clinical_data_id and route.cancer_type:
+            return route.clinical_data, route.cancer_type
+        
+        clinical_data = self._get_patient_clinical_data(patient_id, patient_name)
+        cancer_type = self._determine_cancer_type(clinical_data)
+        self.refresh_prediction_route(clinical_data.patient_id)
+        return clinical_data, cancer_type
     
+    def _lookup_prediction_route(self, patient_id=None, patient_name=None):
+        try:
+            PatientPredictionRoute = apps.get_model('clinical_prediction', 'PatientPredictionRoute')
+            queryset = PatientPredictionRoute.objects.select_related('clinical_data__patient')
+            if patient_id:
+                return queryset.filter(openemr_id=str(patient_id)).first()
+            if patient_name:
+                return queryset.filter(name_key=PatientPredictionRoute.normalize_name(patient_name)).first()
+        except Exception as e:
+            logger.warning(f"예측 라우팅 조회 실패: {e}")
+        return None
+    
+    def refresh_prediction_route(self, patient_pk, create=True):
+        """
+        환자의 예측 라우팅(최신 임상 기록, 암종, 리비전) 갱신.
+        
+        create=False면 기존 라우팅만 갱신합니다 (삭제 시그널에서 환자 삭제와 겹칠 때 다시 만들지 않도록).
+        라우팅은 조회 최적화용이므로 실패해도 예외를 올리지 않습니다.
+        """
+        try:
+            PatientProfile = apps.get_model('patients', 'PatientProfile')
+            ClinicalData = apps.get_model('patients', 'ClinicalData')
+            LiverCancerClinicalData = apps.get_model('patients', 'LiverCancerClinicalData')
+            PatientPredictionRoute = apps.get_model('clinical_prediction', 'PatientPredictionRoute')
+            
+            patient = PatientProfile.objects.filter(pk=patient_pk).first()
+            if patient is None:
+                return None
+            
+            clinical_data = ClinicalData.objects.filter(patient=patient).order_by('-form_date').first()
+            liver_clinical_data = LiverCancerClinicalData.objects.filter(patient=patient).order_by('-form_date').first()
+            source = clinical_data or liver_clinical_data
+            values = {
+                'openemr_id': patient.openemr_id,
+                'name_key': PatientPredictionRoute.normalize_name(patient.name),
+                'clinical_data': clinical_data,
+                'liver_clinical_data': liver_clinical_data,
+                'cancer_type': self._determine_cancer_type(source) if source is not None else '',
+                'clinical_data_revision': self._get_clinical_data_revision(clinical_data) if clinical_data else '',
+            }
+            if create:
+                route, _ = PatientPredictionRoute.objects.update_or_create(patient=patient, defaults=values)
+                return route
+            PatientPredictionRoute.objects.filter(patient=patient).update(**values)
+        except Exception as e:
+            logger.warning(f"예측 라우팅 갱신 실패 ({patient_pk}): {e}")
+        return None
+    
+    def _get_cohort_clinical_data(self, patient_ids=None, cancer_type=None):
+        """코호트 임상 데이터 일괄 조회 (단일 쿼리, 환자별 최신 기록만 사용)"""
+        ClinicalData = apps.get_model('patients', 'ClinicalData')
+
+        queryset = ClinicalData.objects.select_related('patient')
+        if patient_ids:
+            queryset = queryset.filter(patient__openemr_id__in=[str(pid) for pid in patient_ids])
+        if cancer_type:
+            queryset = queryset.filter(cancer_type=cancer_type)
+
+        # 단건 조회(.first())와 동일하게 환자별 가장 최근 form_date 기록을 사용
+        latest_by_patient = {}
+        for clinical_data in queryset.order_by('patient_id', '-form_date'):
+            latest_by_patient.setdefault(clinical_data.patient_id, clinical_data)
+
+        logger.info(f"코호트 임상데이터 조회: {len(latest_by_patient)}명")
+        return list(latest_by_patient.values())
+
     def _determine_cancer_type(self, clinical_data):
         """임상 데이터에서 암종 판별 (수정된 최종 버전)"""
         cancer_type_field = getattr(clinical_data, 'cancer_type', None)
@@ -399,103 +770,47 @@ class ClinicalPredictionService:
         logger.warning(f"암종을 판별할 수 없어 기본값 'liver'를 사용합니다. DB 데이터: {cancer_type_field}")
         return 'liver'
     
-    def _preprocess_patient_data_for_model(self, clinical_data, cancer_type, prediction_type):
-        """모델별 환자 데이터 전처리 (래핑된 모델 구조 활용)"""
+    def _compile_feature_plan(self, model_wrapper, cancer_type):
+        """모델 로드 시 특성 인코딩 계획 컴파일"""
+        return FeaturePlan(
+            feature_names=model_wrapper.get('feature_names', []),
+            label_encoders=model_wrapper.get('label_encoders', {}),
+            scaler=model_wrapper.get('scaler'),
+            record_fields=self._get_record_fields(cancer_type),
+            default_for=lambda feature_name: self._get_feature_default_by_cancer(feature_name, cancer_type)
+        )
+
+    def _get_record_fields(self, cancer_type):
+        """_prepare_prediction_record가 항상 채우는 필드 목록"""
+        return (
+            {'vital_status', 'age_at_diagnosis', 'gender', 'year_of_diagnosis', 'days_to_death'}
+            | set(self.cancer_defaults[cancer_type])
+            | set(self.cancer_fields[cancer_type])
+        )
+
+    def _preprocess_patient_data_for_model(self, clinical_data, cancer_type, prediction_type, record=None):
+        """모델별 환자 데이터 전처리 (래핑된 모델 구조 활용, 준비된 레코드가 있으면 재사용)"""
+        if record is not None:
+            return self._encode_records_for_model([record], cancer_type, prediction_type)
+        return self._preprocess_batch_for_model([clinical_data], cancer_type, prediction_type)
+
+    def _preprocess_batch_for_model(self, clinical_records, cancer_type, prediction_type):
+        """여러 환자의 임상 데이터를 모델 입력 행렬 하나로 인코딩 (컴파일된 특성 계획 사용)"""
+        records = [self._prepare_prediction_record(clinical_data, cancer_type) for clinical_data in clinical_records]
+        return self._encode_records_for_model(records, cancer_type, prediction_type)
+
+    def _encode_records_for_model(self, records, cancer_type, prediction_type):
         try:
-            model_wrapper = self.models[cancer_type][prediction_type]
+            model_wrapper = self._get_model_info(cancer_type, prediction_type)
             if not model_wrapper:
                 raise ValueError(f"{cancer_type} {prediction_type} 모델이 없습니다.")
-            
-            # 래핑된 모델에서 전처리 구성 요소 추출
-            feature_names = model_wrapper.get('feature_names', [])
-            scaler = model_wrapper.get('scaler')
-            label_encoders = model_wrapper.get('label_encoders', {})
-            num_imputer = model_wrapper.get('num_imputer')
-            
-            logger.info(f"모델 전처리 정보:")
-            logger.info(f"  - 특성 수: {len(feature_names)}")
-            logger.info(f"  - Scaler: {scaler is not None}")
-            logger.info(f"  - Label Encoders: {len(label_encoders)}")
-            logger.info(f"  - Imputer: {num_imputer is not None}")
-            
-            # 1. 기본 환자 데이터 준비
-            patient_data = self._prepare_prediction_data(clinical_data, cancer_type)
-            
-            # 2. 모델 특성에 맞춰 DataFrame 생성
-            patient_processed = pd.DataFrame(index=[0])
-            
-            for feature_name in feature_names:
-                if feature_name in patient_data.columns:
-                    patient_processed[feature_name] = patient_data[feature_name].iloc[0]
-                else:
-                    # 기본값 설정 (암종별로 다르게)
-                    default_value = self._get_feature_default_by_cancer(feature_name, cancer_type)
-                    patient_processed[feature_name] = default_value
-                    logger.debug(f"특성 {feature_name}: 기본값 {default_value} 사용")
-            
-            # 3. 범주형 변수 인코딩 (모델별 인코더 사용)
-            for col, encoder in label_encoders.items():
-                if col in patient_processed.columns:
-                    try:
-                        original_value = patient_processed[col].iloc[0]
-                        
-                        if pd.isna(original_value) or str(original_value) == 'nan':
-                            # 결측치는 첫 번째 클래스로 대체
-                            encoded_value = encoder.transform([encoder.classes_[0]])[0]
-                            patient_processed[col] = float(encoded_value)
-                        else:
-                            str_value = str(original_value)
-                            if str_value in encoder.classes_:
-                                encoded_value = encoder.transform([str_value])[0]
-                                patient_processed[col] = float(encoded_value)
-                            else:
-                                # 새로운 카테고리는 첫 번째 클래스로 대체
-                                encoded_value = encoder.transform([encoder.classes_[0]])[0]
-                                patient_processed[col] = float(encoded_value)
-                                logger.warning(f"새로운 카테고리 '{str_value}' -> '{encoder.classes_[0]}'")
-                                
-                    except Exception as e:
-                        logger.error(f"인코딩 실패 {col}: {e}")
-                        patient_processed[col] = 0.0
-            
-            # 4. 모든 컬럼을 수치형으로 변환
-            for col in patient_processed.columns:
-                patient_processed[col] = pd.to_numeric(patient_processed[col], errors='coerce').fillna(0.0)
-            
-            # 5. 특성 순서 정렬
-            patient_processed = patient_processed[feature_names]
-            
-            # 6. Imputer 적용하지 않음 (모델 생성 시 사용했지만 실제로는 적용하지 않음)
-            # if num_imputer is not None:
-            #     try:
-            #         patient_values = patient_processed.values
-            #         imputed_values = num_imputer.transform(patient_values)
-            #         patient_processed = pd.DataFrame(
-            #             imputed_values,
-            #             columns=feature_names,
-            #             index=patient_processed.index
-            #         )
-            #         logger.debug("Imputer 적용 완료")
-            #     except Exception as e:
-            #         logger.warning(f"Imputer 적용 실패: {e}")
-            
-            # 7. Scaler 적용 (모델별)
-            if scaler is not None:
-                try:
-                    patient_values = patient_processed.values
-                    scaled_values = scaler.transform(patient_values)
-                    patient_processed = pd.DataFrame(
-                        scaled_values,
-                        columns=feature_names,
-                        index=patient_processed.index
-                    )
-                    logger.debug("Scaler 적용 완료")
-                except Exception as e:
-                    logger.warning(f"Scaler 적용 실패: {e}")
-            
-            logger.info(f"최종 전처리 완료: {patient_processed.shape}")
-            return patient_processed
-            
+
+            feature_plan = model_wrapper['feature_plan']
+            matrix = feature_plan.encode(records)
+
+            logger.debug(f"최종 전처리 완료: {matrix.shape}")
+            return feature_plan.to_frame(matrix)
+
         except Exception as e:
             logger.error(f"환자 데이터 전처리 실패: {e}")
             raise
@@ -539,6 +854,10 @@ class ClinicalPredictionService:
     
     def _prepare_prediction_data(self, clinical_data, cancer_type):
         """암종별 예측용 데이터 준비"""
+        return pd.DataFrame([self._prepare_prediction_record(clinical_data, cancer_type)])
+
+    def _prepare_prediction_record(self, clinical_data, cancer_type):
+        """암종별 예측용 레코드(dict) 준비"""
         try:
             required_fields = self.cancer_fields[cancer_type]
             defaults = self.cancer_defaults[cancer_type]
@@ -546,7 +865,7 @@ class ClinicalPredictionService:
             processed_data = {
                 'vital_status': getattr(clinical_data, 'vital_status', 'Alive'),
                 'age_at_diagnosis': getattr(clinical_data, 'age_at_diagnosis', 60),
-                'gender': getattr(clinical_data, 'gender', 'male').lower(),
+                'gender': (getattr(clinical_data, 'gender', None) or 'male').lower(),
                 'year_of_diagnosis': getattr(clinical_data, 'year_of_diagnosis', 2020)
             }
             
@@ -565,7 +884,8 @@ class ClinicalPredictionService:
             if not processed_data.get('year_of_diagnosis'):
                 raise ValueError("year_of_diagnosis 필드가 필수입니다.")
             
-            return pd.DataFrame([processed_data])
+            processed_data.setdefault('days_to_death', None)
+            return processed_data
             
         except Exception as e:
             logger.error(f"예측 데이터 준비 오류: {e}")
@@ -596,10 +916,14 @@ class ClinicalPredictionService:
         if data is None or data.empty:
             return None
         
-        model_info = self.models[cancer_type][prediction_type]
+        model_info = self._get_model_info(cancer_type, prediction_type)
         if not model_info:
             return None
         
+        return self._preprocess_data_with(model_info, data, cancer_type, prediction_type)
+    
+    def _preprocess_data_with(self, model_info, data, cancer_type, prediction_type):
+        """_preprocess_data의 인코딩 (생존 섀도 모델도 운영 생존 모델과 같은 방식으로 인코딩하도록 분리)"""
         processed_data = data.copy()
         
         if model_info.get('feature_names'):
@@ -628,20 +952,24 @@ class ClinicalPredictionService:
         return processed_data
     
     def predict_survival(self, patient_id=None, patient_name=None):
+        clinical_data, cancer_type = self._resolve_prediction_input(patient_id, patient_name)
+        return self._predict_survival_for(clinical_data, cancer_type, patient_id, patient_name)
+    
+    def _predict_survival_for(self, clinical_data, cancer_type, patient_id=None, patient_name=None, record=None, shadow_files=None):
+        """생존 예측 (조회된 임상 데이터 사용)"""
         try:
-            clinical_data = self._get_patient_clinical_data(patient_id, patient_name)
-            cancer_type = self._determine_cancer_type(clinical_data)
-            
             logger.info(f"생존율 예측 시작 - 환자: {patient_name}, 암종: {cancer_type}")
             
-            model_info = self.models[cancer_type]['survival']
+            model_info = self._get_model_info(cancer_type, 'survival')
             if not model_info:
                 raise ValueError(f"{cancer_type} 생존 예측 모델을 사용할 수 없습니다.")
             
             model = model_info['model'] if isinstance(model_info, dict) else model_info
             logger.info(f"모델 타입: {type(model)}")
             
-            patient_data = self._prepare_prediction_data(clinical_data, cancer_type)
+            if record is None:
+                record = self._prepare_prediction_record(clinical_data, cancer_type)
+            patient_data = pd.DataFrame([record])
             processed_data = self._preprocess_data(patient_data, cancer_type, 'survival')
             
             if processed_data is None:
@@ -652,36 +980,30 @@ class ClinicalPredictionService:
             try:
                 if hasattr(model, 'predict_survival_function'):
                     logger.info("RSF 모델로 예측 수행")
-                    survival_functions = model.predict_survival_function(processed_data)
-                    
-                    try:
-                        survival_prob_1year = float(survival_functions[0](365))
-                    except:
-                        survival_prob_1year = 0.8
-                    
-                    try:
-                        survival_prob_3year = float(survival_functions[0](1095))
-                    except:
-                        survival_prob_3year = 0.6
-                    
-                    try:
-                        survival_prob_5year = float(survival_functions[0](1825))
-                    except:
-                        survival_prob_5year = 0.4
+                    survival_curves = self._evaluate_survival_curves(model, processed_data)
                     
                     try:
+                        started = time.perf_counter()
                         risk_scores = model.predict(processed_data)
                         risk_score = float(risk_scores[0])
+                        self._submit_shadow(cancer_type, 'survival', model_info, clinical_data, record,
+                                            risk_scores[:1], time.perf_counter() - started, shadow_files)
                     except:
                         risk_score = 0.3
                     
-                    try:
-                        median_survival = self._calculate_median_survival(survival_functions[0])
-                    except:
-                        median_survival = 1500
+                    survival_summary = survival_curves.summary(0)
+                    survival_prob_1year = survival_summary['survival_probabilities']['1_year']
+                    survival_prob_3year = survival_summary['survival_probabilities']['3_year']
+                    survival_prob_5year = survival_summary['survival_probabilities']['5_year']
+                    median_survival = survival_summary['median_survival_days']
+                    survival_curve = survival_summary['survival_curve']
                 elif hasattr(model, 'predict_proba'):
                     logger.info("분류 모델로 예측 수행")
-                    prediction_proba = model.predict_proba(processed_data)
+                    prediction_proba, inference_seconds = self._predict_proba_batched(
+                        cancer_type, 'survival', model, processed_data
+                    )
+                    self._submit_shadow(cancer_type, 'survival', model_info, clinical_data, record,
+                                        prediction_proba[0], inference_seconds, shadow_files)
                     survival_prob = float(prediction_proba[0][1]) if len(prediction_proba[0]) > 1 else 0.5
                     risk_score = float(1 - survival_prob)
                     
@@ -689,6 +1011,7 @@ class ClinicalPredictionService:
                     survival_prob_3year = float(min(survival_prob_5year * 1.1, 1.0))
                     survival_prob_1year = float(min(survival_prob_5year * 1.2, 1.0))
                     median_survival = int((1 - risk_score) * 2000)
+                    survival_curve = None
                 else:
                     logger.warning("알 수 없는 모델 타입, 기본 예측 사용")
                     survival_prob_1year = 0.8
@@ -696,6 +1019,7 @@ class ClinicalPredictionService:
                     survival_prob_5year = 0.4
                     risk_score = 0.3
                     median_survival = 1500
+                    survival_curve = None
                 
                 xai_explanation = self._generate_xai_explanation(
                     model_info, processed_data, cancer_type, 'survival', patient_data
@@ -730,6 +1054,7 @@ class ClinicalPredictionService:
                     'risk_score': float(risk_score),
                     'median_survival_days': int(median_survival) if median_survival else None,
                     'median_survival_months': float(median_survival / 30.44) if median_survival else None,
+                    'survival_curve': survival_curve,
                     'confidence': 0.85,
                     'xai_explanation': xai_explanation,
                     'clinical_data_summary': self._get_clinical_summary(clinical_data, cancer_type)
@@ -765,17 +1090,19 @@ class ClinicalPredictionService:
     
     def predict_risk_classification(self, patient_id=None, patient_name=None):
         """위험도 분류 예측 (모델별 전처리 적용)"""
+        clinical_data, cancer_type = self._resolve_prediction_input(patient_id, patient_name)
+        return self._predict_risk_for(clinical_data, cancer_type, patient_id, patient_name)
+    
+    def _predict_risk_for(self, clinical_data, cancer_type, patient_id=None, patient_name=None, record=None, shadow_files=None):
+        """위험도 분류 예측 (조회된 임상 데이터 사용)"""
         try:
-            clinical_data = self._get_patient_clinical_data(patient_id, patient_name)
-            cancer_type = self._determine_cancer_type(clinical_data)
-            
-            model_info = self.models[cancer_type]['risk']
+            model_info = self._get_model_info(cancer_type, 'risk')
             if not model_info:
                 raise ValueError(f"{cancer_type} 위험도 분류 모델을 사용할 수 없습니다.")
             
             # 🔥 중요: 모델별 전처리 사용
             processed_data = self._preprocess_patient_data_for_model(
-                clinical_data, cancer_type, 'risk'
+                clinical_data, cancer_type, 'risk', record=record
             )
             
             if processed_data is None:
@@ -785,11 +1112,13 @@ class ClinicalPredictionService:
             classes = model_info.get('class_labels', ['Low Risk', 'High Risk'])
             
             if hasattr(model, 'predict_proba'):
-                probabilities = model.predict_proba(processed_data)
+                probabilities, inference_seconds = self._predict_proba_batched(
+                    cancer_type, 'risk', self._get_proba_model(model_info), processed_data
+                )
+                self._submit_shadow(cancer_type, 'risk', model_info, clinical_data, record,
+                                    probabilities[0], inference_seconds, shadow_files)
                 risk_probabilities = probabilities[0]
-                predicted_class_idx = np.argmax(risk_probabilities)
-                predicted_class = classes[predicted_class_idx] if predicted_class_idx < len(classes) else classes[0]
-                confidence = float(risk_probabilities[predicted_class_idx])
+                predicted_class, confidence = self._summarize_risk_probabilities(risk_probabilities, classes)
             else:
                 prediction = model.predict(processed_data)
                 predicted_class_idx = int(prediction[0])
@@ -808,10 +1137,7 @@ class ClinicalPredictionService:
                 'cancer_type': cancer_type,
                 'prediction_type': 'risk_classification',
                 'predicted_risk_class': predicted_class,
-                'risk_probabilities': {
-                    'low_risk': float(risk_probabilities[0]) if len(risk_probabilities) > 0 else 0.5,
-                    'high_risk': float(risk_probabilities[1]) if len(risk_probabilities) > 1 else 0.5
-                },
+                'risk_probabilities': self._format_risk_probabilities(risk_probabilities),
                 'confidence': confidence,
                 'risk_factors': self._analyze_risk_factors(processed_data, model),
                 'xai_explanation': xai_explanation,
@@ -824,17 +1150,19 @@ class ClinicalPredictionService:
     
     def predict_treatment_effect(self, patient_id=None, patient_name=None):
         """치료 효과 예측 (모델별 전처리 적용)"""
+        clinical_data, cancer_type = self._resolve_prediction_input(patient_id, patient_name)
+        return self._predict_treatment_for(clinical_data, cancer_type, patient_id, patient_name)
+    
+    def _predict_treatment_for(self, clinical_data, cancer_type, patient_id=None, patient_name=None, record=None, shadow_files=None):
+        """치료 효과 예측 (조회된 임상 데이터 사용)"""
         try:
-            clinical_data = self._get_patient_clinical_data(patient_id, patient_name)
-            cancer_type = self._determine_cancer_type(clinical_data)
-            
-            model_info = self.models[cancer_type]['treatment']
+            model_info = self._get_model_info(cancer_type, 'treatment')
             if not model_info:
                 return self._predict_treatment_clinical_guidelines(clinical_data, cancer_type)
             
             # 🔥 중요: 모델별 전처리 사용
             processed_data = self._preprocess_patient_data_for_model(
-                clinical_data, cancer_type, 'treatment'
+                clinical_data, cancer_type, 'treatment', record=record
             )
             
             if processed_data is None:
@@ -844,19 +1172,12 @@ class ClinicalPredictionService:
             treatment_options = model_info.get('treatment_options', ['수술', '화학요법', '방사선치료', '표적치료'])
             
             if hasattr(model, 'predict_proba'):
-                probabilities = model.predict_proba(processed_data)
-                treatment_probabilities = probabilities[0]
-                
-                treatment_effects = {}
-                for i, treatment in enumerate(treatment_options):
-                    if i < len(treatment_probabilities):
-                        effectiveness = float(treatment_probabilities[i]) * 100
-                        treatment_effects[treatment] = {
-                            'effectiveness': effectiveness,
-                            'confidence': 0.85,
-                            'side_effects_risk': max(5, min(80, 100 - effectiveness)),
-                            'recommendation_score': effectiveness * 0.85
-                        }
+                probabilities, inference_seconds = self._predict_proba_batched(
+                    cancer_type, 'treatment', self._get_proba_model(model_info), processed_data
+                )
+                self._submit_shadow(cancer_type, 'treatment', model_info, clinical_data, record,
+                                    probabilities[0], inference_seconds, shadow_files)
+                treatment_effects = self._treatment_effects_from_probabilities(probabilities[0], treatment_options)
             else:
                 return self._predict_treatment_clinical_guidelines(clinical_data, cancer_type)
             
@@ -890,34 +1211,364 @@ class ClinicalPredictionService:
             logger.error(f"치료 효과 예측 오류: {e}")
             raise
     
-    def _predict_treatment_clinical_guidelines(self, clinical_data, cancer_type):
-        age = getattr(clinical_data, 'age_at_diagnosis', 65)
-        stage = getattr(clinical_data, 'ajcc_pathologic_stage', 'Stage II')
-        tumor_grade = getattr(clinical_data, 'tumor_grade', 'G2')
-        
-        base_effects = {
-            'liver': {'수술': 75.0, '화학요법': 45.0, '방사선치료': 35.0, '표적치료': 55.0},
-            'kidney': {'수술': 85.0, '화학요법': 35.0, '방사선치료': 25.0, '표적치료': 65.0},
-            'stomach': {'수술': 70.0, '화학요법': 50.0, '방사선치료': 40.0, '표적치료': 45.0}
+    def predict_all(self, patient_id=None, patient_name=None, created_by=None):
+        """
+        생존/위험도/치료 효과 통합 예측.
+        
+        (환자, 임상 데이터 리비전, 모델 버전)이 같으면 캐시 -> DB(ClinicalPredictionResult) 순으로
+        저장된 결과를 반환하고, 둘 다 없을 때만 모델을 실행합니다.
+        """
+        clinical_data, cancer_type = self._resolve_prediction_input(patient_id, patient_name)
+        
+        revision = self._get_clinical_data_revision(clinical_data)
+        model_versions = {
+            slot: self._get_model_version(cancer_type, slot)
+            for slot, _ in self.PREDICT_ALL_TYPES.values()
+        }
+        cache_key = self._get_result_cache_key(clinical_data.patient_id)
+        
+        cached = self._cache_get(cache_key)
+        if cached and cached.get('revision') == revision and cached.get('model_versions') == model_versions:
+            logger.info(f"통합 예측 캐시 사용: {cache_key} ({revision})")
+            return cached['results']
+        
+        results = self._load_persisted_results(revision, cancer_type, model_versions)
+        if results is None:
+            results = self._run_all_predictions(clinical_data, cancer_type, patient_id, patient_name)
+            if any('error' in result for result in results.values()):
+                # 일부 모델 실패 결과는 저장하지 않고 다음 요청에서 다시 시도
+                return results
+            results = json.loads(json.dumps(results, cls=DjangoJSONEncoder))
+            self._persist_results(clinical_data, cancer_type, revision, model_versions, results, created_by)
+        else:
+            logger.info(f"통합 예측 DB 결과 사용: {revision}")
+        
+        self._cache_set(
+            cache_key,
+            {'revision': revision, 'model_versions': model_versions, 'results': results},
+            getattr(settings, 'CLINICAL_PREDICTION_RESULT_CACHE_TTL', 60 * 60 * 24 * 7)
+        )
+        return results
+    
+    def invalidate_patient_predictions(self, patient_pk):
+        """환자의 통합 예측 캐시 삭제 (임상 데이터 저장/삭제 시그널에서 호출)"""
+        self._cache_delete(self._get_result_cache_key(patient_pk))
+    
+    def _get_result_cache_key(self, patient_pk):
+        return f"clinical_prediction:all:{patient_pk}"
+    
+    def _get_clinical_data_revision(self, clinical_data):
+        """임상 데이터 리비전 (기록 pk + 수정 시각)"""
+        updated_at = getattr(clinical_data, 'updated_at', None)
+        return f"{clinical_data.pk}:{updated_at.isoformat() if updated_at else ''}"
+    
+    def _run_all_predictions(self, clinical_data, cancer_type, patient_id=None, patient_name=None):
+        """
+        한 번 조회/준비한 임상 레코드로 세 모델을 동시에 실행.
+        
+        모델별 제한 시간(CLINICAL_PREDICTION_MODEL_TIMEOUTS)이 지나면 해당 결과만 오류로 반환하므로
+        응답 시간은 세 모델의 합이 아니라 가장 느린 모델에 가까워집니다.
+        (작업 스레드는 ORM에 접근하지 않고 이미 조회된 임상 데이터만 사용)
+        """
+        try:
+            record = self._prepare_prediction_record(clinical_data, cancer_type)
+        except Exception as e:
+            return {result_key: {'error': str(e)} for result_key in self.PREDICT_ALL_TYPES}
+        
+        timeouts = getattr(settings, 'CLINICAL_PREDICTION_MODEL_TIMEOUTS', {})
+        default_timeout = getattr(settings, 'CLINICAL_PREDICTION_MODEL_TIMEOUT', 30)
+        started = time.monotonic()
+        
+        # 섀도 설정(DB)은 요청 스레드에서 한 번 조회해 넘김
+        shadow_files = {
+            slot: self._get_shadow_model_file(cancer_type, slot) for slot, _ in self.PREDICT_ALL_TYPES.values()
         }
         
+        futures = {}
+        for result_key, (slot, method_name) in self.PREDICT_ALL_TYPES.items():
+            # 모델마다 레코드 사본을 넘겨 전처리 중 서로 영향을 주지 않도록 함
+            futures[result_key] = self._predict_executor.submit(
+                getattr(self, method_name), clinical_data, cancer_type, patient_id, patient_name, dict(record),
+                shadow_files
+            )
+        
+        results = {}
+        for result_key, future in futures.items():
+            slot = self.PREDICT_ALL_TYPES[result_key][0]
+            timeout = timeouts.get(slot, default_timeout)
+            try:
+                results[result_key] = future.result(timeout=max(0, started + timeout - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                logger.error(f"{cancer_type} {slot} 예측 시간 초과 ({timeout}s)")
+                results[result_key] = {'error': f'예측 시간 초과 ({timeout}초)'}
+            except Exception as e:
+                results[result_key] = {'error': str(e)}
+        
+        logger.info(f"통합 예측 완료: {cancer_type} ({time.monotonic() - started:.2f}s)")
+        return results
+    
+    def _load_persisted_results(self, revision, cancer_type, model_versions):
+        """같은 리비전/모델 버전으로 저장된 예측 결과가 모두 있으면 반환"""
+        ClinicalPredictionResult = apps.get_model('clinical_prediction', 'ClinicalPredictionResult')
+        result_keys = {slot: result_key for result_key, (slot, _) in self.PREDICT_ALL_TYPES.items()}
+        
+        results = {}
+        rows = ClinicalPredictionResult.objects.filter(
+            clinical_data_revision=revision, cancer_type=cancer_type
+        ).order_by('-created_at')
+        for row in rows:
+            if row.prediction_type in result_keys and row.model_version == model_versions.get(row.prediction_type):
+                results.setdefault(result_keys[row.prediction_type], row.prediction_result)
+        
+        return results if len(results) == len(self.PREDICT_ALL_TYPES) else None
+    
+    def _persist_results(self, clinical_data, cancer_type, revision, model_versions, results, created_by=None):
+        ClinicalPredictionResult = apps.get_model('clinical_prediction', 'ClinicalPredictionResult')
+        patient = clinical_data.patient
+        try:
+            ClinicalPredictionResult.objects.bulk_create([
+                ClinicalPredictionResult(
+                    patient_id=patient.openemr_id or str(patient.pk),
+                    patient_name=patient.name,
+                    cancer_type=cancer_type,
+                    prediction_type=slot,
+                    prediction_result=results[result_key],
+                    confidence_score=float(
+                        results[result_key].get('confidence') or results[result_key].get('overall_confidence') or 0.0
+                    ),
+                    model_version=model_versions[slot],
+                    clinical_data_revision=revision,
+                    created_by=created_by
+                )
+                for result_key, (slot, _) in self.PREDICT_ALL_TYPES.items()
+            ])
+        except Exception as e:
+            logger.warning(f"통합 예측 결과 저장 실패 ({revision}): {e}")
+    
+    def predict_batch(self, patient_ids=None, cancer_type=None, prediction_types=None):
+        """코호트 일괄 예측 - 임상 데이터를 한 번에 조회하고 암종별로 묶어 모델당 한 번만 추론"""
+        prediction_types = prediction_types or list(self.BATCH_PREDICTION_TYPES)
+        clinical_records = self._get_cohort_clinical_data(patient_ids, cancer_type)
+
+        groups = {}
+        for clinical_data in clinical_records:
+            groups.setdefault(self._determine_cancer_type(clinical_data), []).append(clinical_data)
+
+        results = []
+        for group_cancer_type, group in groups.items():
+            group_results = [
+                {
+                    'patient_id': str(clinical_data.patient.openemr_id),
+                    'patient_name': clinical_data.patient.name,
+                    'cancer_type': group_cancer_type
+                }
+                for clinical_data in group
+            ]
+
+            for prediction_type in prediction_types:
+                result_key, predict_group = self.BATCH_PREDICTION_TYPES[prediction_type]
+                try:
+                    outputs = getattr(self, predict_group)(group, group_cancer_type)
+                except Exception as e:
+                    logger.error(f"일괄 예측 실패 ({group_cancer_type}-{prediction_type}): {e}")
+                    outputs = [{'error': str(e)}] * len(group)
+
+                for patient_result, output in zip(group_results, outputs):
+                    patient_result[result_key] = output
+
+            results.extend(group_results)
+
+        found_ids = {result['patient_id'] for result in results}
+        missing_ids = [str(pid) for pid in (patient_ids or []) if str(pid) not in found_ids]
+
+        return {
+            'count': len(results),
+            'cancer_type_counts': {ct: len(group) for ct, group in groups.items()},
+            'results': results,
+            'missing_patient_ids': missing_ids
+        }
+
+    def _predict_survival_group(self, clinical_records, cancer_type):
+        """같은 암종 환자들의 생존 예측 (모델 호출 1회)"""
+        model_info = self._get_model_info(cancer_type, 'survival')
+        if not model_info:
+            raise ValueError(f"{cancer_type} 생존 예측 모델을 사용할 수 없습니다.")
+        model = model_info['model']
+
+        patient_data = pd.DataFrame.from_records(
+            [self._prepare_prediction_record(clinical_data, cancer_type) for clinical_data in clinical_records]
+        )
+        processed_data = self._preprocess_data(patient_data, cancer_type, 'survival')
+        if processed_data is None:
+            raise ValueError("생존 예측용 데이터 전처리에 실패했습니다.")
+
+        if hasattr(model, 'predict_survival_function'):
+            survival_curves = self._evaluate_survival_curves(model, processed_data)
+            try:
+                risk_scores = [float(score) for score in model.predict(processed_data)]
+            except Exception:
+                risk_scores = [0.3] * len(clinical_records)
+
+            outputs = []
+            for index, risk_score in enumerate(risk_scores):
+                summary = survival_curves.summary(index)
+                summary['risk_score'] = risk_score
+                outputs.append(summary)
+            return outputs
+
+        if hasattr(model, 'predict_proba'):
+            probabilities = model.predict_proba(processed_data)
+            outputs = []
+            for row in probabilities:
+                survival_prob = float(row[1]) if len(row) > 1 else 0.5
+                survival_prob_5year = float(max(0.1, survival_prob))
+                outputs.append({
+                    'survival_probabilities': {
+                        '1_year': float(min(survival_prob_5year * 1.2, 1.0)),
+                        '3_year': float(min(survival_prob_5year * 1.1, 1.0)),
+                        '5_year': survival_prob_5year
+                    },
+                    'risk_score': float(1 - survival_prob),
+                    'median_survival_days': int(survival_prob * 2000)
+                })
+            return outputs
+
+        raise ValueError(f"{cancer_type} 생존 모델이 일괄 예측을 지원하지 않습니다.")
+
+    def _predict_risk_group(self, clinical_records, cancer_type):
+        """같은 암종 환자들의 위험도 분류 (모델 호출 1회)"""
+        model_info = self._get_model_info(cancer_type, 'risk')
+        if not model_info:
+            raise ValueError(f"{cancer_type} 위험도 분류 모델을 사용할 수 없습니다.")
+        model = model_info['model']
+        classes = model_info.get('class_labels', ['Low Risk', 'High Risk'])
+
+        if not hasattr(model, 'predict_proba'):
+            raise ValueError(f"{cancer_type} 위험도 모델이 predict_proba를 지원하지 않습니다.")
+
+        processed_data = self._preprocess_batch_for_model(clinical_records, cancer_type, 'risk')
+        probabilities = self._get_proba_model(model_info).predict_proba(processed_data)
+
+        outputs = []
+        for risk_probabilities in probabilities:
+            predicted_class, confidence = self._summarize_risk_probabilities(risk_probabilities, classes)
+            outputs.append({
+                'predicted_risk_class': predicted_class,
+                'risk_probabilities': self._format_risk_probabilities(risk_probabilities),
+                'confidence': confidence
+            })
+        return outputs
+
+    def _predict_treatment_group(self, clinical_records, cancer_type):
+        """같은 암종 환자들의 치료 효과 예측 (모델 호출 1회, 모델이 없으면 가이드라인)"""
+        model_info = self._get_model_info(cancer_type, 'treatment')
+        model = model_info['model'] if model_info else None
+
+        if model is None or not hasattr(model, 'predict_proba'):
+            # 환자 전체를 규칙 엔진으로 한 번에 점수화
+            return [
+                {
+                    'treatment_effects': treatment_effects,
+                    'recommended_treatment': self._recommend_treatment(treatment_effects),
+                    'source': 'clinical_guidelines'
+                }
+                for treatment_effects in self._score_treatment_guidelines(clinical_records, cancer_type)
+            ]
+
+        treatment_options = model_info.get('treatment_options', ['수술', '화학요법', '방사선치료', '표적치료'])
+        processed_data = self._preprocess_batch_for_model(clinical_records, cancer_type, 'treatment')
+        probabilities = self._get_proba_model(model_info).predict_proba(processed_data)
+
+        outputs = []
+        for treatment_probabilities in probabilities:
+            treatment_effects = self._treatment_effects_from_probabilities(treatment_probabilities, treatment_options)
+            best_treatment = max(treatment_effects.items(), key=lambda x: x[1]['effectiveness'])
+            outputs.append({
+                'treatment_effects': treatment_effects,
+                'recommended_treatment': {
+                    'primary': best_treatment[0],
+                    'effectiveness': best_treatment[1]['effectiveness'],
+                    'confidence': best_treatment[1]['confidence']
+                },
+                'source': 'model'
+            })
+        return outputs
+
+    def _evaluate_survival_curves(self, model, processed_data):
+        """환자 전체의 생존 곡선을 설정된 공통 시간 격자에서 한 번에 계산"""
+        return evaluate_survival_curves(
+            model, processed_data,
+            step_days=getattr(settings, 'CLINICAL_PREDICTION_SURVIVAL_CURVE_STEP_DAYS', 30),
+            horizon_days=getattr(settings, 'CLINICAL_PREDICTION_SURVIVAL_CURVE_HORIZON_DAYS', 3650)
+        )
+
+    def _predict_proba_batched(self, cancer_type, prediction_type, model, processed_data):
+        """
+        단건 predict_proba를 마이크로 배처를 통해 실행 (동시 요청과 합쳐 한 번에 추론)
+        같은 모델 객체의 요청끼리만 합치므로 재로드/LRU 교체나 컴파일/원본 모델이 섞여도 다른 모델로 추론되지 않음
+        (확률, 추론 시간(초)) 반환 - 섀도 비교 지연시간은 배치 창 대기 시간을 빼고 추론 시간만 기록
+        """
+        return self.micro_batcher.run_timed(
+            (cancer_type, prediction_type, 'predict_proba', id(model)), processed_data, model.predict_proba
+        )
+
+    def _summarize_risk_probabilities(self, risk_probabilities, classes):
+        predicted_class_idx = int(np.argmax(risk_probabilities))
+        predicted_class = classes[predicted_class_idx] if predicted_class_idx < len(classes) else classes[0]
+        return predicted_class, float(risk_probabilities[predicted_class_idx])
+
+    def _format_risk_probabilities(self, risk_probabilities):
+        return {
+            'low_risk': float(risk_probabilities[0]) if len(risk_probabilities) > 0 else 0.5,
+            'high_risk': float(risk_probabilities[1]) if len(risk_probabilities) > 1 else 0.5
+        }
+
+    def _treatment_effects_from_probabilities(self, treatment_probabilities, treatment_options):
         treatment_effects = {}
-        for treatment, base_effect in base_effects[cancer_type].items():
-            age_factor = 0.85 if age > 70 else (1.1 if age < 50 else 1.0)
-            stage_factor = self._get_stage_factor(stage)
-            grade_factor = self._get_grade_factor(tumor_grade)
-            
-            final_effectiveness = base_effect * age_factor * stage_factor * grade_factor
-            final_effectiveness = max(10, min(95, final_effectiveness))
-            
-            treatment_effects[treatment] = {
-                'effectiveness': round(final_effectiveness, 1),
-                'confidence': round(0.75 + np.random.uniform(0, 0.2), 2),
-                'side_effects_risk': round(max(5, min(80, 100 - final_effectiveness)), 1),
-                'recommendation_score': round(final_effectiveness * 0.8, 1)
+        for i, treatment in enumerate(treatment_options):
+            if i < len(treatment_probabilities):
+                effectiveness = float(treatment_probabilities[i]) * 100
+                treatment_effects[treatment] = {
+                    'effectiveness': effectiveness,
+                    'confidence': 0.85,
+                    'side_effects_risk': max(5, min(80, 100 - effectiveness)),
+                    'recommendation_score': effectiveness * 0.85
+                }
+        return treatment_effects
+
+    def _score_treatment_guidelines(self, clinical_records, cancer_type):
+        """가이드라인 규칙으로 환자별 치료 효과 계산 (환자 전체를 한 번의 벡터 연산으로)"""
+        scores = self.guideline_engine.score(
+            cancer_type,
+            ages=[getattr(clinical_data, 'age_at_diagnosis', None) for clinical_data in clinical_records],
+            stages=[getattr(clinical_data, 'ajcc_pathologic_stage', None) for clinical_data in clinical_records],
+            grades=[getattr(clinical_data, 'tumor_grade', None) for clinical_data in clinical_records]
+        )
+        treatments = self.guideline_engine.treatments
+        return [
+            {
+                treatment: {
+                    'effectiveness': float(scores['effectiveness'][row, column]),
+                    'confidence': float(scores['confidence'][row, column]),
+                    'side_effects_risk': float(scores['side_effects_risk'][row, column]),
+                    'recommendation_score': float(scores['recommendation_score'][row, column])
+                }
+                for column, treatment in enumerate(treatments)
             }
-        
+            for row in range(len(clinical_records))
+        ]
+    
+    def _recommend_treatment(self, treatment_effects):
         best_treatment = max(treatment_effects.items(), key=lambda x: x[1]['effectiveness'])
+        return {
+            'primary': best_treatment[0],
+            'effectiveness': best_treatment[1]['effectiveness'],
+            'confidence': best_treatment[1]['confidence']
+        }
+    
+    def _predict_treatment_clinical_guidelines(self, clinical_data, cancer_type):
+        treatment_effects = self._score_treatment_guidelines([clinical_data], cancer_type)[0]
         
         return {
             'patient_id': getattr(clinical_data, 'patient_id', None),
@@ -925,41 +1576,16 @@ class ClinicalPredictionService:
             'cancer_type': cancer_type,
             'prediction_type': 'treatment_effect',
             'treatment_effects': treatment_effects,
-            'recommended_treatment': {
-                'primary': best_treatment[0],
-                'effectiveness': best_treatment[1]['effectiveness'],
-                'confidence': best_treatment[1]['confidence']
-            },
+            'recommended_treatment': self._recommend_treatment(treatment_effects),
             'treatment_ranking': sorted(treatment_effects.items(), 
                                       key=lambda x: x[1]['recommendation_score'], 
                                       reverse=True),
-            'overall_confidence': 0.80,
+            'overall_confidence': self.guideline_engine.overall_confidence,
+            'guideline_version': self.guideline_engine.version,
             'xai_explanation': None,
             'clinical_data_summary': self._get_clinical_summary(clinical_data, cancer_type)
         }
     
-    def _get_stage_factor(self, stage):
-        if 'I' in str(stage):
-            return 1.2
-        elif 'II' in str(stage):
-            return 1.0
-        elif 'III' in str(stage):
-            return 0.7
-        elif 'IV' in str(stage):
-            return 0.4
-        return 1.0
-    
-    def _get_grade_factor(self, grade):
-        if 'G1' in str(grade):
-            return 1.1
-        elif 'G2' in str(grade):
-            return 1.0
-        elif 'G3' in str(grade):
-            return 0.9
-        elif 'G4' in str(grade):
-            return 0.7
-        return 1.0
-    
     def _analyze_risk_factors(self, processed_data, model):
         try:
             if hasattr(model, 'feature_importances_'):
@@ -982,20 +1608,6 @@ class ClinicalPredictionService:
         
         return []
     
-    def _calculate_median_survival(self, survival_function):
-        try:
-            times = np.arange(1, 3650)
-            for t in times:
-                try:
-                    if survival_function(t) <= 0.5:
-                        return int(t)
-                except:
-                    continue
-            return 1800
-        except Exception as e:
-            logger.error(f"중앙 생존기간 계산 오류: {e}")
-            return 1500
-    
     def _get_clinical_summary(self, clinical_data, cancer_type):
         summary = {
             'cancer_type': cancer_type,
@@ -0,0 +1,266 @@
+# clinical_prediction/services/shadow_scoring.py
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowJob:
+    """운영 모델 결과 한 건과 같은 입력으로 후보(섀도) 모델을 실행할 작업"""
+    __slots__ = ('cancer_type', 'prediction_type', 'shadow_file', 'record',
+                 'live_output', 'live_latency_ms', 'live_version', 'created_at')
+
+    def __init__(self, cancer_type, prediction_type, shadow_file, record, live_output, live_latency_ms, live_version):
+        self.cancer_type = cancer_type
+        self.prediction_type = prediction_type
+        self.shadow_file = shadow_file
+        self.record = record
+        self.live_output = np.asarray(live_output, dtype=np.float32).ravel()
+        self.live_latency_ms = live_latency_ms
+        self.live_version = live_version
+        self.created_at = time.time()
+
+
+class _LogBuffer:
+    """(슬롯, 운영 버전, 섀도 버전)별로 모아 두었다가 npz 파일 하나로 기록하는 열 단위 버퍼"""
+
+    def __init__(self):
+        self.timestamps = []
+        self.live_outputs = []
+        self.shadow_outputs = []
+        self.live_latency_ms = []
+        self.shadow_latency_ms = []
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def to_arrays(self):
+        return {
+            'timestamp': np.asarray(self.timestamps, dtype=np.float64),
+            'live_output': np.vstack(self.live_outputs).astype(np.float32),
+            'shadow_output': np.vstack(self.shadow_outputs).astype(np.float32),
+            'live_latency_ms': np.asarray(self.live_latency_ms, dtype=np.float32),
+            'shadow_latency_ms': np.asarray(self.shadow_latency_ms, dtype=np.float32),
+        }
+
+
+class ShadowScorer:
+    """
+    후보 모델을 운영 트래픽에 섀도로 실행하는 백그라운드 작업자.
+
+    요청 경로는 submit()으로 작업을 큐에 넣기만 하고(큐가 가득 차면 버림), 데몬 스레드 하나가
+    score_fn(job) -> (섀도 출력, 섀도 지연시간 ms, 섀도 버전)을 실행해 운영 결과와 짝지어 기록합니다.
+    기록은 flush_rows 행마다(또는 flush_seconds 동안 새 작업이 없으면) 슬롯별 npz 파일로 추가됩니다.
+    """
+
+    def __init__(self, score_fn, log_dir, queue_size=1000, flush_rows=256, flush_seconds=60):
+        self._score_fn = score_fn
+        self.log_dir = str(log_dir)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._buffers = {}
+        self._buffer_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._sequence = 0
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.failed = 0
+
+    def submit(self, job):
+        """작업을 큐에 넣기 (요청 경로에서 호출, 대기하지 않음)"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(job)
+            self.submitted += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='clinical-shadow-scoring', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            # 어떤 예외도 작업 스레드를 끝내지 않도록 (스레드가 죽으면 이후 작업이 모두 버려지고 flush(wait=True)가 멈춤)
+            try:
+                try:
+                    job = self._queue.get(timeout=self.flush_seconds)
+                except queue.Empty:
+                    self._flush_buffers()
+                    continue
+                try:
+                    self._score(job)
+                finally:
+                    self._queue.task_done()
+            except Exception as e:
+                logger.error(f"섀도 작업 처리 중 오류: {e}", exc_info=True)
+
+    def _score(self, job):
+        try:
+            shadow_output, shadow_latency_ms, shadow_version = self._score_fn(job)
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"섀도 모델 실행 실패: {job.cancer_type} - {job.prediction_type} ({job.shadow_file}): {e}")
+            return
+
+        key = (job.cancer_type, job.prediction_type, job.live_version, shadow_version)
+        with self._buffer_lock:
+            buffer = self._buffers.setdefault(key, _LogBuffer())
+            buffer.timestamps.append(job.created_at)
+            buffer.live_outputs.append(job.live_output)
+            buffer.shadow_outputs.append(np.asarray(shadow_output, dtype=np.float32).ravel())
+            buffer.live_latency_ms.append(job.live_latency_ms)
+            buffer.shadow_latency_ms.append(shadow_latency_ms)
+            full = len(buffer) >= self.flush_rows
+        self.scored += 1
+        if full:
+            self._flush_buffers(key)
+
+    def flush(self, wait=True):
+        """대기 중인 작업을 모두 처리(wait=True)한 뒤 버퍼를 파일로 기록"""
+        if wait and self._thread is not None:
+            self._queue.join()
+        self._flush_buffers()
+
+    def _flush_buffers(self, only_key=None):
+        with self._buffer_lock:
+            keys = [only_key] if only_key is not None else list(self._buffers)
+            pending = [(key, self._buffers.pop(key)) for key in keys if key in self._buffers]
+            self._sequence += 1
+            sequence = self._sequence
+
+        for (cancer_type, prediction_type, live_version, shadow_version), buffer in pending:
+            if not len(buffer):
+                continue
+            slot_dir = os.path.join(self.log_dir, f"{cancer_type}_{prediction_type}")
+            path = os.path.join(slot_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{sequence}.npz")
+            try:
+                os.makedirs(slot_dir, exist_ok=True)
+                with open(path, 'wb') as f:
+                    np.savez_compressed(
+                        f,
+                        cancer_type=np.array(cancer_type),
+                        prediction_type=np.array(prediction_type),
+                        live_version=np.array(str(live_version)),
+                        shadow_version=np.array(str(shadow_version)),
+                        **buffer.to_arrays()
+                    )
+                logger.info(f"섀도 비교 로그 기록: {path} ({len(buffer)}건)")
+            except Exception as e:
+                logger.error(f"섀도 비교 로그 기록 실패: {path}: {e}")
+
+    def stats(self):
+        with self._buffer_lock:
+            buffered = sum(len(buffer) for buffer in self._buffers.values())
+        return {
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'scored': self.scored,
+            'failed': self.failed,
+            'queue_depth': self._queue.qsize(),
+            'buffered_rows': buffered,
+        }
+
+
+def load_shadow_logs(log_dir, cancer_type=None, prediction_type=None, since=None):
+    """
+    슬롯별 npz 로그를 (암종, 예측 유형, 운영 버전, 섀도 버전)별로 이어 붙여 반환.
+    since(유닉스 시각)가 있으면 그 이후 기록만 사용합니다.
+    """
+    pattern = os.path.join(str(log_dir), f"{cancer_type or '*'}_{prediction_type or '*'}", '*.npz')
+    groups = {}
+    for path in sorted(glob.glob(pattern)):
+        with np.load(path) as log:
+            key = tuple(str(log[name]) for name in ('cancer_type', 'prediction_type', 'live_version', 'shadow_version'))
+            columns = {name: log[name] for name in log.files if log[name].ndim > 0}
+        if since is not None:
+            mask = columns['timestamp'] >= since
+            if not mask.any():
+                continue
+            columns = {name: values[mask] for name, values in columns.items()}
+        groups.setdefault(key, []).append(columns)
+
+    return {
+        key: {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+        for key, chunks in groups.items()
+    }
+
+
+def _score_column(output):
+    """분포 비교용 점수: 회귀/위험 점수는 그대로, 이진 분류는 양성 확률, 다중 분류는 최대 확률"""
+    if output.shape[1] == 1:
+        return output[:, 0]
+    if output.shape[1] == 2:
+        return output[:, 1]
+    return output.max(axis=1)
+
+
+def _population_stability_index(expected, actual, bins=10):
+    """
+    운영 점수 대비 섀도 점수 분포의 PSI (0.1 미만 안정, 0.25 이상 큰 변화).
+    확률은 [0, 1] 등간격 구간, 그 밖의 점수는 운영 점수 분위수 구간을 사용합니다.
+    """
+    if min(expected.min(), actual.min()) >= 0 and max(expected.max(), actual.max()) <= 1:
+        edges = np.linspace(0, 1, bins + 1)
+    else:
+        edges = np.unique(np.quantile(expected, np.linspace(0, 1, bins + 1)))
+        if len(edges) < 2:
+            return 0.0
+        edges[0], edges[-1] = -np.inf, np.inf
+    expected_share = np.histogram(expected, edges)[0] / len(expected)
+    actual_share = np.histogram(actual, edges)[0] / len(actual)
+    expected_share = np.clip(expected_share, 1e-6, None)
+    actual_share = np.clip(actual_share, 1e-6, None)
+    return float(np.sum((actual_share - expected_share) * np.log(actual_share / expected_share)))
+
+
+def _latency_summary(latency_ms):
+    return {
+        'p50_ms': round(float(np.percentile(latency_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latency_ms, 95)), 3),
+        'mean_ms': round(float(latency_ms.mean()), 3),
+    }
+
+
+def summarize_shadow_log(columns):
+    """
+    짝지어진 운영/섀도 출력으로 일치도, 보정 변화(calibration drift), 모델별 지연시간 계산.
+
+    - 분류(출력 열 2개 이상): 예측 클래스 일치율과 클래스별 평균 확률 차이
+    - 점수(출력 열 1개): 상관계수
+    - 공통: 평균 절대 차이, 점수 분포 PSI, 지연시간 p50/p95
+    """
+    live, shadow = columns['live_output'], columns['shadow_output']
+    summary = {
+        'rows': int(len(live)),
+        'period': [float(columns['timestamp'].min()), float(columns['timestamp'].max())],
+        'latency': {
+            'live': _latency_summary(columns['live_latency_ms']),
+            'shadow': _latency_summary(columns['shadow_latency_ms']),
+        },
+    }
+    if live.shape[1] != shadow.shape[1]:
+        summary['error'] = f"출력 차원이 다릅니다 (운영 {live.shape[1]}, 섀도 {shadow.shape[1]})"
+        return summary
+
+    summary['mean_abs_diff'] = round(float(np.abs(shadow - live).mean()), 6)
+    if live.shape[1] > 1:
+        summary['agreement'] = round(float((live.argmax(axis=1) == shadow.argmax(axis=1)).mean()), 4)
+        summary['mean_probability_shift'] = [round(float(v), 6) for v in shadow.mean(axis=0) - live.mean(axis=0)]
+    elif len(live) > 1 and live[:, 0].std() > 0 and shadow[:, 0].std() > 0:
+        summary['correlation'] = round(float(np.corrcoef(live[:, 0], shadow[:, 0])[0, 1]), 4)
+    summary['psi'] = round(_population_stability_index(_score_column(live), _score_column(shadow)), 6)
+    return summary
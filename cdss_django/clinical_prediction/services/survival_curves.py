@@ -0,0 +1,91 @@
+# clinical_prediction/services/survival_curves.py
+import numpy as np
+
+# (결과 키, 일수)
+SURVIVAL_MILESTONES = (('1_year', 365), ('3_year', 1095), ('5_year', 1825))
+
+
+class SurvivalCurves:
+    """
+    여러 환자의 생존 곡선을 공통 시간 격자에서 평가한 결과 (numpy 배열).
+
+    - times: (격자 수,) int32, 일 단위
+    - curves: (환자 수, 격자 수) float32
+    - milestones: (환자 수, 3) float32, 1/3/5년 생존율
+    - median_days: (환자 수,) int32
+    JSON 변환은 응답을 만들 때 summary()로 환자별로만 수행합니다.
+    """
+
+    def __init__(self, times, curves, milestones, median_days):
+        self.times = times
+        self.curves = curves
+        self.milestones = milestones
+        self.median_days = median_days
+
+    def __len__(self):
+        return len(self.median_days)
+
+    def summary(self, index, decimals=4):
+        """환자 한 명의 응답용 JSON 값"""
+        return {
+            'survival_probabilities': {
+                key: float(self.milestones[index, i]) for i, (key, _) in enumerate(SURVIVAL_MILESTONES)
+            },
+            'median_survival_days': int(self.median_days[index]),
+            'survival_curve': {
+                'times_days': self.times.tolist(),
+                'probabilities': np.round(self.curves[index], decimals).tolist()
+            }
+        }
+
+
+def survival_arrays(model, X):
+    """
+    생존 모델의 예측을 (이벤트 시점, 환자별 생존확률 행렬)로 반환.
+
+    sksurv 모델은 return_array=True로 StepFunction 객체 생성 없이 한 번에 계산하고,
+    지원하지 않는 모델은 StepFunction의 내부 배열을 쌓아서 사용합니다.
+    """
+    unique_times = getattr(model, 'unique_times_', None)
+    if unique_times is not None:
+        try:
+            values = model.predict_survival_function(X, return_array=True)
+            return np.asarray(unique_times, dtype=np.float64), np.asarray(values, dtype=np.float32)
+        except TypeError:
+            pass
+
+    functions = model.predict_survival_function(X)
+    times = np.asarray(functions[0].x, dtype=np.float64)
+    values = np.vstack([fn.a * np.asarray(fn.y) + fn.b for fn in functions]).astype(np.float32)
+    return times, values
+
+
+def step_values(times, values, query_days):
+    """계단 함수(S(t) = values[:, k], times[k] <= t < times[k+1])를 query_days 시점에서 평가"""
+    positions = np.searchsorted(times, query_days, side='right') - 1
+    result = values[:, np.clip(positions, 0, None)]
+    result[:, positions < 0] = 1.0  # 첫 이벤트 이전은 생존확률 1
+    return result
+
+
+def median_survival_days(times, values, horizon_days, not_reached_days):
+    """생존확률이 처음 0.5 이하가 되는 날(정수 일). horizon 안에 없으면 not_reached_days"""
+    below = values <= 0.5
+    reached = below.any(axis=1)
+    first_days = np.maximum(np.ceil(times[below.argmax(axis=1)]), 1)
+    reached &= first_days < horizon_days
+    return np.where(reached, first_days, not_reached_days).astype(np.int32)
+
+
+def evaluate_survival_curves(model, X, step_days=30, horizon_days=3650, not_reached_days=1800):
+    """환자 전체를 한 번의 모델 호출로 공통 격자/마일스톤/중앙 생존기간까지 계산"""
+    times, values = survival_arrays(model, X)
+    grid = np.arange(0, horizon_days + 1, step_days, dtype=np.int32)
+    milestone_days = np.array([days for _, days in SURVIVAL_MILESTONES])
+
+    return SurvivalCurves(
+        times=grid,
+        curves=step_values(times, values, grid),
+        milestones=step_values(times, values, milestone_days),
+        median_days=median_survival_days(times, values, horizon_days, not_reached_days)
+    )
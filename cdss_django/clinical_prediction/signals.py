@@ -0,0 +1,38 @@
+# clinical_prediction/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .services import prediction_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+@receiver(post_save, sender='patients.ClinicalData')
+@receiver(post_delete, sender='patients.ClinicalData')
+def invalidate_patient_prediction_cache(sender, instance, **kwargs):
+    """임상 데이터 저장/삭제 시 해당 환자의 통합 예측 캐시 삭제"""
+    prediction_service.invalidate_patient_predictions(instance.patient_id)
+    logger.info(f"환자 {instance.patient_id}의 통합 예측 캐시 무효화")
+
+@receiver(post_save, sender='patients.ClinicalData')
+@receiver(post_save, sender='patients.LiverCancerClinicalData')
+def refresh_patient_prediction_route(sender, instance, **kwargs):
+    """임상 데이터 저장 시 환자 예측 라우팅(최신 기록/암종/리비전) 갱신"""
+    prediction_service.refresh_prediction_route(instance.patient_id)
+
+@receiver(post_delete, sender='patients.ClinicalData')
+@receiver(post_delete, sender='patients.LiverCancerClinicalData')
+def refresh_patient_prediction_route_on_delete(sender, instance, **kwargs):
+    """임상 데이터 삭제 시 남은 기록으로 라우팅 갱신 (환자 삭제로 라우팅이 지워진 경우 다시 만들지 않음)"""
+    prediction_service.refresh_prediction_route(instance.patient_id, create=False)
+
+@receiver(post_save, sender='patients.PatientProfile')
+def update_patient_prediction_route_identity(sender, instance, created, **kwargs):
+    """환자 이름/OpenEMR ID 변경 시 라우팅 검색 키 갱신"""
+    if created:
+        return
+    from django.apps import apps
+    PatientPredictionRoute = apps.get_model('clinical_prediction', 'PatientPredictionRoute')
+    PatientPredictionRoute.objects.filter(patient=instance).update(
+        openemr_id=instance.openemr_id,
+        name_key=PatientPredictionRoute.normalize_name(instance.name)
+    )
@@ -1,10 +1,23 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
+from unittest import skipUnless
 from unittest.mock import patch, MagicMock
 import json
-from .models import ClinicalPredictionResult, PredictionModelInfo
+import threading
+import time
+import numpy as np
+from .models import ClinicalPredictionResult, PredictionModelInfo, PatientPredictionRoute
 from .services.prediction_service import prediction_service
+from .services.feature_plan import FeaturePlan
+from .services.model_registry import ModelRegistry
+from .services.model_artifacts import export_model_artifact, load_model_artifact
+from .services.survival_curves import evaluate_survival_curves
+from .services.global_importance import permutation_importances
+from .services.micro_batcher import MicroBatcher
+from .services.compiled_backend import compile_model, is_available as compiled_backend_available
+from .services.shadow_scoring import ShadowJob, ShadowScorer, load_shadow_logs, summarize_shadow_log
+from .benchmarks import build_synthetic_cohort, _measure, psutil as benchmark_psutil
 
 class ClinicalPredictionTestCase(TestCase):
     def setUp(self):
@@ -109,13 +122,12 @@ class ClinicalPredictionTestCase(TestCase):
     
     def test_predict_all_endpoint(self):
         """통합 예측 엔드포인트 테스트"""
-        with patch.object(prediction_service, 'predict_survival') as mock_survival, \
-             patch.object(prediction_service, 'predict_risk_classification') as mock_risk, \
-             patch.object(prediction_service, 'predict_treatment_effect') as mock_treatment:
-            
-            mock_survival.return_value = {'prediction_type': 'survival'}
-            mock_risk.return_value = {'prediction_type': 'risk'}
-            mock_treatment.return_value = {'prediction_type': 'treatment'}
+        with patch.object(prediction_service, 'predict_all') as mock_predict:
+            mock_predict.return_value = {
+                'survival': {'prediction_type': 'survival'},
+                'risk_classification': {'prediction_type': 'risk'},
+                'treatment_effect': {'prediction_type': 'treatment'}
+            }
             
             response = self.client.post(
                 reverse('clinical_prediction:predict_all'),
@@ -132,6 +144,51 @@ class ClinicalPredictionTestCase(TestCase):
             self.assertIn('risk_classification', data['data'])
             self.assertIn('treatment_effect', data['data'])
     
+    def test_predict_batch_endpoint(self):
+        """일괄 예측 엔드포인트 테스트"""
+        with patch.object(prediction_service, 'predict_batch') as mock_predict:
+            mock_predict.return_value = {
+                'count': 1,
+                'cancer_type_counts': {'liver': 1},
+                'results': [{'patient_id': 'TEST001', 'cancer_type': 'liver'}],
+                'missing_patient_ids': ['TEST002']
+            }
+
+            response = self.client.post(
+                reverse('clinical_prediction:predict_batch'),
+                data=json.dumps({
+                    'patient_ids': ['TEST001', 'TEST002'],
+                    'prediction_types': ['risk_classification']
+                }),
+                content_type='application/json'
+            )
+
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            self.assertTrue(data['success'])
+            self.assertEqual(data['data']['count'], 1)
+            mock_predict.assert_called_once_with(
+                patient_ids=['TEST001', 'TEST002'],
+                cancer_type=None,
+                prediction_types=['risk_classification']
+            )
+
+    def test_predict_batch_invalid_request(self):
+        """일괄 예측 잘못된 요청 테스트"""
+        response = self.client.post(
+            reverse('clinical_prediction:predict_batch'),
+            data=json.dumps({}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            reverse('clinical_prediction:predict_batch'),
+            data=json.dumps({'cancer_type': 'liver', 'prediction_types': ['unknown']}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
     def test_get_supported_cancer_types(self):
         """지원 암종 목록 조회 테스트"""
         response = self.client.get(reverse('clinical_prediction:supported_cancer_types'))
@@ -203,3 +260,652 @@ class PredictionServiceTestCase(TestCase):
         mock_clinical_data.cancer_type = '위암 (STAD)'
         cancer_type = self.service._determine_cancer_type(mock_clinical_data)
         self.assertEqual(cancer_type, 'stomach')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_predict_all_result_cache(self):
+        """임상 데이터 리비전이 같으면 캐시/DB 결과를 재사용하는지 테스트"""
+        clinical_data = MagicMock(pk=1, patient_id='patient-uuid')
+        clinical_data.updated_at.isoformat.return_value = '2025-01-01T00:00:00'
+        clinical_data.patient.openemr_id = 'TEST001'
+        clinical_data.patient.name = '테스트환자'
+        results = {
+            'survival': {'prediction_type': 'survival', 'confidence': 0.85},
+            'risk_classification': {'prediction_type': 'risk_classification', 'confidence': 0.8},
+            'treatment_effect': {'prediction_type': 'treatment_effect', 'overall_confidence': 0.87}
+        }
+
+        with patch.object(self.service, '_get_patient_clinical_data', return_value=clinical_data), \
+             patch.object(self.service, '_determine_cancer_type', return_value='liver'), \
+             patch.object(self.service, '_run_all_predictions', return_value=results) as mock_run:
+            first = self.service.predict_all(patient_id='TEST001')
+            second = self.service.predict_all(patient_id='TEST001')
+            self.assertEqual(first, results)
+            self.assertEqual(second, results)
+            self.assertEqual(mock_run.call_count, 1)
+            self.assertEqual(ClinicalPredictionResult.objects.filter(clinical_data_revision='1:2025-01-01T00:00:00').count(), 3)
+
+            # 캐시가 비어도 같은 리비전은 DB에서 복원
+            self.service.invalidate_patient_predictions('patient-uuid')
+            self.assertEqual(self.service.predict_all(patient_id='TEST001'), results)
+            self.assertEqual(mock_run.call_count, 1)
+
+            # 임상 데이터가 수정되면 다시 예측
+            clinical_data.updated_at.isoformat.return_value = '2025-02-01T00:00:00'
+            self.service.predict_all(patient_id='TEST001')
+            self.assertEqual(mock_run.call_count, 2)
+
+    @override_settings(CLINICAL_PREDICTION_MODEL_TIMEOUTS={'survival': 0.2, 'risk': 5, 'treatment': 5})
+    def test_run_all_predictions_concurrently(self):
+        """세 모델을 동시에 실행하고 제한 시간이 지난 모델만 오류로 반환하는지 테스트"""
+        release = threading.Event()
+
+        def slow_survival(*args):
+            release.wait(5)
+            return {'prediction_type': 'survival'}
+
+        def model(prediction_type):
+            def run(*args):
+                time.sleep(0.3)
+                return {'prediction_type': prediction_type}
+            return run
+
+        with patch.object(self.service, '_prepare_prediction_record', return_value={'age_at_diagnosis': 60}), \
+             patch.object(self.service, '_predict_survival_for', side_effect=slow_survival), \
+             patch.object(self.service, '_predict_risk_for', side_effect=model('risk_classification')), \
+             patch.object(self.service, '_predict_treatment_for', side_effect=model('treatment_effect')):
+            started = time.monotonic()
+            results = self.service._run_all_predictions(MagicMock(), 'liver', patient_id='TEST001')
+            elapsed = time.monotonic() - started
+            release.set()
+
+        self.assertIn('error', results['survival'])
+        self.assertEqual(results['risk_classification'], {'prediction_type': 'risk_classification'})
+        self.assertEqual(results['treatment_effect'], {'prediction_type': 'treatment_effect'})
+        # 순차 실행(0.3 + 0.3초 이상)이 아니라 가장 느린 모델 시간에 가깝게 끝나야 함
+        self.assertLess(elapsed, 0.55)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_xai_explanation_cache(self):
+        """같은 모델/같은 입력 벡터의 XAI 설명은 캐시에서 반환하는지 테스트"""
+        plan = FeaturePlan(feature_names=['age_at_diagnosis', 'days_to_death'], record_fields={'age_at_diagnosis', 'days_to_death'})
+        processed_data = plan.to_frame(plan.encode([{'age_at_diagnosis': 60, 'days_to_death': None}]))
+        model_info = {
+            'model': MagicMock(feature_importances_=np.array([0.7, 0.3])),
+            'model_type': 'Test',
+            'feature_names': plan.feature_names,
+            'model_version': 'test_model.pkl:1:1'
+        }
+        shap_values = MagicMock(values=np.array([[0.1, -0.2]]), base_values=np.array([0.5]))
+        explainer = MagicMock(return_value=shap_values)
+
+        with patch.object(self.service, '_get_shap_explainer', return_value=explainer) as mock_get_explainer:
+            first = self.service._generate_xai_explanation(model_info, processed_data, 'liver', 'risk')
+            second = self.service._generate_xai_explanation(model_info, processed_data, 'liver', 'risk')
+
+        self.assertEqual(first, second)
+        self.assertEqual(first['shap_values']['values'], [[0.1, -0.2]])
+        mock_get_explainer.assert_called_once()
+        explainer.assert_called_once()
+
+
+class FeaturePlanTestCase(TestCase):
+    def setUp(self):
+        from sklearn.preprocessing import LabelEncoder
+        gender_encoder = LabelEncoder().fit(['female', 'male'])
+        stage_encoder = LabelEncoder().fit(['Stage I', 'Stage II', 'Unknown'])
+        self.plan = FeaturePlan(
+            feature_names=['age_at_diagnosis', 'gender', 'ajcc_pathologic_stage', 'ishak_fibrosis_score'],
+            label_encoders={'gender': gender_encoder, 'ajcc_pathologic_stage': stage_encoder},
+            record_fields={'age_at_diagnosis', 'gender', 'ajcc_pathologic_stage'},
+            default_for=lambda feature_name: 3
+        )
+
+    def test_encode_batch(self):
+        """레코드 목록을 float32 행렬로 인코딩하는지 테스트"""
+        matrix = self.plan.encode([
+            {'age_at_diagnosis': 45, 'gender': 'male', 'ajcc_pathologic_stage': 'Stage II'},
+            {'age_at_diagnosis': 'abc', 'gender': None, 'ajcc_pathologic_stage': 'Stage IV'},
+        ])
+
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertEqual(matrix.shape, (2, 4))
+        self.assertEqual(matrix[0].tolist(), [45.0, 1.0, 1.0, 3.0])
+        # 숫자 변환 실패/결측치/새로운 카테고리는 0으로 대체
+        self.assertEqual(matrix[1].tolist(), [0.0, 0.0, 0.0, 3.0])
+
+    def test_integer_category_matches_between_single_and_batch(self):
+        """결측치가 섞여 float이 된 정수 카테고리 열도 단건 인코딩과 같은 코드로 변환하는지 테스트"""
+        from sklearn.preprocessing import LabelEncoder
+        for classes in (['1', '2', '65'], [1, 2, 65]):
+            plan = FeaturePlan(
+                feature_names=['cycles'],
+                label_encoders={'cycles': LabelEncoder().fit(classes)},
+                record_fields={'cycles'},
+            )
+            single = plan.encode([{'cycles': 65}])
+            batch = plan.encode([{'cycles': 65}, {'cycles': None}])
+
+            self.assertEqual(single.tolist(), [[2.0]])
+            self.assertEqual(batch.tolist(), [[2.0], [0.0]])
+
+    def test_float_category_keeps_its_string_form(self):
+        """float 값은 str(value) 그대로 조회 (2.0 -> '2.0' 클래스)"""
+        from sklearn.preprocessing import LabelEncoder
+        plan = FeaturePlan(
+            feature_names=['grade'],
+            label_encoders={'grade': LabelEncoder().fit(['1.0', '2.0'])},
+            record_fields={'grade'},
+        )
+
+        self.assertEqual(plan.encode([{'grade': 2.0}, {'grade': None}]).tolist(), [[1.0], [0.0]])
+
+
+class ModelRegistryTestCase(TestCase):
+    def setUp(self):
+        self.load_calls = []
+
+        def loader(cancer_type, prediction_type):
+            self.load_calls.append((cancer_type, prediction_type))
+            if prediction_type == 'missing':
+                raise FileNotFoundError('no model file')
+            return {'model': object()}, None
+
+        self.registry = ModelRegistry(loader=loader)
+
+    def test_lazy_load_once(self):
+        """처음 사용할 때 한 번만 로드하는지 테스트"""
+        self.assertEqual(self.load_calls, [])
+        first = self.registry.get('liver', 'risk')
+        second = self.registry.get('liver', 'risk')
+
+        self.assertIs(first, second)
+        self.assertEqual(self.load_calls, [('liver', 'risk')])
+        self.assertIn('liver:risk', self.registry.stats()['loaded'])
+
+    def test_failed_load_is_remembered(self):
+        """로드 실패 슬롯은 재시도하지 않고 None 반환"""
+        self.assertIsNone(self.registry.get('liver', 'missing'))
+        self.assertIsNone(self.registry.get('liver', 'missing'))
+        self.assertEqual(self.load_calls, [('liver', 'missing')])
+        self.assertIn('liver:missing', self.registry.stats()['failed'])
+
+    def test_failed_load_is_retried_after_ttl(self):
+        """failure_ttl이 지나면 실패한 슬롯을 다시 로드 (나중에 배포된 섀도 후보 파일)"""
+        self.registry.failure_ttl = 60
+        with patch('clinical_prediction.services.model_registry.time.monotonic', return_value=1000.0):
+            self.assertIsNone(self.registry.get('liver', 'missing'))
+        with patch('clinical_prediction.services.model_registry.time.monotonic', return_value=1030.0):
+            self.assertIsNone(self.registry.get('liver', 'missing'))
+        self.assertEqual(self.load_calls, [('liver', 'missing')])
+
+        with patch('clinical_prediction.services.model_registry.time.monotonic', return_value=1061.0):
+            self.assertIsNone(self.registry.get('liver', 'missing'))
+        self.assertEqual(self.load_calls, [('liver', 'missing'), ('liver', 'missing')])
+
+    def test_lru_eviction(self):
+        """메모리 한도를 넘으면 가장 오래 쓰지 않은 모델을 언로드"""
+        with patch('clinical_prediction.services.model_registry.ModelEntry.footprint', new=100):
+            self.registry.max_bytes = 250
+            self.registry.warm_up(['liver:risk', 'kidney:risk'])
+            self.registry.get('liver', 'risk')
+            self.registry.get('stomach', 'risk')
+
+        loaded = self.registry.stats()['loaded']
+        self.assertIn('liver:risk', loaded)
+        self.assertIn('stomach:risk', loaded)
+        self.assertNotIn('kidney:risk', loaded)
+
+
+class ModelArtifactTestCase(TestCase):
+    def test_export_and_load(self):
+        """래핑된 모델을 아티팩트로 내보내고 다시 로드하는지 테스트 (그대로 저장된 numpy 배열은 메모리 매핑)"""
+        import tempfile
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+        wrapper = {
+            'model': {'weights': np.arange(1000, dtype=np.float64)},
+            'model_type': 'Test',
+            'scaler': StandardScaler().fit(np.array([[1.0], [3.0]])),
+            'label_encoders': {'gender': LabelEncoder().fit(['female', 'male'])},
+            'feature_names': ['age_at_diagnosis'],
+            'num_imputer': None,
+            'feature_plan': object(),
+        }
+
+        with tempfile.TemporaryDirectory() as artifact_root:
+            artifact_dir = export_model_artifact(wrapper, artifact_root, 'liver_risk', '1-100', source_file='test.pkl')
+            loaded = load_model_artifact(artifact_dir, mmap_mode='r')
+
+            self.assertIsInstance(loaded['model']['weights'], np.memmap)
+            self.assertEqual(loaded['model']['weights'].sum(), wrapper['model']['weights'].sum())
+            self.assertEqual(loaded['feature_names'], ['age_at_diagnosis'])
+            self.assertEqual(loaded['model_type'], 'Test')
+            self.assertIsNone(loaded['num_imputer'])
+            self.assertEqual(loaded['label_encoders']['gender'].transform(['male']).tolist(), [1])
+            self.assertNotIn('feature_plan', loaded)
+
+
+class SurvivalCurvesTestCase(TestCase):
+    def test_evaluate_on_shared_grid(self):
+        """여러 환자의 생존 곡선을 공통 격자/마일스톤/중앙 생존기간 배열로 계산하는지 테스트"""
+        model = MagicMock(unique_times_=np.array([100.0, 400.0, 1200.5, 2000.0]))
+        model.predict_survival_function.return_value = np.array([
+            [0.9, 0.7, 0.45, 0.3],
+            [0.95, 0.9, 0.8, 0.7],
+        ])
+
+        curves = evaluate_survival_curves(model, np.zeros((2, 3)), step_days=365, horizon_days=3650)
+
+        model.predict_survival_function.assert_called_once()
+        self.assertEqual(curves.curves.dtype, np.float32)
+        self.assertEqual(curves.curves.shape, (2, 11))
+        self.assertEqual(curves.times[:3].tolist(), [0, 365, 730])
+        # 첫 이벤트 이전은 1.0, 이후는 직전 이벤트 시점 값
+        np.testing.assert_allclose(curves.curves[0, :3], [1.0, 0.9, 0.7])
+        np.testing.assert_allclose(curves.milestones[0], [0.9, 0.7, 0.45])
+        self.assertEqual(curves.median_days.tolist(), [1201, 1800])
+
+        summary = curves.summary(1)
+        self.assertAlmostEqual(summary['survival_probabilities']['5_year'], 0.8, places=5)
+        self.assertEqual(len(summary['survival_curve']['probabilities']), 11)
+
+
+class GlobalImportanceTestCase(TestCase):
+    def test_permutation_importances_deterministic(self):
+        """모델 출력 기준 순열 중요도가 재현 가능하고 사용되지 않는 특성은 0인지 테스트"""
+        class FirstFeatureModel:
+            def predict_proba(self, frame):
+                first = 1 / (1 + np.exp(-frame['a'].to_numpy()))
+                return np.column_stack([1 - first, first])
+
+        plan = FeaturePlan(feature_names=['a', 'b'], record_fields={'a', 'b'})
+        matrix = np.random.default_rng(1).normal(size=(50, 2)).astype(np.float32)
+
+        first = permutation_importances(FirstFeatureModel(), matrix, plan.feature_names, plan.to_frame)
+        second = permutation_importances(FirstFeatureModel(), matrix, plan.feature_names, plan.to_frame)
+
+        self.assertEqual(first, second)
+        self.assertAlmostEqual(first['a'], 1.0)
+        self.assertEqual(first['b'], 0.0)
+
+    def test_summary_prefers_stored_importances(self):
+        """저장된 전역 중요도에 암종별 가중치를 적용해 요약하는지 테스트"""
+        model_info = {
+            'model': MagicMock(feature_importances_=np.array([0.9, 0.1])),
+            'feature_names': ['age_at_diagnosis', 'gender'],
+            'global_importances': {'age_at_diagnosis': 0.5, 'gender': 0.5},
+        }
+        method, summary = prediction_service._summarize_global_importance(model_info, 'liver', 'risk')
+
+        self.assertEqual(method, 'permutation')
+        self.assertAlmostEqual(sum(item['importance'] for item in summary), 100)
+        self.assertEqual(len(summary), 2)
+
+
+class MicroBatcherTestCase(TestCase):
+    def test_concurrent_requests_share_one_batch(self):
+        """동시에 들어온 단건 요청을 한 번의 추론으로 합치고 결과를 순서대로 나눠주는지 테스트"""
+        import pandas as pd
+
+        batcher = MicroBatcher(window_seconds=0.2, max_batch_rows=4)
+        calls = []
+        release = threading.Event()
+
+        def predict(frame):
+            calls.append(len(frame))
+            if len(calls) == 1:
+                release.wait(5)  # 첫 요청이 실행 중인 동안 나머지가 대기열에 쌓이도록
+            return frame[['x']].to_numpy() * 10
+
+        results = {}
+
+        def worker(value):
+            results[value] = batcher.run(('liver', 'risk'), pd.DataFrame({'x': [value]}), predict)
+
+        threads = [threading.Thread(target=worker, args=(value,)) for value in range(5)]
+        threads[0].start()
+        time.sleep(0.05)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(calls, [1, 4])
+        self.assertEqual({value: result.tolist() for value, result in results.items()},
+                         {value: [[value * 10]] for value in range(5)})
+        stats = batcher.stats()['liver:risk']
+        self.assertEqual(stats['batches'], 2)
+        self.assertEqual(stats['max_batch_rows'], 4)
+        self.assertEqual(stats['queue_depth'], 0)
+
+    def test_run_timed_excludes_batch_window_wait(self):
+        """run_timed가 배치 창 대기 시간이 아닌 추론(fn) 실행 시간만 반환하는지 테스트"""
+        import pandas as pd
+
+        batcher = MicroBatcher(window_seconds=0.3, max_batch_rows=8)
+        release = threading.Event()
+        timings = {}
+
+        def predict(frame):
+            if not release.is_set():
+                release.wait(5)  # 첫 요청이 실행 중이라 두 번째 요청의 리더가 배치 창만큼 기다림
+            return frame[['x']].to_numpy()
+
+        def worker(value):
+            timings[value] = batcher.run_timed(('liver', 'risk'), pd.DataFrame({'x': [value]}), predict)[1]
+
+        first = threading.Thread(target=worker, args=(0,))
+        first.start()
+        time.sleep(0.05)
+        second = threading.Thread(target=worker, args=(1,))
+        started = time.perf_counter()
+        second.start()
+        time.sleep(0.05)
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertGreaterEqual(time.perf_counter() - started, 0.25)
+        self.assertLess(timings[1], 0.1)
+
+
+    def test_requests_for_different_models_are_not_merged(self):
+        """같은 암종/예측 유형이라도 모델 객체가 다르면(재로드, 컴파일/원본) 각자의 모델로 추론하는지 테스트"""
+        import pandas as pd
+
+        class ScaleModel:
+            def __init__(self, scale):
+                self.scale = scale
+
+            def predict_proba(self, frame):
+                time.sleep(0.05)  # 다른 요청이 같은 창에 들어오도록
+                return frame[['x']].to_numpy() * self.scale
+
+        old_model, new_model = ScaleModel(1), ScaleModel(100)
+        results = {}
+
+        def worker(name, model):
+            results[name], _ = prediction_service._predict_proba_batched(
+                'liver', 'risk', model, pd.DataFrame({'x': [1]})
+            )
+
+        with patch.object(prediction_service, 'micro_batcher', MicroBatcher(window_seconds=0.2, max_batch_rows=4)):
+            threads = [threading.Thread(target=worker, args=('old', old_model)),
+                       threading.Thread(target=worker, args=('new', new_model))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(results['old'].tolist(), [[1]])
+        self.assertEqual(results['new'].tolist(), [[100]])
+
+
+class BenchmarkCohortTestCase(TestCase):
+    def test_build_synthetic_cohort(self):
+        """합성 코호트가 암종별 기본값을 따르고 같은 시드로 재현되는지 테스트"""
+        first = build_synthetic_cohort(prediction_service, 'kidney', 20, seed=3)
+        second = build_synthetic_cohort(prediction_service, 'kidney', 20, seed=3)
+
+        self.assertEqual(len(first), 20)
+        self.assertTrue(all(cd.cancer_type == 'kidney' for cd in first))
+        self.assertEqual([cd.age_at_diagnosis for cd in first], [cd.age_at_diagnosis for cd in second])
+        record = prediction_service._prepare_prediction_record(first[0], 'kidney')
+        self.assertEqual(record['primary_diagnosis'], 'Renal cell carcinoma, NOS')
+
+    @skipUnless(benchmark_psutil is not None, 'psutil이 설치되지 않음')
+    def test_measure_reports_peak_rss_per_scenario(self):
+        """시나리오마다 그 실행 동안의 최대 RSS를 따로 기록하는지 테스트"""
+        def allocate(_):
+            buffer = b'x' * (200 * 1024 * 1024)  # 실제로 페이지를 쓰도록 (0으로 채운 할당은 RSS에 잡히지 않을 수 있음)
+            time.sleep(0.05)  # 샘플러가 할당된 상태를 읽을 수 있도록
+            del buffer
+
+        idle = _measure(lambda _: None, range(3))
+        heavy = _measure(allocate, range(1))
+
+        self.assertIsNotNone(idle['peak_rss_mb'])
+        self.assertGreater(heavy['peak_rss_mb'] - idle['peak_rss_mb'], 100)
+
+
+class GuidelineEngineTestCase(TestCase):
+    def test_vectorized_guideline_scores(self):
+        """병기/등급/나이 계수를 환자 전체에 한 번에 적용하는지 테스트"""
+        engine = prediction_service.guideline_engine
+
+        self.assertEqual(
+            engine.stage_factor_values(['Stage I', 'Stage IIA', 'Stage IIIB', 'Stage IV', None]).tolist(),
+            [1.2, 1.0, 0.7, 0.4, 1.0]
+        )
+        self.assertEqual(engine.grade_factor_values(['G1', 'G3', 'GX']).tolist(), [1.1, 0.9, 1.0])
+        self.assertEqual(engine.age_factors([45, 65, 75, None]).tolist(), [1.1, 1.0, 0.85, 1.0])
+
+        scores = engine.score('kidney', ages=[45, 75], stages=['Stage I', 'Stage IV'], grades=['G1', 'G4'])
+        self.assertEqual(scores['effectiveness'].shape, (2, len(engine.treatments)))
+        # 85 * 1.1 * 1.2 * 1.1 = 123.4 -> 상한 95, 85 * 0.85 * 0.4 * 0.7 = 20.2
+        self.assertEqual(scores['effectiveness'][:, 0].tolist(), [95.0, 20.2])
+        self.assertEqual(scores['recommendation_score'][0, 0], 76.0)
+
+
+class PatientPredictionRouteTestCase(TestCase):
+    def setUp(self):
+        from patients.models import PatientProfile
+        self.patient = PatientProfile.objects.create(openemr_id='ROUTE001', first_name='Gil Dong', last_name='Hong')
+
+    def test_route_follows_clinical_data_signals(self):
+        """임상 데이터 저장/삭제 시그널로 라우팅이 갱신되고 인덱스 조회로 입력을 찾는지 테스트"""
+        from patients.models import ClinicalData
+        clinical_data = ClinicalData.objects.create(patient=self.patient, cancer_type='kidney')
+
+        route = PatientPredictionRoute.objects.get(patient=self.patient)
+        self.assertEqual(route.clinical_data_id, clinical_data.pk)
+        self.assertEqual(route.cancer_type, 'kidney')
+        self.assertEqual(route.name_key, 'gil dong hong')
+        self.assertEqual(route.clinical_data_revision, prediction_service._get_clinical_data_revision(clinical_data))
+
+        with patch.object(prediction_service, '_get_patient_clinical_data') as mock_legacy:
+            resolved, cancer_type = prediction_service._resolve_prediction_input(patient_id='ROUTE001')
+            self.assertEqual((resolved.pk, cancer_type), (clinical_data.pk, 'kidney'))
+            resolved, cancer_type = prediction_service._resolve_prediction_input(patient_name='  GIL dong  Hong ')
+            self.assertEqual(resolved.pk, clinical_data.pk)
+            mock_legacy.assert_not_called()
+
+        clinical_data.delete()
+        route.refresh_from_db()
+        self.assertIsNone(route.clinical_data_id)
+        self.assertEqual(route.cancer_type, '')
+
+        # 환자 삭제 시 라우팅도 함께 삭제
+        self.patient.delete()
+        self.assertFalse(PatientPredictionRoute.objects.exists())
+
+
+class ShadowScoringTestCase(TestCase):
+    def test_shadow_log_round_trip(self):
+        """섀도 결과를 npz 로그로 기록하고 일치도/PSI/지연시간을 요약하는지 테스트"""
+        import tempfile
+
+        def score(job):
+            # 두 번째 작업마다 예측 클래스가 뒤집히는 후보 모델
+            flipped = job.record['index'] % 2 == 1
+            return (job.live_output[::-1] if flipped else job.live_output), 1.0, 'candidate@1'
+
+        with tempfile.TemporaryDirectory() as log_dir:
+            scorer = ShadowScorer(score, log_dir, flush_rows=3)
+            for index in range(4):
+                scorer.submit(ShadowJob('liver', 'risk', 'candidate.pkl', {'index': index}, [0.8, 0.2], 2.0, 'live@1'))
+            scorer.flush()
+            self.assertEqual(scorer.stats()['scored'], 4)
+
+            groups = load_shadow_logs(log_dir, 'liver', 'risk')
+            self.assertEqual(list(groups), [('liver', 'risk', 'live@1', 'candidate@1')])
+            summary = summarize_shadow_log(groups[('liver', 'risk', 'live@1', 'candidate@1')])
+
+        self.assertEqual(summary['rows'], 4)
+        self.assertEqual(summary['agreement'], 0.5)
+        self.assertAlmostEqual(summary['mean_probability_shift'][1], 0.3, places=5)
+        self.assertEqual(summary['latency']['shadow']['p50_ms'], 1.0)
+        self.assertGreater(summary['psi'], 0)
+
+    def test_unwritable_log_dir_does_not_stop_worker(self):
+        """로그 디렉터리를 만들 수 없어도 작업 스레드가 계속 실행되고 flush(wait=True)가 끝나는지 테스트"""
+        import tempfile
+
+        with tempfile.NamedTemporaryFile() as not_a_dir:
+            scorer = ShadowScorer(lambda job: (job.live_output, 1.0, 'candidate@1'), not_a_dir.name, flush_rows=1)
+            for index in range(2):
+                scorer.submit(ShadowJob('liver', 'risk', 'candidate.pkl', {'index': index}, [0.8, 0.2], 2.0, 'live@1'))
+                scorer.flush(wait=True)
+
+            self.assertTrue(scorer._thread.is_alive())
+            self.assertEqual(scorer.stats()['scored'], 2)
+            self.assertEqual(scorer.stats()['dropped'], 0)
+
+    def test_worker_uses_shadow_config_resolved_on_request_thread(self):
+        """미리 조회한 섀도 설정을 넘기면 작업 스레드에서 DB 설정 조회를 하지 않는지 테스트"""
+        with patch.object(prediction_service, '_get_shadow_model_file') as mock_lookup, \
+                patch.object(prediction_service.shadow_scorer, 'submit') as mock_submit:
+            prediction_service._submit_shadow(
+                'liver', 'risk', {'model_version': 'v1'}, None, {'age': 60}, [0.2, 0.8], 0.01,
+                shadow_files={'risk': 'candidate.pkl'}
+            )
+
+        mock_lookup.assert_not_called()
+        self.assertEqual(mock_submit.call_args[0][0].shadow_file, 'candidate.pkl')
+
+    def test_survival_shadow_uses_live_survival_preprocessing(self):
+        """생존 섀도 모델 입력이 운영 생존 모델과 같은 _preprocess_data 방식으로 인코딩되는지 테스트"""
+        from sklearn.preprocessing import LabelEncoder
+
+        class RecordingModel:
+            def predict(self, frame):
+                self.frame = frame
+                return np.array([0.4])
+
+        model = RecordingModel()
+        shadow_info = {
+            'model': model,
+            'feature_names': ['age_at_diagnosis', 'gender', 'not_in_record'],
+            'label_encoders': {'gender': LabelEncoder().fit(['female', 'male'])},
+            'scaler': None,
+            'model_version': 'candidate.pkl@1',
+        }
+        record = {'age_at_diagnosis': 50, 'gender': 'male', 'vital_status': 'Alive'}
+        job = ShadowJob('liver', 'survival', 'candidate.pkl', record, [0.3], 1.0, 'live@1')
+
+        with patch.object(prediction_service.shadow_registry, 'get', return_value=shadow_info):
+            output, _, version = prediction_service._score_shadow(job)
+
+        self.assertEqual(list(model.frame.columns), ['age_at_diagnosis', 'gender'])
+        self.assertEqual(model.frame.iloc[0].tolist(), [50, 1])
+        self.assertEqual((float(output), version), (0.4, 'candidate.pkl@1'))
+
+
+@skipUnless(compiled_backend_available(), 'onnxruntime/skl2onnx가 설치되지 않음')
+class CompiledBackendTestCase(TestCase):
+    def test_onnx_parity_with_predict_proba(self):
+        """ONNX로 컴파일한 트리 모델이 원본 predict_proba와 같은 확률을 내는지 테스트"""
+        from sklearn.ensemble import RandomForestClassifier
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200, 6)).astype(np.float32)
+        y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+        model = RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+
+        compiled = compile_model(model, X[:50])
+        self.assertIsNotNone(compiled)
+
+        holdout = rng.normal(size=(100, 6)).astype(np.float32)
+        np.testing.assert_allclose(compiled.predict_proba(holdout), model.predict_proba(holdout), atol=1e-5)
+        np.testing.assert_allclose(compiled.predict_proba(holdout[:1]), model.predict_proba(holdout[:1]), atol=1e-5)
+
+
+class CompiledBackendFallbackTestCase(TestCase):
+    def test_output_shape_mismatch_falls_back_to_original(self):
+        """ONNX 출력 형태가 원본과 다르면 오류 없이 None(원본 모델 사용)을 반환하는지 테스트"""
+        model = MagicMock(n_features_in_=3)
+        model.predict_proba.return_value = np.tile([0.3, 0.7], (4, 1))
+        compiled = MagicMock()
+        compiled.predict_proba.return_value = np.full(4, 0.7, dtype=np.float32)
+
+        with patch('clinical_prediction.services.compiled_backend.is_available', return_value=True), \
+                patch('clinical_prediction.services.compiled_backend._to_onnx_bytes', return_value=b''), \
+                patch('clinical_prediction.services.compiled_backend.OnnxModel', return_value=compiled):
+            self.assertIsNone(compile_model(model, np.zeros((4, 3))))
+
+    def test_default_parity_sample_is_scaled_like_model_input(self):
+        """아티팩트 참조 샘플이 없을 때 비교 표본에도 encode()와 같이 scaler를 적용하는지 테스트"""
+        class ShiftScaler:
+            def transform(self, matrix):
+                return np.asarray(matrix) * 10 + 100
+
+        feature_plan = FeaturePlan(feature_names=['a', 'b'], scaler=ShiftScaler())
+        wrapper = {'model': MagicMock(), 'feature_plan': feature_plan}
+
+        with patch('clinical_prediction.services.prediction_service.compile_model', return_value=None) as mock_compile:
+            prediction_service._compile_model(wrapper, 'liver', 'risk')
+
+        reference = mock_compile.call_args[0][1]
+        self.assertEqual(reference.shape, (64, 2))
+        self.assertGreater(reference.mean(), 50)
+
+
+class StubReportClient:
+    """AI 호출 없이 정해진 조각을 돌려주는 보고서 클라이언트"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    def generate(self, prompt_text):
+        self.calls += 1
+        return ''.join(self.chunks)
+
+    def stream(self, prompt_text):
+        self.calls += 1
+        return iter(self.chunks)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ComprehensiveReportStreamTestCase(TestCase):
+    def setUp(self):
+        from django.utils import timezone
+        from patients.models import PatientProfile, LiverCancerClinicalData
+        self.user = User.objects.create_user(username='reportuser', password='testpass123')
+        self.patient = PatientProfile.objects.create(openemr_id='REPORT001', first_name='Report', last_name='Patient')
+        LiverCancerClinicalData.objects.create(
+            patient=self.patient, openemr_encounter_id='E1', form_date=timezone.now(), cancer_stage='Stage II'
+        )
+
+    def _stream(self, client):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from .views import ComprehensiveReportStreamView
+
+        request = APIRequestFactory().get('/', HTTP_ACCEPT='text/event-stream')
+        force_authenticate(request, user=self.user)
+        response = ComprehensiveReportStreamView.as_view(report_client=client)(request, patient_id=self.patient.pk)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode('utf-8')
+        return [block.split('\n')[0][len('event: '):] for block in body.strip().split('\n\n')], body
+
+    def test_sections_first_then_cached_narrative(self):
+        """섹션을 먼저 보내고 소견을 스트리밍하며, 같은 원본 결과는 캐시에서 보내는지 테스트"""
+        client = StubReportClient(['**종합 소견**', ' 안정적입니다.'])
+
+        events, body = self._stream(client)
+        self.assertEqual(events, ['sections', 'chunk', 'chunk', 'done'])
+        self.assertIn('Stage II', body)
+
+        events, body = self._stream(client)
+        self.assertEqual(events, ['sections', 'narrative', 'done'])
+        self.assertIn('**종합 소견** 안정적입니다.', body)
+        self.assertEqual(client.calls, 1)
+
+    def test_error_chunk_is_not_cached(self):
+        client = StubReportClient(['오류: AI와 통신 중 오류가 발생했습니다.'])
+        events, _ = self._stream(client)
+        self.assertEqual(events, ['sections', 'error'])
+        self._stream(client)
+        self.assertEqual(client.calls, 2)
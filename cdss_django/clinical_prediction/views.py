@@ -9,10 +9,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from patients.models import PatientProfile, LiverCancerClinicalData
-from omics.models import OmicsResult
-from diagnosis.models import DiagnosisResult
-from ai_chatbot.bot_service import generate_text_from_prompt
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from django.http import StreamingHttpResponse
+from patients.models import PatientProfile
+from ai_chatbot.bot_service import TextGenerationClient
+from .services.comprehensive_report import ComprehensiveReportSources, get_cached_report, cache_report, sse_event
 
 logger = logging.getLogger(__name__)
 
@@ -125,6 +126,22 @@ def get_supported_cancer_types(request):
     })
 
 
+@csrf_exempt
+@require_http_methods(["GET"])
+def get_model_registry_status(request):
+    """로드된 예측 모델별 로드 시간/메모리 사용량, 마이크로 배칭 대기열/배치 크기 및 섀도 실행 현황 조회"""
+    status_data = prediction_service.model_registry.stats()
+    status_data['micro_batching'] = prediction_service.micro_batcher.stats()
+    status_data['shadow_scoring'] = dict(
+        prediction_service.shadow_scorer.stats(),
+        models=prediction_service.shadow_registry.stats()['loaded']
+    )
+    return JsonResponse({
+        'success': True,
+        'data': status_data
+    })
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def predict_all(request):
@@ -137,69 +154,98 @@ def predict_all(request):
         if not patient_id and not patient_name:
             return JsonResponse({'error': '환자 ID 또는 이름이 필요합니다.'}, status=400)
         
-        results = {}
-        
-        # 생존 예측
-        try:
-            results['survival'] = prediction_service.predict_survival(
-                patient_id=patient_id, patient_name=patient_name
-            )
-        except Exception as e:
-            results['survival'] = {'error': str(e)}
-        
-        # 위험도 분류 예측
-        try:
-            results['risk_classification'] = prediction_service.predict_risk_classification(
-                patient_id=patient_id, patient_name=patient_name
-            )
-        except Exception as e:
-            results['risk_classification'] = {'error': str(e)}
-        
-        # 치료 효과 예측
-        try:
-            results['treatment_effect'] = prediction_service.predict_treatment_effect(
-                patient_id=patient_id, patient_name=patient_name
-            )
-        except Exception as e:
-            results['treatment_effect'] = {'error': str(e)}
+        # 임상 데이터가 바뀌지 않았으면 캐시/DB에 저장된 결과 반환
+        results = prediction_service.predict_all(
+            patient_id=patient_id,
+            patient_name=patient_name,
+            created_by=request.user if request.user.is_authenticated else None
+        )
         
         return JsonResponse({
             'success': True,
             'data': results
         })
         
+    except ValueError as e:
+        logger.error(f"통합 예측 오류: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=404)
     except Exception as e:
         logger.error(f"통합 예측 시스템 오류: {str(e)}")
         return JsonResponse({'error': f'통합 예측 중 오류 발생: {str(e)}'}, status=500)
 
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def predict_batch(request):
+    """환자 ID 목록 또는 암종 코호트 전체를 일괄 예측"""
+    try:
+        data = json.loads(request.body)
+        patient_ids = data.get('patient_ids') or []
+        cancer_type = data.get('cancer_type')
+        prediction_types = data.get('prediction_types')
+
+        if not patient_ids and not cancer_type:
+            return JsonResponse({'error': '환자 ID 목록(patient_ids) 또는 암종(cancer_type)이 필요합니다.'}, status=400)
+
+        if not isinstance(patient_ids, list):
+            return JsonResponse({'error': 'patient_ids는 목록이어야 합니다.'}, status=400)
+
+        if cancer_type and cancer_type not in prediction_service.model_paths:
+            return JsonResponse({'error': f'지원하지 않는 암종입니다: {cancer_type}'}, status=400)
+
+        if prediction_types:
+            invalid_types = [t for t in prediction_types if t not in prediction_service.BATCH_PREDICTION_TYPES]
+            if invalid_types:
+                return JsonResponse({'error': f'지원하지 않는 예측 유형입니다: {invalid_types}'}, status=400)
+
+        result = prediction_service.predict_batch(
+            patient_ids=patient_ids,
+            cancer_type=cancer_type,
+            prediction_types=prediction_types
+        )
+
+        return JsonResponse({
+            'success': True,
+            'data': result
+        })
+
+    except Exception as e:
+        logger.error(f"일괄 예측 시스템 오류: {str(e)}")
+        return JsonResponse({'error': f'일괄 예측 중 오류 발생: {str(e)}'}, status=500)
+
+class EventStreamRenderer(BaseRenderer):
+    """text/event-stream 요청(EventSource)을 콘텐츠 협상에서 거부하지 않기 위한 렌더러 (오류 응답은 JSON 문자열)"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False)
+
+
 class ComprehensiveReportView(APIView):
     permission_classes = [IsAuthenticated]
+    # as_view(report_client=...)로 교체 가능 (generate/stream 인터페이스)
+    report_client = TextGenerationClient()
 
     def get(self, request, patient_id, format=None):
         try:
             patient = PatientProfile.objects.get(id=patient_id)
             
             # 1. 각 분석 결과의 최신 데이터를 가져옵니다.
-            latest_omics_result = OmicsResult.objects.filter(request__patient_id=patient_id, request__status='COMPLETED').order_by('-last_updated').first()
-            
-            # [수정] 'last_updated'를 'updated_at'으로 변경합니다.
-            latest_ct_result = DiagnosisResult.objects.filter(request__patient_id=patient_id, request__status='COMPLETED').order_by('-updated_at').first()
-            
-            latest_clinical_data = LiverCancerClinicalData.objects.filter(patient_id=patient_id).order_by('-created_at').first()
-
-            # 2. Gemini AI에게 전달할 프롬프트를 생성합니다.
-            prompt = self.create_prompt(patient, latest_omics_result, latest_ct_result, latest_clinical_data)
-            
-            if prompt is None:
+            sources = ComprehensiveReportSources.load(patient)
+            if not sources.has_data:
                 return Response({"report": "보고서 생성을 위한 분석 데이터(CT, 오믹스, 임상)가 부족합니다."}, status=status.HTTP_404_NOT_FOUND)
 
-            # 3. AI로부터 보고서를 받아옵니다.
-            ai_response = generate_text_from_prompt(prompt)
+            # 2. 같은 원본 결과로 생성한 보고서가 있으면 AI를 다시 호출하지 않습니다.
+            report = get_cached_report(sources)
+            if report is None:
+                report = self.report_client.generate(sources.prompt())
+                if '오류:' in report:
+                    return Response({"report": report}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                cache_report(sources, report)
 
-            if '오류:' in ai_response:
-                 return Response({"report": ai_response}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            return Response({"report": ai_response})
+            return Response({"report": report})
 
         except PatientProfile.DoesNotExist:
             return Response({"error": "환자를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
@@ -207,45 +253,53 @@ class ComprehensiveReportView(APIView):
             # 오류 메시지를 더 명확하게 반환하도록 수정
             return Response({"error": f"보고서 생성 중 오류 발생: {type(e).__name__} - {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def create_prompt(self, patient, omics, ct, clinical):
-        # 이 함수의 내용은 이전과 동일합니다.
-        data_parts = []
-        prompt_header = f"""
-        당신은 환자의 복잡한 의료 데이터를 분석하여 의사에게 제출할 종합 소견서를 작성하는 전문 의료 AI입니다. 
-        아래 제공된 CT 영상 분석, 다중 오믹스 분석, 임상 데이터를 바탕으로, 각 항목을 체계적으로 기술하고 최종적으로 명확한 요약 결론을 제시해주세요. 
-        의학적 근거에 기반하여 논리적이고 전문적인 어조로 작성해야 합니다. Markdown 형식을 사용하여 가독성을 높여주세요. (예: **제목**, - 항목)
-
-        # 환자 정보
-        - 환자 ID: {patient.id}
-        """
-        if ct:
-            ct_info = """
-            # CT 영상 분석 결과
-            - 분석 상태: 완료
-            - 소견: 시스템에서 3D 시각화 데이터 및 장기/종양 분할이 성공적으로 완료되었습니다.
-            """
-            data_parts.append(ct_info)
-        if omics:
-            omics_info = f"""
-            # 다중 오믹스 분석 결과
-            - 1차 암 여부 예측: **{'암(Cancer)' if omics.binary_cancer_prediction == 1 else '정상(Normal)'}** (암일 확률: {omics.binary_cancer_probability:.2%})
-            - 2차 암종 식별: **{omics.predicted_cancer_type_name}**
-            - 주요 바이오마커 기여도 (JSON 형식): {json.dumps(omics.biomarkers, indent=2, ensure_ascii=False)}
-            """
-            data_parts.append(omics_info)
-        if clinical:
-            clinical_info = f"""
-            # 주요 임상 데이터 (간암)
-            - 나이: {clinical.age}세
-            - 성별: {clinical.get_gender_display()}
-            - Child-Pugh 등급: Class {clinical.child_pugh_class}
-            - AFP 수치: {clinical.afp} ng/mL
-            - AST 수치: {clinical.ast} U/L
-            - ALT 수치: {clinical.alt} U/L
-            - 혈소판 수: {clinical.platelet_count} /μL
-            """
-            data_parts.append(clinical_info)
-        if not data_parts:
-            return None
-        prompt_footer = "\n---\n## 종합 소견 및 요약\n위 정보를 바탕으로 상세한 종합 소견 및 요약 보고서를 작성해주세요."
-        return prompt_header + "".join(data_parts) + prompt_footer
\ No newline at end of file
+
+class ComprehensiveReportStreamView(ComprehensiveReportView):
+    """
+    종합 보고서 스트리밍 (server-sent events).
+    
+    구조화된 CT/오믹스/임상 섹션(event: sections)을 바로 보낸 뒤, AI 종합 소견을 생성되는 대로
+    event: chunk로 보냅니다. 캐시된 보고서가 있으면 event: narrative 한 번으로 보냅니다.
+    마지막은 event: done (또는 event: error)입니다.
+    """
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request, patient_id, format=None):
+        try:
+            patient = PatientProfile.objects.get(id=patient_id)
+        except PatientProfile.DoesNotExist:
+            return Response({"error": "환자를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+
+        sources = ComprehensiveReportSources.load(patient)
+        if not sources.has_data:
+            return Response({"report": "보고서 생성을 위한 분석 데이터(CT, 오믹스, 임상)가 부족합니다."}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(self.stream_events(sources), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx 버퍼링 없이 바로 전달
+        return response
+
+    def stream_events(self, sources):
+        yield sse_event('sections', sources.sections())
+
+        cached = get_cached_report(sources)
+        if cached is not None:
+            yield sse_event('narrative', {'text': cached})
+            yield sse_event('done', {'cached': True})
+            return
+
+        parts = []
+        try:
+            for text in self.report_client.stream(sources.prompt()):
+                if text.startswith('오류:'):
+                    yield sse_event('error', {'message': text})
+                    return
+                parts.append(text)
+                yield sse_event('chunk', {'text': text})
+        except Exception as e:
+            logger.error(f"종합 보고서 스트리밍 오류: {e}")
+            yield sse_event('error', {'message': f"보고서 생성 중 오류 발생: {type(e).__name__} - {str(e)}"})
+            return
+
+        cache_report(sources, ''.join(parts).strip())
+        yield sse_event('done', {'cached': False})
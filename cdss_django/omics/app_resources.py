@@ -2,49 +2,58 @@
 
 import os
 import logging
+import tempfile
 import joblib
 from django.conf import settings
 
+from .preprocessing_utils import GeneIntervalIndex
+
 logger = logging.getLogger(__name__)
 
-# --- 자원 캐시를 위한 전역 변수 ---
+# 모델과 전처리 자원은 전역 변수가 아니라 prediction_service.model_registry의 OmicsModelSet에 담깁니다.
+# (from ... import로 가져간 전역 변수는 다시 로드해도 갱신되지 않아 프로세스마다 상태가 어긋났음)
 
-# 1. GTF 파일 캐시
-GENCODE_GTF_DF = None
+# GTF 파일 캐시와 CNV 매핑용 유전자 구간 인덱스 (gencode_v22_processed.pkl 옆에 npz로 저장)
+GTF_CACHE_PATH = os.path.join(settings.BASE_DIR, 'resources', 'gencode_v22_processed.pkl')
+GENE_INDEX_PATH = os.path.join(settings.BASE_DIR, 'resources', 'gencode_v22_gene_index.npz')
 
-# 2. 모든 모델 및 관련 데이터를 담을 "빈 상자"들
-BINARY_MODELS = {}
-BINARY_LABEL_ENCODERS = {}
-BINARY_FEATURE_LISTS = {}
 
-OMICS_MODELS = {}
-OMICS_SCALERS = {}
-LABEL_ENCODERS = {}
-FEATURE_LISTS = {}
+def load_gene_interval_index():
+    """
+    CNV 매핑용 유전자 구간 인덱스를 읽어 반환합니다. (GTF 캐시가 없으면 None, 읽기 실패는 예외)
+    저장된 인덱스(.npz)가 GTF 캐시(.pkl)보다 최신이면 그것만 읽고, 아니면 GTF 캐시로 다시 만들어 저장합니다.
+    """
+    if os.path.exists(GENE_INDEX_PATH) and (
+        not os.path.exists(GTF_CACHE_PATH) or os.path.getmtime(GENE_INDEX_PATH) >= os.path.getmtime(GTF_CACHE_PATH)
+    ):
+        gene_index = GeneIntervalIndex.load(GENE_INDEX_PATH)
+        logger.info(f"Gene interval index loaded from: {GENE_INDEX_PATH} ({len(gene_index.starts)} intervals)")
+        return gene_index
 
-META_MODEL = None
-META_LABEL_ENCODER = None
-META_FEATURE_NAMES = []
-OMICS_FINAL_IMPUTER = None
+    if not os.path.exists(GTF_CACHE_PATH):
+        logger.error(f"GTF cache file not found at {GTF_CACHE_PATH}.")
+        return None
 
+    logger.info(f"Loading OPTIMIZED GTF cache from: {GTF_CACHE_PATH}...")
+    gene_index = GeneIntervalIndex.from_gtf(joblib.load(GTF_CACHE_PATH))
+    try:
+        _save_atomically(gene_index, GENE_INDEX_PATH)
+        logger.info(f"Gene interval index built and saved to: {GENE_INDEX_PATH}")
+    except OSError as e:
+        logger.warning(f"Gene interval index built but could not be saved to {GENE_INDEX_PATH}: {e}")
+    return gene_index
 
-def load_gtf_resource():
-    """서버 시작 시 최적화된 GTF 캐시 파일(.pkl)을 읽어 메모리에 저장합니다."""
-    global GENCODE_GTF_DF
-    
-    if GENCODE_GTF_DF is not None:
-        logger.info("GTF resource already cached.")
-        return
 
+def _save_atomically(gene_index, path):
+    """같은 디렉터리의 임시 파일에 쓴 뒤 교체 (동시에 만드는 워커나 읽는 프로세스가 쓰다 만 파일을 보지 않도록)"""
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.gene_index_', suffix='.npz.tmp')
+    os.close(handle)
     try:
-        cache_path = os.path.join(settings.BASE_DIR, 'resources', 'gencode_v22_processed.pkl')
-        
-        if os.path.exists(cache_path):
-            logger.info(f"Loading OPTIMIZED GTF cache from: {cache_path}...")
-            GENCODE_GTF_DF = joblib.load(cache_path)
-            logger.info("Optimized GTF cache successfully loaded into memory.")
-        else:
-            logger.error(f"GTF cache file not found at {cache_path}.")
-            
-    except Exception as e:
-        logger.error(f"Failed to load GTF cache file: {e}", exc_info=True)
\ No newline at end of file
+        gene_index.save(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
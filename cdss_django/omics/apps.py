@@ -1,6 +1,7 @@
 # cdss_django/omics/apps.py
 
 from django.apps import AppConfig
+from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,17 +13,21 @@ class OmicsConfig(AppConfig):
     def ready(self):
         """
         Django 앱이 준비될 때 호출됩니다.
-        Celery 워커를 포함한 모든 프로세스에서 모델 로딩을 보장합니다.
+        Celery 워커를 포함한 모든 프로세스에서 모델 로딩을 보장합니다. (OMICS_LOAD_MODELS_ON_STARTUP=False면 첫 사용 시 로드)
         """
+        # 웹 프로세스 등에서 시작 시 로드를 끈 경우 첫 분석 때 로드 (Celery 워커는 worker_init에서 fork 전에 로드)
+        if not getattr(settings, 'OMICS_LOAD_MODELS_ON_STARTUP', True):
+            logger.info("OmicsConfig.ready(): Model loading on startup is disabled. Models will be loaded on first use.")
+            return
+
         # 순환 참조 오류를 피하기 위해, 함수 내부에서 import 합니다.
-        from .app_resources import META_MODEL
-        
+        from .prediction_service import model_registry
+
         # 모델이 아직 로드되지 않았을 때만 로딩 함수를 호출합니다.
-        if META_MODEL is None:
+        if model_registry.current is None:
             logger.info("OmicsConfig.ready(): Models are not loaded. Initializing...")
             try:
-                from .prediction_service import load_all_prediction_models
-                load_all_prediction_models()
+                model_registry.load()
                 logger.info("OmicsConfig.ready(): Successfully loaded all prediction models.")
             except Exception as e:
                 # 모델 로딩 중 심각한 오류가 발생하면, 서버 로그에 기록을 남깁니다.
@@ -31,4 +36,4 @@ class OmicsConfig(AppConfig):
                 # import sys
                 # sys.exit(1)
         else:
-            logger.info("OmicsConfig.ready(): Models appear to be already loaded. Skipping initialization.")
\ No newline at end of file
+            logger.info("OmicsConfig.ready(): Models appear to be already loaded. Skipping initialization.")
@@ -0,0 +1,97 @@
+# omics/fold_ensemble.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """모든 FoldEnsemble이 공유하는 폴드 추론 스레드 풀 (LightGBM 추론은 GIL을 해제)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'OMICS_FOLD_ENSEMBLE_THREADS', 5),
+                    thread_name_prefix='omics-fold'
+                )
+    return _executor
+
+
+def _fold_predictor(model):
+    """
+    폴드 모델 하나의 확률 함수 (float32 행렬 -> (샘플 수, 클래스 수)).
+
+    LGBMClassifier는 sklearn 래퍼의 입력 검증/DataFrame 변환 없이 내부 Booster를 직접 호출합니다.
+    """
+    booster = getattr(model, 'booster_', None) if hasattr(model, 'n_classes_') else None
+    if booster is None or not hasattr(booster, 'predict'):
+        return model.predict_proba
+
+    def predict(matrix):
+        proba = booster.predict(matrix)
+        if proba.ndim == 1:  # 이진 분류 Booster는 양성 확률만 반환
+            proba = np.column_stack([1.0 - proba, proba])
+        return proba
+    return predict
+
+
+class FoldEnsemble:
+    """
+    교차검증 폴드 모델들을 하나의 predict_proba로 묶은 앙상블 (로드 시 한 번 생성).
+
+    predict_proba(X)는 (샘플 수, 특성 수) float32 행렬(또는 CSR 희소 행렬)을 모든 폴드에 한 번에 넣고 폴드 평균 확률을 반환하므로,
+    여러 OmicsRequest의 입력을 쌓아 한 번에 추론할 수 있습니다.
+    폴드별 softmax 확률의 평균이 원래 결과이므로 트리를 하나의 Booster로 합치지 않고 폴드를 병렬 실행합니다.
+    """
+
+    def __init__(self, models, parallel_min_rows=None):
+        if not models:
+            raise ValueError("FoldEnsemble requires at least one fold model.")
+        self.models = list(models)
+        self._predictors = [_fold_predictor(model) for model in self.models]
+        self.n_features = getattr(self.models[0], 'n_features_in_', None)
+        self.classes_ = getattr(self.models[0], 'classes_', None)
+        # 행 수가 적으면 스레드 전환 비용이 더 크므로 순차 실행
+        self.parallel_min_rows = (
+            parallel_min_rows if parallel_min_rows is not None
+            else getattr(settings, 'OMICS_FOLD_ENSEMBLE_PARALLEL_MIN_ROWS', 2)
+        )
+
+    def __len__(self):
+        return len(self.models)
+
+    def __iter__(self):
+        return iter(self.models)
+
+    def _as_matrix(self, X):
+        if sparse.issparse(X):  # 변이처럼 희소한 입력은 CSR 그대로 (LightGBM이 직접 처리)
+            matrix = sparse.csr_matrix(X, dtype=np.float32)
+        else:
+            matrix = np.ascontiguousarray(X, dtype=np.float32)
+            if matrix.ndim == 1:
+                matrix = matrix.reshape(1, -1)
+        if self.n_features is not None and matrix.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {matrix.shape[1]}.")
+        return matrix
+
+    def predict_fold_proba(self, X):
+        """폴드별 확률 (폴드 수, 샘플 수, 클래스 수)"""
+        matrix = self._as_matrix(X)
+        if len(self._predictors) > 1 and matrix.shape[0] >= self.parallel_min_rows:
+            results = list(_get_executor().map(lambda predict: predict(matrix), self._predictors))
+        else:
+            results = [predict(matrix) for predict in self._predictors]
+        return np.stack([np.asarray(result, dtype=np.float64) for result in results])
+
+    def predict_proba(self, X):
+        """폴드 평균 확률 (샘플 수, 클래스 수)"""
+        return self.predict_fold_proba(X).mean(axis=0)
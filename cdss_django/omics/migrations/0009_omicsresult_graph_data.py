@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('omics', '0008_omicsresult_stage1_signal_graph_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='omicsresult',
+            name='graph_data',
+            field=models.JSONField(blank=True, help_text='그래프 수치 데이터 (1차 암 신호 강도, 2차 메타 모델 특성 중요도) - 클라이언트 차트용', null=True),
+        ),
+    ]
@@ -0,0 +1,252 @@
+# omics/model_registry.py
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:  # psutil이 없으면 파일 크기로 메모리 사용량을 추정
+    psutil = None
+
+
+def _current_rss():
+    if psutil is None:
+        return None
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class OmicsModelSet:
+    """
+    한 번의 로드로 만들어진 오믹스 모델/전처리 자원 묶음 (로드가 끝난 뒤에는 변경하지 않음).
+
+    분석은 시작할 때 받은 세트 하나만 끝까지 사용하므로, 처리 도중 레지스트리가 새 세트로 바뀌어도
+    1단계/2단계가 서로 다른 버전의 모델을 섞어 쓰지 않습니다.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.loaded_at = time.time()
+        self.load_seconds = None
+
+        # 1단계: 암종별 이진 분류 모델
+        self.binary_models = {}
+        self.binary_label_encoders = {}
+        self.binary_feature_lists = {}
+        self.binary_pca_assets = {}  # 암종 -> 오믹스 파일 키 -> PCA 전처리 자원 (scaler/imputer/PCA, 특성 위치 맵)
+
+        # 2단계: 오믹스별 전문가 모델과 메타 모델
+        self.omics_models = {}
+        self.omics_scalers = {}
+        self.label_encoders = {}
+        self.feature_lists = {}
+        self.feature_indexes = {}  # 오믹스 -> 전문가 모델 특성 이름/열 위치 맵 (FeatureIndex)
+        self.meta_model = None
+        self.meta_model_version = None  # 메타 모델 파일 mtime-size (모델 수준 그래프 캐시 키)
+        self.meta_label_encoder = None
+        self.meta_feature_names = []
+        self.final_imputer = None
+
+        # 업로드 파일 스트리밍 파싱 시 남길 특성 (오믹스 -> 2단계 특성과 1단계 PCA 이전 특성의 합집합 FeatureIndex)
+        self.input_feature_indexes = {}
+
+        # CNV 매핑용 유전자 구간 인덱스
+        self.gene_interval_index = None
+
+        # 자원 이름 -> 파일 경로/로드 시간/메모리 사용량 (실패하거나 없는 파일도 기록해 파일이 바뀌면 다시 로드)
+        self.entries = {}
+        self.failures = {}  # 로드하지 못한 필수 자원 이름 -> 사유
+
+    def _record(self, name, path, started=None, resident_bytes=None, error=None):
+        signature = _file_signature(path)
+        self.entries[name] = {
+            'path': path,
+            'signature': signature,
+            'file_bytes': signature[1] if signature else None,
+            'resident_bytes': resident_bytes,
+            'load_seconds': round(time.perf_counter() - started, 4) if started is not None else None,
+            'error': error,
+        }
+
+    @contextmanager
+    def track(self, name, path):
+        """with 블록 안에서 path 파일을 읽는 자원 하나의 로드 시간과 RSS 증가량을 기록 (예외가 나면 실패로 기록)"""
+        rss_before = _current_rss()
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self._record(name, path, started, error=str(e))
+            self.failures[name] = str(e)
+            raise
+        rss_after = _current_rss()
+        resident_bytes = None
+        if rss_before is not None and rss_after is not None and rss_after > rss_before:
+            resident_bytes = rss_after - rss_before
+        self._record(name, path, started, resident_bytes)
+
+    def record_missing(self, name, path, required=True):
+        """없는 파일 기록 (나중에 생기면 is_stale()이 감지, required면 로드 실패로도 기록)"""
+        self._record(name, path, error='file not found')
+        if required:
+            self.failures[name] = 'file not found'
+
+    def record_source(self, name, path):
+        """직접 읽지 않았지만 다른 자원을 만드는 데 쓰이는 원본 파일 기록 (바뀌면 is_stale()이 감지)"""
+        self._record(name, path)
+
+    def file_signatures(self):
+        """이 세트가 읽은 파일들의 현재 (mtime, 크기)"""
+        return {name: _file_signature(entry['path']) for name, entry in self.entries.items()}
+
+    def is_stale(self, signatures=None):
+        """로드 이후 바뀌거나 사라진 모델 파일이 있는지 (파일 stat만 비교)"""
+        signatures = signatures if signatures is not None else self.file_signatures()
+        return any(signatures[name] != entry['signature'] for name, entry in self.entries.items())
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+            'meta_model_version': self.meta_model_version,
+            'binary_models': sorted(name for name, model in self.binary_models.items() if model is not None),
+            'expert_models': sorted(name for name, models in self.omics_models.items() if models),
+            'total_resident_bytes': sum(entry['resident_bytes'] or 0 for entry in self.entries.values()),
+            'total_file_bytes': sum(entry['file_bytes'] or 0 for entry in self.entries.values()),
+            'failures': dict(self.failures),
+            'models': {
+                name: {key: value for key, value in entry.items() if key != 'signature'}
+                for name, entry in self.entries.items()
+            },
+        }
+
+
+class OmicsModelRegistry:
+    """
+    현재 OmicsModelSet 하나를 가리키는 프로세스 단위 레지스트리.
+
+    builder(version)는 새 OmicsModelSet을 만들어 반환하거나 예외를 던집니다. 새 세트는 잠금 밖의
+    호출자(분석 Task)를 막지 않고 만들어지며, 완성된 뒤 참조 하나를 바꾸는 것으로 교체됩니다.
+    교체 전에 get()으로 세트를 받은 분석은 이전 세트로 끝까지 처리되고, 로드에 실패하면 기존 세트를 유지합니다.
+    이미 세트가 있을 때는 자원 하나라도 실패한(failures) 새 세트도 실패로 보고 교체하지 않습니다.
+    (복사 중인 모델 파일을 읽은 경우 등 - 파일이 다시 바뀌면 is_stale()로 감지해 재시도)
+    check_interval(초)이 있으면 get()이 그 주기로 모델 파일 변경을 확인해 백그라운드 스레드에서 다시 로드합니다.
+    """
+
+    def __init__(self, builder, check_interval=None):
+        self._builder = builder
+        self.check_interval = check_interval
+        self._current = None
+        self._version = 0
+        self._load_lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._failed_signatures = None
+        self.last_error = None
+        if hasattr(os, 'register_at_fork'):
+            # fork 시점에 다른 스레드가 잡고 있던 잠금이 자식 프로세스에서 영원히 잠기지 않도록 새로 만듦
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._load_lock = threading.Lock()
+        self._last_check = time.monotonic()
+
+    @property
+    def current(self):
+        """현재 세트 (아직 로드하지 않았으면 None, 로드하지 않음)"""
+        return self._current
+
+    def get(self):
+        """현재 세트 반환 (없으면 로드, 로드 실패 시 예외)"""
+        model_set = self._current
+        if model_set is None:
+            return self.load()
+        if self.check_interval and time.monotonic() - self._last_check >= self.check_interval:
+            self._check_for_update(model_set)
+        return model_set
+
+    def load(self, force=False):
+        """세트를 로드해 교체 (force=False면 이미 로드된 세트를 그대로 반환)"""
+        with self._load_lock:
+            if self._current is not None and not force:
+                return self._current
+            return self._swap()
+
+    def _swap(self):
+        # _load_lock을 잡은 상태에서만 호출
+        version = self._version + 1
+        started = time.perf_counter()
+        try:
+            model_set = self._builder(version)
+            if self._current is not None and model_set.failures:
+                raise RuntimeError(f"{len(model_set.failures)} resource(s) failed to load: {sorted(model_set.failures)}")
+        except Exception as e:
+            self.last_error = str(e)
+            if self._current is not None:
+                self._failed_signatures = self._current.file_signatures()
+            logger.error(f"Omics model set v{version} failed to load: {e}")
+            raise
+        model_set.load_seconds = round(time.perf_counter() - started, 4)
+        self._version = version
+        self._current = model_set
+        self._failed_signatures = None
+        self.last_error = None
+        logger.info(f"Omics model set v{version} is now active ({model_set.load_seconds:.2f}s).")
+        return model_set
+
+    def reload(self, wait=True):
+        """
+        모델 파일을 다시 읽어 새 세트로 교체합니다 (기존 세트로 처리 중인 분석은 그대로 진행).
+        wait=False면 백그라운드 스레드에서 로드하고 바로 반환하며, 이미 다시 로드 중이면 아무것도 하지 않습니다.
+        """
+        if wait:
+            return self.load(force=True)
+        if self._load_lock.locked():
+            return None
+        threading.Thread(target=self._reload_in_background, name='omics-model-reload', daemon=True).start()
+        return None
+
+    def _reload_in_background(self):
+        if not self._load_lock.acquire(blocking=False):
+            return
+        try:
+            self._swap()
+        except Exception:
+            pass  # _swap에서 기록, 기존 세트 유지
+        finally:
+            self._load_lock.release()
+
+    def _check_for_update(self, model_set):
+        self._last_check = time.monotonic()
+        signatures = model_set.file_signatures()
+        # 같은 파일로 실패한 재로드는 파일이 다시 바뀔 때까지 반복하지 않음
+        if signatures == self._failed_signatures:
+            return
+        if model_set.is_stale(signatures):
+            logger.info(f"Omics model files changed since v{model_set.version}. Reloading in background...")
+            self.reload(wait=False)
+
+    def status(self):
+        """로드 상태와 자원별 로드 시간/메모리 사용량"""
+        model_set = self._current
+        status = {
+            'pid': os.getpid(),
+            'loaded': model_set is not None,
+            'reloading': self._load_lock.locked(),
+            'last_error': self.last_error,
+            'check_interval': self.check_interval,
+        }
+        if model_set is not None:
+            status.update(model_set.describe())
+        return status
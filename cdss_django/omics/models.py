@@ -123,6 +123,10 @@ class OmicsResult(models.Model):
         null=True, blank=True,
         help_text="2차 분석: 바이오마커 기여도 그래프 (SHAP 등)"
     )
+    graph_data = models.JSONField(
+        null=True, blank=True,
+        help_text="그래프 수치 데이터 (1차 암 신호 강도, 2차 메타 모델 특성 중요도) - 클라이언트 차트용"
+    )
     last_updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
@@ -10,10 +10,6 @@ import psutil
 
 from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-from .models import OmicsRequest, OmicsResult, OmicsDataFile
-from . import preprocessing_utils as pp_utils
-from .app_resources import GENCODE_GTF_DF, BINARY_MODELS, BINARY_LABEL_ENCODERS, BINARY_FEATURE_LISTS, \
-    OMICS_MODELS, LABEL_ENCODERS, FEATURE_LISTS, OMICS_SCALERS, META_MODEL, META_LABEL_ENCODER, META_FEATURE_NAMES
 
 # [그래프 추가] 그래프 생성을 위한 라이브러리 import
 import matplotlib
@@ -21,13 +17,14 @@ matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import io
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
 
-from django.conf import settings
 from .models import OmicsRequest, OmicsResult, OmicsDataFile
+from . import app_resources
 from . import preprocessing_utils as pp_utils
-# [그래프 추가] app_resources를 직접 사용하지 않고, 로드된 전역 변수를 사용합니다.
-from .app_resources import GENCODE_GTF_DF, BINARY_MODELS, BINARY_LABEL_ENCODERS, BINARY_FEATURE_LISTS, \
-    OMICS_MODELS, LABEL_ENCODERS, FEATURE_LISTS, OMICS_SCALERS, META_MODEL, META_LABEL_ENCODER, META_FEATURE_NAMES, OMICS_FINAL_IMPUTER
+from .fold_ensemble import FoldEnsemble
+from .model_registry import OmicsModelRegistry, OmicsModelSet
 
 logger = logging.getLogger(__name__)
 
@@ -44,42 +41,46 @@ FILENAME_KEY_MAP = {
     'meth': 'Meth', 'mutation': 'Mut'
 }
 
-def load_all_prediction_models():
+def _build_model_set(version):
     """
-    Celery 워커 시작 시 필요한 모든 모델과 전처리 도구를 로드하여 메모리에 캐싱합니다.
+    모든 모델과 전처리 도구를 읽어 새 OmicsModelSet을 만듭니다. (model_registry가 호출)
+    메타 모델 관련 파일을 읽지 못하면 예외를 던지며, 이때 레지스트리는 기존 세트를 그대로 사용합니다.
     """
     print(f"DEBUG: Attempting to load models from base directory: {MODEL_BASE_DIR}")
-    global BINARY_MODELS, BINARY_LABEL_ENCODERS, BINARY_FEATURE_LISTS, \
-           META_MODEL, META_LABEL_ENCODER, META_FEATURE_NAMES, OMICS_SCALERS, OMICS_FINAL_IMPUTER, \
-           OMICS_MODELS, LABEL_ENCODERS, FEATURE_LISTS
-
-    # OMICS_MODELS, LABEL_ENCODERS, FEATURE_LISTS가 로드되었는지 확인하는 조건
-    if META_MODEL is not None and \
-       all(model is not None for model in BINARY_MODELS.values()) and \
-       bool(OMICS_MODELS): # OMICS_MODELS가 비어있지 않은지 확인
-        print("DEBUG_PRINT: All prediction models already loaded and verified.", file=sys.stderr)
-        logger.info("All prediction models already loaded and verified.")
-        return
-
     print("DEBUG_PRINT: Attempting to load all prediction models for prediction_service...", file=sys.stderr)
-    logger.info("Attempting to load all prediction models for prediction_service...")
+    logger.info(f"Attempting to load all prediction models for prediction_service (model set v{version})...")
+    model_set = OmicsModelSet(version)
 
     try:
+        # CNV 매핑용 유전자 구간 인덱스 (없거나 읽지 못하면 CNV 파일만 건너뜀)
+        try:
+            with model_set.track('gene_interval_index', app_resources.GENE_INDEX_PATH):
+                model_set.gene_interval_index = app_resources.load_gene_interval_index()
+        except Exception as e:
+            logger.error(f"ERROR: Failed to load gene interval index: {e}. CNV files will be skipped.", exc_info=True)
+        # 인덱스는 GTF 캐시로 다시 만들므로 GTF 캐시가 바뀌어도 다시 로드
+        if os.path.exists(app_resources.GTF_CACHE_PATH):
+            model_set.record_source('gene_interval_index/gtf', app_resources.GTF_CACHE_PATH)
+        else:
+            model_set.record_missing('gene_interval_index/gtf', app_resources.GTF_CACHE_PATH, required=False)
+
         # --- 1. 메타 모델 관련 파일 로드 (2단계 최종 분류 모델) ---
         meta_model_dir = os.path.join(MODEL_BASE_DIR, 'Meta_analysis_pkl')
 
         meta_model_path = os.path.join(meta_model_dir, 'final_meta_model.pkl')
         if os.path.exists(meta_model_path):
             try:
-                META_MODEL = joblib.load(meta_model_path)
+                with model_set.track('meta/model', meta_model_path):
+                    model_set.meta_model = joblib.load(meta_model_path)
+                # 모델 수준 그래프(특성 중요도)를 모델 파일이 바뀔 때만 다시 그리기 위한 버전
+                meta_model_stat = os.stat(meta_model_path)
+                model_set.meta_model_version = f"{int(meta_model_stat.st_mtime)}-{meta_model_stat.st_size}"
                 logger.info(f"Loaded Meta Model from {meta_model_path}")
             except Exception as e:
                 logger.error(f"ERROR: Failed to load Meta Model from {meta_model_path}: {e}", exc_info=True)
-                _reset_global_models()
                 raise
         else:
             logger.error(f"ERROR: Meta Model file NOT FOUND at {meta_model_path}. Main classification will not work.")
-            _reset_global_models()
             raise FileNotFoundError(f"Meta Model file not found: {meta_model_path}")
 
         # --- 메타 모델의 LabelEncoder 로드 ---
@@ -88,14 +89,15 @@ def load_all_prediction_models():
         meta_label_encoder_path = os.path.join(meta_model_dir, 'meta_label_encoder.pkl')
         if os.path.exists(meta_label_encoder_path):
             try:
-                META_LABEL_ENCODER = joblib.load(meta_label_encoder_path)
+                with model_set.track('meta/label_encoder', meta_label_encoder_path):
+                    model_set.meta_label_encoder = joblib.load(meta_label_encoder_path)
                 logger.info(f"Loaded Meta LabelEncoder from {meta_label_encoder_path}")
             except Exception as e:
                 logger.error(f"ERROR: Failed to load Meta LabelEncoder from {meta_label_encoder_path}: {e}", exc_info=True)
-                _reset_global_models(meta_only=True)
                 raise
         else:
             logger.warning(f"WARNING: Meta LabelEncoder file NOT FOUND at {meta_label_encoder_path}. 2nd stage class names might be incorrect.")
+            model_set.record_missing('meta/label_encoder', meta_label_encoder_path, required=False)
 
         # --- 메타 모델 특징 파일 로드 ---
         # 경로 재확인: 'meta_features_for_ensemble.json' 파일이 Meta_analysis_pkl 디렉토리 내에 없음을 확인했습니다.
@@ -103,29 +105,31 @@ def load_all_prediction_models():
         meta_features_path = os.path.join(meta_model_dir, 'meta_features_for_ensemble.json')
         if os.path.exists(meta_features_path):
             try:
-                with open(meta_features_path, 'r') as f:
-                    META_FEATURE_NAMES = json.load(f)
-                logger.info(f"Loaded Meta Feature Names from {meta_features_path} (Count: {len(META_FEATURE_NAMES)})")
+                with model_set.track('meta/features', meta_features_path):
+                    with open(meta_features_path, 'r') as f:
+                        model_set.meta_feature_names = json.load(f)
+                logger.info(f"Loaded Meta Feature Names from {meta_features_path} (Count: {len(model_set.meta_feature_names)})")
             except Exception as e:
                 logger.error(f"ERROR: Failed to load Meta Feature Names from {meta_features_path}: {e}", exc_info=True)
-                _reset_global_models(meta_only=True)
                 raise
         else:
             logger.warning(f"WARNING: Meta Feature Names file NOT FOUND at {meta_features_path}. 2nd stage feature alignment will be impacted.")
+            model_set.record_missing('meta/features', meta_features_path, required=False)
 
         # --- 메타 모델 최종 Imputer 로드 (현재 Meta_analysis_pkl에 없는 것으로 보임) ---
         # 이 imputer는 2단계 메타 모델 입력 데이터를 최종 전처리할 때 사용될 수 있습니다.
         meta_imputer_path = os.path.join(meta_model_dir, 'final_imputer.joblib') # 메타 모델용 final imputer 경로 가정
         if os.path.exists(meta_imputer_path):
             try:
-                OMICS_FINAL_IMPUTER = joblib.load(meta_imputer_path)
+                with model_set.track('meta/imputer', meta_imputer_path):
+                    model_set.final_imputer = joblib.load(meta_imputer_path)
                 logger.info(f"Loaded Meta Imputer from {meta_imputer_path}")
             except Exception as e:
                 logger.error(f"ERROR: Failed to load Meta Imputer from {meta_imputer_path}: {e}", exc_info=True)
-                _reset_global_models(meta_only=True)
                 raise
         else:
             logger.warning(f"WARNING: Meta Imputer file NOT FOUND at {meta_imputer_path}. Imputation for meta model input might be skipped.")
+            model_set.record_missing('meta/imputer', meta_imputer_path, required=False)
 
 
         # --- 2. 각 이진 분류 모델 (1단계: 암 vs 정상 분류) 로드 ---
@@ -139,48 +143,59 @@ def load_all_prediction_models():
             current_features = []
             if os.path.exists(features_path_json):
                 try:
-                    with open(features_path_json, 'r') as f:
-                        current_features = json.load(f)
+                    with model_set.track(f'binary/{cancer_type}/features', features_path_json):
+                        with open(features_path_json, 'r') as f:
+                            current_features = json.load(f)
                     logger.info(f"Loaded features for {cancer_type} from {features_path_json} (Count: {len(current_features)})")
                 except Exception as e:
                     logger.error(f"ERROR: Failed to load features (JSON) for {cancer_type} from {features_path_json}: {e}", exc_info=True)
-                    BINARY_FEATURE_LISTS[cancer_type] = []
+                    model_set.binary_feature_lists[cancer_type] = []
                     continue
             else:
                 logger.error(f"ERROR: Feature list (feature_names.json) NOT FOUND for {cancer_type} at {features_path_json}. Binary prediction for this type will be skipped.")
-                BINARY_FEATURE_LISTS[cancer_type] = []
+                model_set.record_missing(f'binary/{cancer_type}/features', features_path_json)
+                model_set.binary_feature_lists[cancer_type] = []
                 continue
-            BINARY_FEATURE_LISTS[cancer_type] = current_features
+            model_set.binary_feature_lists[cancer_type] = current_features
 
             # --- final_model.joblib 로드 ---
             binary_model_path = os.path.join(binary_model_base_dir, 'final_model.joblib')
             current_binary_model = None
             if os.path.exists(binary_model_path):
                 try:
-                    current_binary_model = joblib.load(binary_model_path)
+                    with model_set.track(f'binary/{cancer_type}/model', binary_model_path):
+                        current_binary_model = joblib.load(binary_model_path)
                     logger.info(f"Loaded binary model for {cancer_type} from {binary_model_path}")
                 except Exception as e:
                     logger.error(f"ERROR: Failed to load binary model for {cancer_type} from {binary_model_path}: {e}", exc_info=True)
-                    BINARY_MODELS[cancer_type] = None
+                    model_set.binary_models[cancer_type] = None
                     continue
             else:
                 logger.error(f"ERROR: Binary model (final_model.joblib) NOT FOUND for {cancer_type} at {binary_model_path}. Binary prediction for this type will be skipped.")
-                BINARY_MODELS[cancer_type] = None
+                model_set.record_missing(f'binary/{cancer_type}/model', binary_model_path)
+                model_set.binary_models[cancer_type] = None
                 continue
-            BINARY_MODELS[cancer_type] = current_binary_model
+            model_set.binary_models[cancer_type] = current_binary_model
 
             # --- binary_label_encoder.pkl 로드 (선택 사항이므로 CRITICAL_ERROR 아님) ---
             binary_le_path = os.path.join(binary_model_base_dir, 'binary_label_encoder.pkl')
             current_binary_le = None
             if os.path.exists(binary_le_path):
                 try:
-                    current_binary_le = joblib.load(binary_le_path)
+                    with model_set.track(f'binary/{cancer_type}/label_encoder', binary_le_path):
+                        current_binary_le = joblib.load(binary_le_path)
                     logger.info(f"Binary LabelEncoder found and loaded for {cancer_type} at {binary_le_path}.")
                 except Exception as e:
                     logger.error(f"ERROR: Failed to load binary LabelEncoder for {cancer_type} from {binary_le_path}: {e}", exc_info=True)
             else:
                 logger.info(f"As expected, binary LabelEncoder NOT FOUND for {cancer_type} at {binary_le_path}. Will infer labels from proba.")
-            BINARY_LABEL_ENCODERS[cancer_type] = current_binary_le
+                model_set.record_missing(f'binary/{cancer_type}/label_encoder', binary_le_path, required=False)
+            model_set.binary_label_encoders[cancer_type] = current_binary_le
+
+            # --- 오믹스별 PCA 전처리 자원 (scaler/imputer/PCA, PCA 이전 특성 목록) 로드 ---
+            model_set.binary_pca_assets[cancer_type] = _load_binary_pca_assets(
+                os.path.join(binary_model_base_dir, 'pca_models_and_features'), model_set, f'binary/{cancer_type}/pca'
+            )
 
 
         # --- 3. 각 오믹스별 Expert 모델 (2단계 암종 분류의 하위 모델) 로드 ---
@@ -198,33 +213,38 @@ def load_all_prediction_models():
             expert_features_path = os.path.join(MODEL_BASE_DIR, f"{omics_type_key}_features.txt")
             if os.path.exists(expert_features_path):
                 try:
-                    current_expert_features = pp_utils.load_feature_list(expert_features_path)
+                    with model_set.track(f'expert/{omics_type_key}/features', expert_features_path):
+                        current_expert_features = pp_utils.load_feature_list(expert_features_path)
                     logger.info(f"Loaded Expert features for {omics_type_key} from {expert_features_path} (Count: {len(current_expert_features)})")
                 except Exception as e:
                     logger.error(f"ERROR: Failed to load Expert features for {omics_type_key} from {expert_features_path}: {e}", exc_info=True)
-                    FEATURE_LISTS[omics_type_key] = []
+                    model_set.feature_lists[omics_type_key] = []
                     continue
             else:
                 logger.error(f"ERROR: Expert feature list ({omics_type_key}_features.txt) NOT FOUND for {omics_type_key} at {expert_features_path}. Expert model prediction will be skipped.")
-                FEATURE_LISTS[omics_type_key] = []
+                model_set.record_missing(f'expert/{omics_type_key}/features', expert_features_path)
+                model_set.feature_lists[omics_type_key] = []
                 continue
-            FEATURE_LISTS[omics_type_key] = current_expert_features
+            model_set.feature_lists[omics_type_key] = current_expert_features
+            model_set.feature_indexes[omics_type_key] = pp_utils.FeatureIndex(current_expert_features)
 
             # --- Expert Model Label Encoder 로드 ---
             expert_le_path = os.path.join(expert_model_base_dir, f"{omics_type_key}_label_encoder.pkl")
             if os.path.exists(expert_le_path):
                 try:
-                    current_expert_le = joblib.load(expert_le_path)
+                    with model_set.track(f'expert/{omics_type_key}/label_encoder', expert_le_path):
+                        current_expert_le = joblib.load(expert_le_path)
                     logger.info(f"Loaded Expert LabelEncoder for {omics_type_key} from {expert_le_path}.")
                 except Exception as e:
                     logger.error(f"ERROR: Failed to load Expert LabelEncoder for {omics_type_key} from {expert_le_path}: {e}", exc_info=True)
-                    LABEL_ENCODERS[omics_type_key] = None
+                    model_set.label_encoders[omics_type_key] = None
                     continue
             else:
                 logger.error(f"ERROR: Expert LabelEncoder ({omics_type_key}_label_encoder.pkl) NOT FOUND for {omics_type_key} at {expert_le_path}. Expert model prediction will be impacted.")
-                LABEL_ENCODERS[omics_type_key] = None
+                model_set.record_missing(f'expert/{omics_type_key}/label_encoder', expert_le_path)
+                model_set.label_encoders[omics_type_key] = None
                 continue
-            LABEL_ENCODERS[omics_type_key] = current_expert_le
+            model_set.label_encoders[omics_type_key] = current_expert_le
 
 
             # --- Expert Fold Models 로드 ---
@@ -232,7 +252,8 @@ def load_all_prediction_models():
                 fold_model_path = os.path.join(expert_model_base_dir, f"{omics_type_key}_lgbm_model_fold_{i}.pkl")
                 if os.path.exists(fold_model_path):
                     try:
-                        current_expert_models.append(joblib.load(fold_model_path))
+                        with model_set.track(f'expert/{omics_type_key}/fold_{i}', fold_model_path):
+                            current_expert_models.append(joblib.load(fold_model_path))
                         logger.info(f"Loaded Expert Fold Model {i} for {omics_type_key} from {fold_model_path}.")
                     except Exception as e:
                         print(f"DEBUG_PRINT: CRITICAL_ERROR: Failed to load Expert Fold Model {i} for {omics_type_key} from {fold_model_path}: {e}", file=sys.stderr)
@@ -243,57 +264,147 @@ def load_all_prediction_models():
                 else:
                     print(f"DEBUG_PRINT: CRITICAL_ERROR: Expert Fold Model {i} ({omics_type_key}_lgbm_model_fold_{i}.pkl) NOT FOUND for {omics_type_key} at {os.path.abspath(fold_model_path)}. Expert model prediction will be skipped.", file=sys.stderr)
                     logger.error(f"ERROR: Expert Fold Model {i} ({omics_type_key}_lgbm_model_fold_{i}.pkl) NOT FOUND for {omics_type_key} at {fold_model_path}. Expert model prediction will be skipped.")
+                    model_set.record_missing(f'expert/{omics_type_key}/fold_{i}', fold_model_path)
                     current_expert_models = []
                     break # 현재 오믹스 타입의 다른 폴드 모델 로드 중단
             
-            # 모든 폴드 모델이 성공적으로 로드된 경우에만 OMICS_MODELS에 추가
+            # 모든 폴드 모델이 성공적으로 로드된 경우에만 하나의 앙상블로 묶어 omics_models에 추가
             if current_expert_models and len(current_expert_models) == 5:
-                OMICS_MODELS[omics_type_key] = current_expert_models
+                model_set.omics_models[omics_type_key] = FoldEnsemble(current_expert_models)
             else:
-                OMICS_MODELS[omics_type_key] = [] # 로드 실패 시 빈 리스트로 설정하여 스킵되도록
+                model_set.omics_models[omics_type_key] = [] # 로드 실패 시 빈 리스트로 설정하여 스킵되도록
                 logger.error(f"ERROR: Not all 5 fold models loaded for {omics_type_key}. Expert prediction for this type will be skipped.")
 
+        # --- 4. 업로드 파일 스트리밍 파싱용 특성 합집합 ---
+        model_set.input_feature_indexes = _build_input_feature_indexes(model_set)
+
     except Exception as e: # FileNotFoundError 포함한 모든 최상위 예외
         print(f"DEBUG_PRINT: CRITICAL_ERROR: An unexpected CRITICAL ERROR occurred during model loading process: {e}", file=sys.stderr)
         logger.critical(f"CRITICAL ERROR during model loading process: {e}", exc_info=True)
-        _reset_global_models()
         raise
 
+    return model_set
+
+
+# 파일 한 줄이 특성 하나인 오믹스 (CNV 세그먼트/MAF 변이는 행이 특성과 1:1이 아니므로 전체를 읽음)
+STREAMED_OMICS_TYPES = ('gene', 'mirna', 'meth')
+
+def _build_input_feature_indexes(model_set):
+    """
+    오믹스별로 2단계 전문가 특성과 모든 암종의 1단계 PCA 이전 특성의 합집합 FeatureIndex를 만듭니다.
+    (1단계 최종 특성 목록은 PCA 성분 이름이라 파일의 특성과 직접 대응하지 않음)
+    """
+    indexes = {}
+    for omics_type in STREAMED_OMICS_TYPES:
+        features = dict.fromkeys(model_set.feature_lists.get(omics_type) or [])
+        for pca_assets in model_set.binary_pca_assets.values():
+            assets = pca_assets.get(FILENAME_KEY_MAP[omics_type])
+            if assets:
+                features.update(dict.fromkeys(assets['features']))
+        if features:
+            indexes[omics_type] = pp_utils.FeatureIndex(features)
+            logger.info(f"Input feature index for {omics_type}: {len(features)} features kept when parsing uploads.")
+    return indexes
+
+
+# 프로세스의 현재 모델 세트 (분석은 시작 시 get()으로 받은 세트 하나만 사용)
+model_registry = OmicsModelRegistry(
+    _build_model_set,
+    check_interval=getattr(settings, 'OMICS_MODEL_RELOAD_CHECK_SECONDS', None)
+)
+
+
+def _load_binary_pca_assets(pca_assets_dir, model_set, name_prefix):
+    """
+    한 암종의 오믹스별 PCA 전처리 자원을 로드합니다.
+    반환: {파일 키: {'features', 'feature_index', 'scaler', 'imputer', 'pca', 'pca_columns'}}
+    PCA 모델이나 특성 목록이 없는 오믹스는 제외되어 1단계 전처리에서 건너뜁니다.
+    """
+    assets = {}
+    for filename_key in FILENAME_KEY_MAP.values():
+        pca_model_path = os.path.join(pca_assets_dir, f"{filename_key}_pca_model.joblib")
+        features_path = os.path.join(pca_assets_dir, f"{filename_key}_pre_pca_features.csv")
+        if not os.path.exists(pca_model_path) or not os.path.exists(features_path):
+            # 이 오믹스는 1단계에서 쓰지 않음 (나중에 파일이 생기면 다시 로드)
+            model_set.record_missing(f"{name_prefix}/{filename_key}", pca_model_path, required=False)
+            continue
+        try:
+            with model_set.track(f"{name_prefix}/{filename_key}", pca_model_path):
+                pre_pca_features = pd.read_csv(features_path)['feature'].tolist()
+                scaler_path = os.path.join(pca_assets_dir, f"{filename_key}_scaler.joblib")
+                imputer_path = os.path.join(pca_assets_dir, f"{filename_key}_pca_imputer.joblib")
+                pca = joblib.load(pca_model_path)
+                assets[filename_key] = {
+                    'features': pre_pca_features,
+                    'feature_index': pp_utils.FeatureIndex(pre_pca_features),
+                    'scaler': joblib.load(scaler_path) if os.path.exists(scaler_path) else None,
+                    'imputer': joblib.load(imputer_path) if os.path.exists(imputer_path) else None,
+                    'pca': pca,
+                    'pca_columns': [f"{filename_key}_PCA_PC{i+1}" for i in range(pca.n_components_)],
+                }
+        except Exception as e:
+            logger.error(f"ERROR: Failed to load PCA assets '{filename_key}' from {pca_assets_dir}: {e}", exc_info=True)
+    logger.info(f"Loaded PCA assets from {pca_assets_dir}: {sorted(assets)}")
+    return assets
+
+# ==============================================================================
+# 그래프: 수치 데이터는 결과와 함께 저장(graph_data), 이미지는 결과 저장 후 별도 Task에서 렌더링
+# ==============================================================================
+
+# 메타 모델 버전별 특성 중요도 (모든 요청에 같으므로 프로세스당 한 번 계산)
+_STAGE2_IMPORTANCE_CACHE = {}
+
+def _stage1_signal_data(stage1_results: dict):
+    """1차 분석 결과 -> 암 신호 강도 그래프 데이터 (확률 내림차순 [{'cancer_type', 'label', 'prob'}])"""
+    signal = [
+        {'cancer_type': name, 'label': data.get('label'), 'prob': float(data['prob'])}
+        for name, data in stage1_results.items() if isinstance(data, dict) and 'prob' in data
+    ]
+    return sorted(signal, key=lambda item: item['prob'], reverse=True)
+
+def _stage2_importance_data(model, feature_names, model_version, top_n=20):
+    """메타 모델 특성 중요도 상위 top_n (중요도 내림차순), 모델 버전별로 캐시"""
+    if model_version in _STAGE2_IMPORTANCE_CACHE:
+        return _STAGE2_IMPORTANCE_CACHE[model_version]
+    if not hasattr(model, 'feature_importances_'):
+        logger.warning("The meta model does not have 'feature_importances_'. Skipping feature importance graph.")
+        return None
+    if not isinstance(feature_names, (list, np.ndarray)):
+        logger.error("Feature names for meta model is not a list. Cannot generate graph.")
+        return None
 
-def _reset_global_models(meta_only=False):
-    """모델 로드 실패 시 전역 모델 변수들을 초기화합니다."""
-    global BINARY_MODELS, BINARY_LABEL_ENCODERS, BINARY_FEATURE_LISTS, \
-           META_MODEL, META_LABEL_ENCODER, META_FEATURE_NAMES, OMICS_SCALERS, OMICS_FINAL_IMPUTER, \
-           OMICS_MODELS, LABEL_ENCODERS, FEATURE_LISTS
-    if not meta_only:
-        BINARY_MODELS = {}
-        BINARY_LABEL_ENCODERS = {}
-        BINARY_FEATURE_LISTS = {}
-        OMICS_SCALERS = {} # 여기서 초기화하는 것이 현재로서는 안전
-        OMICS_FINAL_IMPUTER = None
-        OMICS_MODELS = {}
-        LABEL_ENCODERS = {}
-        FEATURE_LISTS = {}
-
-    META_MODEL = None
-    META_LABEL_ENCODER = None
-    META_FEATURE_NAMES = []
+    importances = model.feature_importances_
+    indices = np.argsort(importances)[::-1][:top_n]
+    importance_data = {
+        'model_version': model_version,
+        'features': [str(name) for name in np.array(feature_names)[indices]],
+        'importances': [float(value) for value in importances[indices]],
+    }
+    _STAGE2_IMPORTANCE_CACHE[model_version] = importance_data
+    return importance_data
+
+def _build_graph_data(all_binary_predictions, stage2_ran, models):
+    """API로 제공할 그래프 수치 데이터 (클라이언트가 직접 차트를 그릴 수 있음)"""
+    return {
+        'stage1_signal': _stage1_signal_data(all_binary_predictions),
+        'stage2_importance': (
+            _stage2_importance_data(models.meta_model, models.meta_feature_names, models.meta_model_version)
+            if stage2_ran and models.meta_model and models.meta_feature_names else None
+        ),
+    }
 
 # [그래프 추가] 1차 분석: 암 신호 강도 그래프 생성 함수
-def _generate_stage1_signal_graph(stage1_results: dict):
+def _generate_stage1_signal_graph(signal_data):
     """
     1차 분석 결과를 바탕으로 암 신호 강도 막대그래프를 생성합니다.
-    stage1_results: {'cancer_type': {'label': 'Cancer', 'prob': 0.98}, ...} 형태의 딕셔너리
+    signal_data: _stage1_signal_data()의 [{'cancer_type', 'label', 'prob'}, ...] 목록
     """
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    prob_dict = {name: data['prob'] for name, data in stage1_results.items() if isinstance(data, dict) and 'prob' in data}
-    if not prob_dict:
+    if not signal_data:
         return None
+    plt.style.use('seaborn-v0_8-whitegrid')
 
-    sorted_results = sorted(prob_dict.items(), key=lambda item: item[1], reverse=True)
-    labels = [item[0].replace('_cancer', '').capitalize() for item in sorted_results]
-    probabilities = [item[1] for item in sorted_results]
+    labels = [item['cancer_type'].replace('_cancer', '').capitalize() for item in signal_data]
+    probabilities = [item['prob'] for item in signal_data]
 
     fig, ax = plt.subplots(figsize=(10, 6))
     bars = ax.bar(labels, probabilities, color='skyblue')
@@ -316,24 +427,18 @@ def _generate_stage1_signal_graph(stage1_results: dict):
     return ContentFile(buf.getvalue())
 
 # [그래프 추가] 2차 분석: 바이오마커 기여도 그래프 생성 함수
-def _generate_stage2_feature_importance_graph(model, feature_names):
+def _generate_stage2_feature_importance_graph(importance_data):
     """
     2차 분석 모델(메타 모델)의 특성 중요도를 바탕으로 바이오마커 기여도 그래프를 생성합니다.
+    importance_data: _stage2_importance_data()의 결과 (중요도 내림차순)
     """
-    if not hasattr(model, 'feature_importances_'):
-        logger.warning("The meta model does not have 'feature_importances_'. Skipping feature importance graph.")
+    if not importance_data:
         return None
-
     plt.style.use('seaborn-v0_8-whitegrid')
-    
-    importances = model.feature_importances_
-    if not isinstance(feature_names, (list, np.ndarray)):
-        logger.error("Feature names for meta model is not a list. Cannot generate graph.")
-        return None
 
-    indices = np.argsort(importances)[-20:]
-    top_features = np.array(feature_names)[indices]
-    top_importances = importances[indices]
+    # barh는 아래에서 위로 그리므로 가장 중요한 특성이 맨 위에 오도록 뒤집음
+    top_features = importance_data['features'][::-1]
+    top_importances = importance_data['importances'][::-1]
 
     fig, ax = plt.subplots(figsize=(12, 8))
     ax.barh(top_features, top_importances, color='mediumseagreen')
@@ -346,325 +451,384 @@ def _generate_stage2_feature_importance_graph(model, feature_names):
     plt.close(fig)
     return ContentFile(buf.getvalue())
 
+STAGE2_GRAPH_DIR = 'omics_graphs/stage2'
+
+def _get_stage2_graph_path(importance_data):
+    """모델 버전별로 한 번만 렌더링해 저장소에 두고 모든 결과가 같은 이미지를 참조"""
+    path = f"{STAGE2_GRAPH_DIR}/meta_importance_{importance_data['model_version']}.png"
+    if not default_storage.exists(path):
+        content = _generate_stage2_feature_importance_graph(importance_data)
+        if content is None:
+            return None
+        path = default_storage.save(path, content)
+        logger.info(f"Rendered stage 2 importance graph for meta model version {importance_data['model_version']}: {path}")
+    return path
+
+def render_result_graphs(omics_request_id):
+    """
+    저장된 결과의 graph_data로 1단계 그래프를 그리고, 2단계 그래프는 모델 버전별 공유 이미지를 연결합니다.
+    (결과 저장/COMPLETED 이후 별도 Task에서 실행되며, 실패해도 분석 결과에는 영향이 없음)
+    """
+    try:
+        result_obj = OmicsResult.objects.get(pk=omics_request_id)
+    except OmicsResult.DoesNotExist:
+        logger.warning(f"[{omics_request_id}] No OmicsResult to render graphs for.")
+        return False
+
+    graph_data = result_obj.graph_data or {}
+    stage1_graph_content = _generate_stage1_signal_graph(graph_data.get('stage1_signal'))
+    if stage1_graph_content:
+        if result_obj.stage1_signal_graph:
+            result_obj.stage1_signal_graph.delete(save=False)
+        result_obj.stage1_signal_graph.save(f'stage1_signal_{omics_request_id}.png', stage1_graph_content, save=False)
+
+    importance_data = graph_data.get('stage2_importance')
+    stage2_graph_path = _get_stage2_graph_path(importance_data) if importance_data else None
+    if result_obj.shap_graph and not result_obj.shap_graph.name.startswith(f"{STAGE2_GRAPH_DIR}/meta_importance_"):
+        # 이전 방식의 요청별 이미지만 삭제 (공유 이미지는 다른 결과도 참조)
+        result_obj.shap_graph.delete(save=False)
+    result_obj.shap_graph = stage2_graph_path
+
+    result_obj.save(update_fields=['stage1_signal_graph', 'shap_graph'])
+    logger.info(f"[{omics_request_id}] Result graphs rendered.")
+    return True
+
 
 # ==============================================================================
 # "모델 1: 암 vs 정상" 파이프라인
 # ==============================================================================
 
-def _preprocess_for_binary_model(omics_file, pca_assets_dir):
-    """'모델 1'을 위한 단일 오믹스 파일 전처리 (PCA 변환 포함)"""
-    internal_key = INTERNAL_OMICS_KEY_MAP.get(omics_file.omics_type)
-    file_path = omics_file.input_file.path
-    
-    filename_key = FILENAME_KEY_MAP.get(internal_key)
-    if not filename_key: return pd.DataFrame()
+def _transform_pre_pca(estimator, matrix, assets):
+    """특성 이름으로 학습된 전처리기는 이름을 붙여서 호출 (입력 행렬은 복사하지 않음)"""
+    if hasattr(estimator, 'feature_names_in_'):
+        return estimator.transform(pd.DataFrame(matrix, columns=assets['features'], copy=False))
+    return estimator.transform(matrix)
 
-    pca_model_path = os.path.join(pca_assets_dir, f"{filename_key}_pca_model.joblib")
-    if not os.path.exists(pca_model_path):
-        return pd.DataFrame()
 
-    try:
-        processed_df = pd.DataFrame()
-        if internal_key == 'gene':
-            raw_df = pd.read_csv(file_path, sep='\t', comment='#')
-            processed_df = pp_utils.preprocess_long_format(raw_df, 'gene_name', 'tpm_unstranded')
-        elif internal_key == 'mirna':
-            raw_df = pd.read_csv(file_path, sep='\t')
-            processed_df = pp_utils.preprocess_long_format(raw_df, 'miRNA_ID', 'reads_per_million_miRNA_mapped')
-        elif internal_key == 'cnv':
-            raw_df = pd.read_csv(file_path, sep='\t')
-            if GENCODE_GTF_DF is not None:
-                processed_df = pp_utils.map_cnv_segments_to_genes(raw_df, GENCODE_GTF_DF)
-        elif internal_key == 'mutation':
-            raw_df = pd.read_csv(file_path, sep='\t', comment='#')
-            processed_df = pp_utils.preprocess_mutation_file(raw_df)
-        elif internal_key == 'meth':
-            raw_df = pd.read_csv(file_path, sep='\t', header=None, names=['feature', 'value'])
-            raw_df['value'] = pd.to_numeric(raw_df['value'], errors='coerce').fillna(0)
-            processed_df = raw_df.set_index('feature')['value'].to_frame().T
-            processed_df.index = ['single_patient']
-
-        if processed_df.empty: return pd.DataFrame()
+def parse_request_files(omics_request, models=None):
+    """
+    요청의 업로드 파일을 각각 한 번만 읽어 1단계/2단계가 공유할 ParsedOmicsFile 목록을 반환합니다.
+    (읽기 실패한 파일은 빈 결과로 남아 두 단계 모두에서 건너뜁니다)
+    """
+    if models is None:
+        models = model_registry.get()
+    parsed_files = []
+    for omics_file in omics_request.data_files.all():
+        internal_key = INTERNAL_OMICS_KEY_MAP.get(omics_file.omics_type)
+        file_path = omics_file.input_file.path
+        try:
+            parsed = pp_utils.parse_omics_file(
+                file_path, internal_key, gene_index=models.gene_interval_index,
+                feature_index=models.input_feature_indexes.get(internal_key),
+                chunksize=getattr(settings, 'OMICS_PARSE_CHUNK_ROWS', 100_000)
+            )
+        except Exception as e:
+            logger.error(f"[{omics_request.id}] Failed to parse '{internal_key}' file '{os.path.basename(file_path)}': {e}", exc_info=True)
+            parsed = pp_utils.ParsedOmicsFile(internal_key, os.path.basename(file_path), error=str(e))
+        if parsed.error:
+            logger.error(f"[{omics_request.id}] FILE VALIDATION FAILED for '{internal_key}'. File '{parsed.name}': {parsed.error}")
+        parsed_files.append(parsed)
+    return parsed_files
+
+def _preprocess_for_binary_model(omics_type, vectors, pca_assets):
+    """
+    '모델 1'을 위한 오믹스 전처리 (PCA 변환 포함, pca_assets는 로드 시 캐시된 암종별 자원).
+    같은 오믹스 유형의 여러 요청 벡터를 (요청 수, 특성 수) 행렬 하나로 변환하며, 자원이 없으면 None을 반환합니다.
+    """
+    filename_key = FILENAME_KEY_MAP.get(omics_type)
+    if not filename_key: return None
 
-        features_path = os.path.join(pca_assets_dir, f"{filename_key}_pre_pca_features.csv")
-        pre_pca_features = pd.read_csv(features_path)['feature'].tolist()
-        processed_df = processed_df.reindex(columns=pre_pca_features, fill_value=0)
-        
-        scaler_path = os.path.join(pca_assets_dir, f"{filename_key}_scaler.joblib")
-        if os.path.exists(scaler_path):
-            scaler = joblib.load(scaler_path)
-            processed_df = pd.DataFrame(scaler.transform(processed_df), columns=processed_df.columns, index=processed_df.index)
+    assets = pca_assets.get(filename_key)
+    if not assets:
+        return None
 
-        imputer_path = os.path.join(pca_assets_dir, f"{filename_key}_pca_imputer.joblib")
-        if os.path.exists(imputer_path):
-            imputer = joblib.load(imputer_path)
-            processed_df = pd.DataFrame(imputer.transform(processed_df), columns=processed_df.columns, index=processed_df.index)
+    try:
+        # PCA 이전 특성 순서의 (요청 수, 특성 수) 행렬 (PCA/scaler 입력은 float64 유지)
+        matrix = assets['feature_index'].dense_rows(vectors, dtype=np.float64)
+        if assets['scaler'] is not None:
+            matrix = _transform_pre_pca(assets['scaler'], matrix, assets)
+        if assets['imputer'] is not None:
+            matrix = _transform_pre_pca(assets['imputer'], matrix, assets)
 
-        pca = joblib.load(pca_model_path)
-        transformed_values = pca.transform(processed_df)
-        pca_cols = [f"{filename_key}_PCA_PC{i+1}" for i in range(pca.n_components_)]
-        return pd.DataFrame(transformed_values, columns=pca_cols, index=processed_df.index)
+        transformed_values = _transform_pre_pca(assets['pca'], matrix, assets)
+        return pd.DataFrame(transformed_values, columns=assets['pca_columns'])
 
     except Exception as e:
-        logger.error(f"'{internal_key}' 바이너리 모델 전처리(PCA 포함) 중 오류: {e}", exc_info=True)
-        return pd.DataFrame()
+        logger.error(f"'{omics_type}' 바이너리 모델 전처리(PCA 포함) 중 오류: {e}", exc_info=True)
+        return None
+
+def _group_vectors_by_omics_type(parsed_files_list, stage):
+    """요청별 파싱 결과 -> {오믹스 유형: (요청 행 번호 목록, OmicsVector 목록)} (stage: 'binary' 또는 'expert')"""
+    groups = {}
+    for row, parsed_files in enumerate(parsed_files_list):
+        for parsed_file in parsed_files:
+            vector = getattr(parsed_file, stage)
+            if vector.empty:
+                continue
+            rows, vectors = groups.setdefault(parsed_file.omics_type, ([], []))
+            if rows and rows[-1] == row:  # 같은 요청에 같은 유형 파일이 여러 개면 첫 파일만 사용
+                continue
+            rows.append(row)
+            vectors.append(vector)
+    return groups
 
-def run_binary_cancer_prediction(omics_request):
-    """'모델 1' 전체 파이프라인 실행"""
-    patient_id = str(omics_request.id)
-    all_binary_predictions = {}
+def run_binary_cancer_prediction_batch(parsed_files_list, request_ids, models=None):
+    """
+    '모델 1' 일괄 실행: 요청별 파싱 결과 목록을 암종마다 (요청 수, 특성 수) 행렬 하나로 쌓아 한 번에 예측합니다.
+    반환: 요청 순서대로 {암종: {'label', 'prob'}} 목록
+    """
+    if models is None:
+        models = model_registry.get()
+    all_binary_predictions = [{} for _ in parsed_files_list]
+    groups = _group_vectors_by_omics_type(parsed_files_list, 'binary')
     
-    for cancer_type in BINARY_MODELS.keys():
+    for cancer_type in models.binary_models.keys():
         try:
-            model = BINARY_MODELS.get(cancer_type)
-            final_features = BINARY_FEATURE_LISTS.get(cancer_type)
+            model = models.binary_models.get(cancer_type)
+            final_features = models.binary_feature_lists.get(cancer_type)
             if not model or not final_features:
-                all_binary_predictions[cancer_type] = {'label': 'SKIPPED', 'prob': 0.0, 'error': "Model or features not loaded."}
+                for predictions in all_binary_predictions:
+                    predictions[cancer_type] = {'label': 'SKIPPED', 'prob': 0.0, 'error': "Model or features not loaded."}
                 continue
 
-            pca_assets_dir = os.path.join(settings.BASE_DIR, 'ml_models', cancer_type, 'pca_models_and_features')
-            combined_pca_df = pd.DataFrame(index=[patient_id])
+            pca_assets = models.binary_pca_assets.get(cancer_type, {})
+            final_index = pp_utils.FeatureIndex(final_features)
+            input_matrix = np.zeros((len(parsed_files_list), len(final_features)), dtype=np.float64)
 
-            for omics_file in omics_request.data_files.all():
-                processed_pca_df = _preprocess_for_binary_model(omics_file, pca_assets_dir)
-                if not processed_pca_df.empty:
-                    processed_pca_df.index = [patient_id]
-                    combined_pca_df = combined_pca_df.merge(processed_pca_df, left_index=True, right_index=True, how='left')
-            
-            combined_pca_df.fillna(0, inplace=True)
-            final_input_df = combined_pca_df.reindex(columns=final_features, fill_value=0.0)
+            for omics_type, (rows, vectors) in groups.items():
+                processed_pca_df = _preprocess_for_binary_model(omics_type, vectors, pca_assets)
+                if processed_pca_df is None:
+                    continue
+                positions = final_index.lookup(processed_pca_df.columns)
+                keep = positions >= 0
+                input_matrix[np.ix_(rows, positions[keep])] = processed_pca_df.to_numpy()[:, keep]
             
-            pred_proba = model.predict_proba(final_input_df)[0]
+            final_input_df = pd.DataFrame(np.nan_to_num(input_matrix, nan=0.0), columns=final_features)
+            pred_probas = model.predict_proba(final_input_df)
             
-            label, prob = ('Cancer', pred_proba[1]) if pred_proba[1] > pred_proba[0] else ('Normal', pred_proba[0])
-            logger.info(f"[{omics_request.id}] Binary Model '{cancer_type}' Result: Label='{label}', Probability={prob:.4f}, Proba_vector={pred_proba}")
-            all_binary_predictions[cancer_type] = {'label': label, 'prob': float(prob)}
+            for request_id, predictions, pred_proba in zip(request_ids, all_binary_predictions, pred_probas):
+                label, prob = ('Cancer', pred_proba[1]) if pred_proba[1] > pred_proba[0] else ('Normal', pred_proba[0])
+                logger.info(f"[{request_id}] Binary Model '{cancer_type}' Result: Label='{label}', Probability={prob:.4f}, Proba_vector={pred_proba}")
+                predictions[cancer_type] = {'label': label, 'prob': float(prob)}
 
         except Exception as e:
             logger.error(f"'모델 1' {cancer_type} 예측 중 오류: {e}", exc_info=True)
-            all_binary_predictions[cancer_type] = {'label': 'ERROR', 'prob': 0.0, 'error': str(e)}
+            for predictions in all_binary_predictions:
+                predictions[cancer_type] = {'label': 'ERROR', 'prob': 0.0, 'error': str(e)}
 
     return all_binary_predictions
 
+def run_binary_cancer_prediction(omics_request, parsed_files=None, models=None):
+    """'모델 1' 전체 파이프라인 실행 (parsed_files가 없으면 요청의 파일을 직접 읽음)"""
+    if models is None:
+        models = model_registry.get()
+    if parsed_files is None:
+        parsed_files = parse_request_files(omics_request, models)
+    return run_binary_cancer_prediction_batch([parsed_files], [omics_request.id], models)[0]
+
 # ==============================================================================
 # "모델 2: 암종 상세 분류" 파이프라인
 # ==============================================================================
 
-def _preprocess_for_expert_model(omics_file):
+def _expert_input_matrix(omics_type, vectors, models):
     """
-    [데이터 파싱 강화 버전]
-    파일을 처리하기 전, 파일의 내용(컬럼)이 omics_type과 일치하는지 먼저 검증하고,
-    쉼표(csv) 또는 탭(tsv)으로 구분된 데이터를 모두 처리할 수 있도록 수정합니다.
+    환자별 OmicsVector 목록 -> 전문가 모델 입력 행렬 (환자 수, 특성 수).
+    변이(존재 여부)는 CSR 희소 행렬, 나머지는 float32 밀집 행렬로 특성 목록 순서에 바로 채웁니다.
     """
-    internal_key = INTERNAL_OMICS_KEY_MAP.get(omics_file.omics_type)
-    file_path = omics_file.input_file.path
-    processed_df = pd.DataFrame()
-    request_id = omics_file.request.id
-
-    try:
-        # [수정] 쉼표 또는 탭을 구분자로 자동으로 인식하도록 read_csv 수정
-        # sep=None, engine='python'을 사용하면 구분자를 자동으로 감지합니다.
-        # 만약 데이터가 복잡하면, sep='[,\t]' 정규식을 사용할 수도 있습니다.
-        raw_df = pd.read_csv(file_path, sep=None, engine='python', comment='#', on_bad_lines='skip')
-
-        if internal_key == 'gene':
-            if 'tpm_unstranded' not in raw_df.columns:
-                logger.error(f"[{request_id}] FILE VALIDATION FAILED for 'gene'. File '{os.path.basename(file_path)}' lacks 'tpm_unstranded'. Columns found: {raw_df.columns.tolist()}")
-                return pd.DataFrame()
-            raw_df['log_tpm'] = np.log2(pd.to_numeric(raw_df['tpm_unstranded'], errors='coerce').fillna(0) + 1)
-            processed_df = pp_utils.preprocess_long_format(raw_df, 'gene_name', 'log_tpm')
-
-        elif internal_key == 'mirna':
-            if 'reads_per_million_miRNA_mapped' not in raw_df.columns:
-                logger.error(f"[{request_id}] FILE VALIDATION FAILED for 'mirna'. File '{os.path.basename(file_path)}' lacks 'reads_per_million_miRNA_mapped'. Columns found: {raw_df.columns.tolist()}")
-                return pd.DataFrame()
-            raw_df['log_rpm'] = np.log2(pd.to_numeric(raw_df['reads_per_million_miRNA_mapped'], errors='coerce').fillna(0) + 1)
-            processed_df = pp_utils.preprocess_long_format(raw_df, 'miRNA_ID', 'log_rpm')
-        elif internal_key == 'cnv':
-            raw_df = pd.read_csv(file_path, sep='\t')
-            if GENCODE_GTF_DF is not None:
-                processed_df = pp_utils.map_cnv_segments_to_genes(raw_df, GENCODE_GTF_DF)
-        elif internal_key == 'mutation':
-            raw_df = pd.read_csv(file_path, sep='\t', comment='#')
-            processed_df = pp_utils.preprocess_mutation_file(raw_df)
-        elif internal_key == 'meth':
-            raw_df = pd.read_csv(file_path, sep='\t', header=None, names=['feature', 'value'])
-            raw_df['value'] = pd.to_numeric(raw_df['value'], errors='coerce').fillna(0)
-            processed_df = raw_df.set_index('feature')['value'].to_frame().T
-            processed_df.index = ['single_patient']
-        return processed_df
-    except Exception as e:
-        logger.error(f"'{internal_key}' 전문가 모델 전처리 중 오류: {e}", exc_info=True)
-        return pd.DataFrame()
-
-def run_cancer_type_classification_prediction(omics_request):
-    logger.info(f"[{omics_request.id}] --- STAGE 2: Cancer Type Classification START ---")
-    
-    omics_files = omics_request.data_files.all()
-    logger.info(f"[{omics_request.id}] STAGE 2: Successfully fetched {len(omics_files)} files. Starting expert model loop...")
+    feature_index = models.feature_indexes.get(omics_type)
+    if feature_index is None:
+        feature_index = pp_utils.FeatureIndex(models.feature_lists.get(omics_type, []))
+    if omics_type == 'mutation':
+        matrix = feature_index.sparse_rows(vectors)
+    else:
+        matrix = feature_index.dense_rows(vectors)
+
+    scaler = models.omics_scalers.get(omics_type)
+    if scaler:
+        dense_matrix = matrix.toarray() if hasattr(matrix, 'toarray') else matrix
+        matrix = scaler.transform(dense_matrix).astype(np.float32)
+    return matrix
+
+def run_cancer_type_classification_batch(parsed_files_list, request_ids, models=None):
+    """
+    '모델 2' 일괄 실행: 오믹스 유형마다 요청들의 입력을 쌓아 전문가 앙상블을 한 번, 메타 모델을 한 번 호출합니다.
+    반환: 요청 순서대로 {'predicted_cancer_type', 'prediction_probabilities', 'biomarkers'} 목록
+    """
+    if models is None:
+        models = model_registry.get()
+    logger.info(f"--- STAGE 2: Cancer Type Classification START for {len(request_ids)} request(s) ---")
     
-    meta_model_input_features = {}
+    meta_model_input_features = [{} for _ in parsed_files_list]
+    groups = _group_vectors_by_omics_type(parsed_files_list, 'expert')
     
-    for omics_type, expert_models in OMICS_MODELS.items():
-        logger.info(f"[{omics_request.id}] >>>>> Loop Start for omics_type: [{omics_type}] <<<<<")
+    for omics_type, expert_models in models.omics_models.items():
+        logger.info(f">>>>> Loop Start for omics_type: [{omics_type}] <<<<<")
         
         if not expert_models:
-            logger.warning(f"[{omics_request.id}] '{omics_type}' expert models not loaded, skipping.")
+            logger.warning(f"'{omics_type}' expert models not loaded, skipping.")
             continue
             
-        target_file = next((f for f in omics_files if INTERNAL_OMICS_KEY_MAP.get(f.omics_type) == omics_type), None)
-        if not target_file:
-            logger.warning(f"[{omics_request.id}] '{omics_type}' file not found, skipping.")
+        rows, vectors = groups.get(omics_type, ([], []))
+        if not rows:
+            logger.warning(f"'{omics_type}' file not found or processed data is empty, skipping.")
             continue
 
         try:
-            logger.info(f"[{omics_request.id}] PRE-PROCESSING START for [{omics_type}]...")
-            processed_df = _preprocess_for_expert_model(target_file)
-            logger.info(f"[{omics_request.id}] PRE-PROCESSING END for [{omics_type}]. DataFrame is empty: {processed_df.empty}")
-            
-            if processed_df.empty:
-                logger.warning(f"[{omics_request.id}] '{omics_type}' processed data is empty, skipping.")
-                continue
-
-            features = FEATURE_LISTS.get(omics_type, [])
+            features = models.feature_lists.get(omics_type, [])
             if not features: continue
             
-            logger.info(f"[{omics_request.id}] Loaded {len(features)} features for [{omics_type}]. Starting reindex...")
-            input_df = processed_df.reindex(columns=features, fill_value=0)
-            
-            # [수정] 로깅 위치 변경: input_df가 정의된 이후로 이동
-            logger.info(f"[{omics_request.id}] Input data shape for {omics_type}: {input_df.shape}")
-            
-            input_df = input_df.astype(np.float32)
-
-            if omics_type in OMICS_SCALERS and OMICS_SCALERS[omics_type]:
-                scaler = OMICS_SCALERS[omics_type]
-                input_df = pd.DataFrame(scaler.transform(input_df), columns=input_df.columns, index=input_df.index)
+            logger.info(f"Loaded {len(features)} features for [{omics_type}]. Aligning {len(vectors)} sample(s)...")
+            input_matrix = _expert_input_matrix(omics_type, vectors, models)
+            logger.info(f"Input data shape for {omics_type}: {input_matrix.shape}")
 
-            logger.info(f"[{omics_request.id}] Predicting with {len(expert_models)}-fold models for '{omics_type}'...")
-            all_fold_preds = [model.predict_proba(input_df) for model in expert_models]
-            avg_pred_proba = np.mean(all_fold_preds, axis=0)[0]
+            logger.info(f"Predicting with {len(expert_models)}-fold ensemble for '{omics_type}'...")
+            avg_pred_probas = expert_models.predict_proba(input_matrix)
 
-            le = LABEL_ENCODERS.get(omics_type)
+            le = models.label_encoders.get(omics_type)
             if not le:
-                logger.warning(f"[{omics_request.id}] LabelEncoder for {omics_type} not found. Skipping meta feature generation.")
+                logger.warning(f"LabelEncoder for {omics_type} not found. Skipping meta feature generation.")
                 continue
 
-            for i, class_name in enumerate(le.classes_):
-                meta_feature_name = f"pred_{omics_type}_{class_name}"
-                meta_model_input_features[meta_feature_name] = avg_pred_proba[i]
+            meta_feature_names = [f"pred_{omics_type}_{class_name}" for class_name in le.classes_]
+            for row, avg_pred_proba in zip(rows, avg_pred_probas):
+                meta_model_input_features[row].update(zip(meta_feature_names, avg_pred_proba))
 
         except Exception as e:
             logger.error(f"Error during '{omics_type}' expert model prediction: {e}", exc_info=True)
 
-    if not meta_model_input_features:
-        logger.error(f"[{omics_request.id}] No meta model input features collected. Returning failed prediction.")
-        return {'predicted_cancer_type': 'Prediction Failed', 'prediction_probabilities': {}, 'biomarkers': []}
-
-    meta_input_df = pd.DataFrame([meta_model_input_features]).reindex(columns=META_FEATURE_NAMES, fill_value=0)
-
-    if OMICS_FINAL_IMPUTER and meta_input_df.isnull().values.any():
-        meta_input_df = pd.DataFrame(OMICS_FINAL_IMPUTER.transform(meta_input_df), columns=meta_input_df.columns, index=meta_input_df.index)
-
-    final_pred_proba = META_MODEL.predict_proba(meta_input_df)[0]
-    predicted_class_index = np.argmax(final_pred_proba)
-    predicted_cancer_type = META_LABEL_ENCODER.inverse_transform([predicted_class_index])[0]
-    prediction_probabilities = dict(zip(META_LABEL_ENCODER.classes_, final_pred_proba.tolist()))
+    results = [
+        {'predicted_cancer_type': 'Prediction Failed', 'prediction_probabilities': {}, 'biomarkers': []}
+        for _ in parsed_files_list
+    ]
+    scored_rows = [row for row, features in enumerate(meta_model_input_features) if features]
+    for row in set(range(len(results))) - set(scored_rows):
+        logger.error(f"[{request_ids[row]}] No meta model input features collected. Returning failed prediction.")
+    if not scored_rows:
+        return results
+
+    # 요청마다 없는 오믹스의 메타 특성을 0으로 채움 (배치 전체에 없는 열만 채우면 다른 요청과 섞일 때 NaN이 남음)
+    meta_input_df = pd.DataFrame(
+        [[meta_model_input_features[row].get(name, 0.0) for name in models.meta_feature_names] for row in scored_rows],
+        columns=models.meta_feature_names
+    )
+
+    if models.final_imputer and meta_input_df.isnull().values.any():
+        meta_input_df = pd.DataFrame(models.final_imputer.transform(meta_input_df), columns=meta_input_df.columns, index=meta_input_df.index)
+
+    final_pred_probas = models.meta_model.predict_proba(meta_input_df)
+    predicted_cancer_types = models.meta_label_encoder.inverse_transform(np.argmax(final_pred_probas, axis=1))
     
-    biomarkers = []
-    if not meta_input_df.empty:
-        top_biomarkers = meta_input_df.iloc[0].nlargest(5)
-        biomarkers = [{'name': name, 'value': f"{val:.4f}"} for name, val in top_biomarkers.items() if val > 0]
+    for i, row in enumerate(scored_rows):
+        top_biomarkers = meta_input_df.iloc[i].nlargest(5)
+        results[row] = {
+            'predicted_cancer_type': predicted_cancer_types[i],
+            'prediction_probabilities': dict(zip(models.meta_label_encoder.classes_, final_pred_probas[i].tolist())),
+            'biomarkers': [{'name': name, 'value': f"{val:.4f}"} for name, val in top_biomarkers.items() if val > 0],
+        }
+    return results
+
+def run_cancer_type_classification_prediction(omics_request, parsed_files=None, models=None):
+    if models is None:
+        models = model_registry.get()
+    if parsed_files is None:
+        parsed_files = parse_request_files(omics_request, models)
+    logger.info(f"[{omics_request.id}] STAGE 2: Using {len(parsed_files)} parsed files.")
+    return run_cancer_type_classification_batch([parsed_files], [omics_request.id], models)[0]
+
+
+# 1단계 암종 키 -> UI에 표시될 암종 이름
+STAGE1_DISPLAY_NAMES = {
+    'ovarian_cancer': 'OV', 'breast_cancer': 'BRCA', 'stomach_cancer': 'STAD',
+    'kidney_cancer': 'KIRC', 'lung_cancer': 'LUSC', 'liver_cancer': 'LIHC'
+}
 
-    return {'predicted_cancer_type': predicted_cancer_type, 'prediction_probabilities': prediction_probabilities, 'biomarkers': biomarkers}
+def _cancer_predictions(all_binary_predictions):
+    """1단계에서 'Cancer'로 예측된 결과들만 필터링"""
+    return {ct: pred for ct, pred in all_binary_predictions.items() if isinstance(pred, dict) and pred.get('label') == 'Cancer'}
+
+def _build_result_fields(omics_request_id, all_binary_predictions, classification_result_stage2, models):
+    """
+    [UI 표시 텍스트 기준] 1단계 최고 확률 암종을 표시 이름으로, 2단계 결과는 상세 확률/바이오마커로 저장할 OmicsResult 필드
+    """
+    # --- 변수 초기화 ---
+    final_predicted_type_for_display = '정상'
+    final_prediction_probabilities_from_stage2 = {}
+    final_biomarkers_from_stage2 = []
+    binary_pred_value_for_db = 0  # 0: 정상, 1: 암
+    binary_pred_prob_for_db = 0.0
+
+    cancer_predictions_stage1 = _cancer_predictions(all_binary_predictions)
+
+    if cancer_predictions_stage1:
+        # --- 1단계 기반으로 최종 표시될 텍스트 결정 ---
+        binary_pred_value_for_db = 1
+        top_cancer_key_stage1 = max(cancer_predictions_stage1, key=lambda k: cancer_predictions_stage1[k]['prob'])
+        binary_pred_prob_for_db = cancer_predictions_stage1[top_cancer_key_stage1]['prob']
+        
+        # UI에 표시될 암종 이름 설정
+        final_predicted_type_for_display = STAGE1_DISPLAY_NAMES.get(top_cancer_key_stage1, top_cancer_key_stage1.upper())
+        logger.info(f"[{omics_request_id}] Stage 1 Top Result (for UI display): {final_predicted_type_for_display} with probability {binary_pred_prob_for_db:.4f}")
 
+        if classification_result_stage2:
+            final_prediction_probabilities_from_stage2 = classification_result_stage2.get('prediction_probabilities', {})
+            final_biomarkers_from_stage2 = classification_result_stage2.get('biomarkers', [])
+            logger.info(f"[{omics_request_id}] Stage 2 analysis completed. Meta-model prediction was '{classification_result_stage2.get('predicted_cancer_type', 'Unknown')}'")
+    else:
+        logger.info(f"[{omics_request_id}] No cancer signal from Stage 1. Final decision: Normal.")
+        if models.meta_label_encoder:
+            final_prediction_probabilities_from_stage2 = {cls: 0.0 for cls in models.meta_label_encoder.classes_}
+
+    return {
+        'binary_cancer_prediction': binary_pred_value_for_db,
+        'binary_cancer_probability': float(binary_pred_prob_for_db),
+        'predicted_cancer_type_name': final_predicted_type_for_display,  # [핵심] UI 표시용 이름은 1단계 결과 사용
+        'all_cancer_type_probabilities': final_prediction_probabilities_from_stage2, # 상세 확률은 2단계 결과 저장 (참고용)
+        'biomarkers': final_biomarkers_from_stage2, # 바이오마커는 2단계 결과 저장
+        'graph_data': _build_graph_data(all_binary_predictions, stage2_ran=bool(cancer_predictions_stage1), models=models),
+    }
 
 # [수정] NameError 수정 및 그래프 저장 로직 통합 버전
-def run_sequential_diagnosis_pipeline(omics_request_id, save_to_db=True):
+def run_sequential_diagnosis_pipeline(omics_request_id, save_to_db=True, models=None):
     """
     [UI 표시 텍스트 수정 버전]
-    2단계 분석을 모두 실행하여 그래프와 상세 정보를 생성하되,
+    2단계 분석을 모두 실행하여 그래프 데이터와 상세 정보를 생성하되,
     '가장 유력한 암 종류'로 표시될 텍스트는 1단계 분석의 최고 확률 암종으로 설정합니다.
+    그래프 이미지는 그리지 않으며(render_result_graphs), 결과가 저장되어 COMPLETED가 되면 True를 반환합니다.
+    models가 없으면 레지스트리의 현재 모델 세트를 사용합니다.
     """
     try:
         omics_request = OmicsRequest.objects.get(id=omics_request_id)
         omics_request.status = 'PROCESSING'
         omics_request.save(update_fields=['status'])
 
+        # 처리 도중 모델이 다시 로드되어도 이 요청은 시작할 때의 모델 세트 하나로 끝까지 처리
+        if models is None:
+            models = model_registry.get()
+        logger.info(f"[{omics_request_id}] Using omics model set v{models.version}.")
+
+        # 업로드 파일은 여기서 한 번만 읽어 1단계/2단계에서 공유
+        parsed_files = parse_request_files(omics_request, models)
+
         # --- 1단계: 암 vs 정상 분석 ---
-        all_binary_predictions = run_binary_cancer_prediction(omics_request)
-        stage1_graph_content = _generate_stage1_signal_graph(all_binary_predictions)
-
-        # --- 변수 초기화 ---
-        final_predicted_type_for_display = '정상'
-        final_prediction_probabilities_from_stage2 = {}
-        final_biomarkers_from_stage2 = []
-        binary_pred_value_for_db = 0  # 0: 정상, 1: 암
-        binary_pred_prob_for_db = 0.0
-        stage2_graph_content = None
-
-        # 1단계에서 'Cancer'로 예측된 결과들만 필터링
-        cancer_predictions_stage1 = {ct: pred for ct, pred in all_binary_predictions.items() if isinstance(pred, dict) and pred.get('label') == 'Cancer'}
-
-        if cancer_predictions_stage1:
-            # --- 1단계 기반으로 최종 표시될 텍스트 결정 ---
-            binary_pred_value_for_db = 1
-            top_cancer_key_stage1 = max(cancer_predictions_stage1, key=lambda k: cancer_predictions_stage1[k]['prob'])
-            binary_pred_prob_for_db = cancer_predictions_stage1[top_cancer_key_stage1]['prob']
-            
-            # UI에 표시될 암종 이름 설정
-            name_map = {
-                'ovarian_cancer': 'OV', 'breast_cancer': 'BRCA', 'stomach_cancer': 'STAD',
-                'kidney_cancer': 'KIRC', 'lung_cancer': 'LUSC', 'liver_cancer': 'LIHC'
-            }
-            final_predicted_type_for_display = name_map.get(top_cancer_key_stage1, top_cancer_key_stage1.upper())
-            logger.info(f"[{omics_request_id}] Stage 1 Top Result (for UI display): {final_predicted_type_for_display} with probability {binary_pred_prob_for_db:.4f}")
-
-            # --- 2단계 분석 실행 (그래프, 바이오마커, 상세 확률 정보 생성 목적) ---
+        all_binary_predictions = run_binary_cancer_prediction(omics_request, parsed_files, models)
+
+        classification_result_stage2 = None
+        if _cancer_predictions(all_binary_predictions):
+            # --- 2단계 분석 실행 (그래프 데이터, 바이오마커, 상세 확률 정보 생성 목적) ---
             logger.info(f"[{omics_request_id}] Running Stage 2 for graph and detailed data generation.")
-            classification_result_stage2 = run_cancer_type_classification_prediction(omics_request)
-            final_prediction_probabilities_from_stage2 = classification_result_stage2.get('prediction_probabilities', {})
-            final_biomarkers_from_stage2 = classification_result_stage2.get('biomarkers', [])
-            
-            # 2단계 그래프 생성
-            if META_MODEL and META_FEATURE_NAMES:
-                stage2_graph_content = _generate_stage2_feature_importance_graph(META_MODEL, META_FEATURE_NAMES)
-            
-            logger.info(f"[{omics_request_id}] Stage 2 analysis completed. Meta-model prediction was '{classification_result_stage2.get('predicted_cancer_type', 'Unknown')}'")
+            classification_result_stage2 = run_cancer_type_classification_prediction(omics_request, parsed_files, models)
 
-        else:
-            logger.info(f"[{omics_request_id}] No cancer signal from Stage 1. Final decision: Normal.")
-            if META_LABEL_ENCODER:
-                final_prediction_probabilities_from_stage2 = {cls: 0.0 for cls in META_LABEL_ENCODER.classes_}
+        result_fields = _build_result_fields(omics_request_id, all_binary_predictions, classification_result_stage2, models)
 
         # --- DB 저장 ---
         if save_to_db:
-            result_obj, created = OmicsResult.objects.update_or_create(
-                request=omics_request,
-                defaults={
-                    'binary_cancer_prediction': binary_pred_value_for_db,
-                    'binary_cancer_probability': float(binary_pred_prob_for_db),
-                    'predicted_cancer_type_name': final_predicted_type_for_display,  # [핵심] UI 표시용 이름은 1단계 결과 사용
-                    'all_cancer_type_probabilities': final_prediction_probabilities_from_stage2, # 상세 확률은 2단계 결과 저장 (참고용)
-                    'biomarkers': final_biomarkers_from_stage2, # 바이오마커는 2단계 결과 저장
-                }
-            )
-            
-            if stage1_graph_content:
-                result_obj.stage1_signal_graph.save(f'stage1_signal_{omics_request_id}.png', stage1_graph_content, save=False)
-            
-            if stage2_graph_content:
-                result_obj.shap_graph.save(f'stage2_biomarker_{omics_request_id}.png', stage2_graph_content, save=False)
-            else:
-                if result_obj.shap_graph:
-                    result_obj.shap_graph.delete(save=False)
-            
-            result_obj.save()
+            OmicsResult.objects.update_or_create(request=omics_request, defaults=result_fields)
 
             omics_request.status = 'COMPLETED'
             omics_request.error_message = None
             omics_request.save(update_fields=['status', 'error_message'])
             logger.info(f"Hybrid prediction (UI: Stage 1, Data: Stage 2) COMPLETED for OmicsRequest ID: {omics_request_id}.")
+            return True
 
     except Exception as e:
         logger.critical(f"Critical error in hybrid pipeline (Request ID: {omics_request_id}): {e}", exc_info=True)
@@ -675,3 +839,62 @@ def run_sequential_diagnosis_pipeline(omics_request_id, save_to_db=True):
             req_to_fail.save(update_fields=['status', 'error_message'])
         except OmicsRequest.DoesNotExist:
             logger.error(f"Failed to update status for non-existent OmicsRequest ID: {omics_request_id}")
+    return False
+
+
+RESULT_FIELDS = [
+    'binary_cancer_prediction', 'binary_cancer_probability', 'predicted_cancer_type_name',
+    'all_cancer_type_probabilities', 'biomarkers', 'graph_data',
+]
+
+def run_batch_diagnosis_pipeline(omics_request_ids):
+    """
+    이미 PROCESSING으로 선점된 여러 요청을 한 번에 분석합니다.
+    1단계는 암종마다, 2단계는 오믹스 유형마다 요청들의 입력을 행렬 하나로 쌓아 예측하고 결과를 일괄 저장합니다.
+    반환: 완료된 요청 ID 목록 (그래프 이미지는 render_result_graphs에서 별도로 렌더링)
+    """
+    omics_request_ids = [str(request_id) for request_id in omics_request_ids]
+    try:
+        omics_requests = list(OmicsRequest.objects.filter(id__in=omics_request_ids).prefetch_related('data_files'))
+        request_ids = [str(omics_request.id) for omics_request in omics_requests]
+        logger.info(f"Batch pipeline START for {len(omics_requests)} OmicsRequest(s).")
+
+        models = model_registry.get()
+        parsed_files_list = [parse_request_files(omics_request, models) for omics_request in omics_requests]
+
+        # --- 1단계: 암종마다 모든 요청을 한 번에 ---
+        all_binary_predictions = run_binary_cancer_prediction_batch(parsed_files_list, request_ids, models)
+
+        # --- 2단계: 암 신호가 있는 요청만 모아서 ---
+        classification_results = [None] * len(omics_requests)
+        cancer_rows = [row for row, predictions in enumerate(all_binary_predictions) if _cancer_predictions(predictions)]
+        if cancer_rows:
+            stage2_results = run_cancer_type_classification_batch(
+                [parsed_files_list[row] for row in cancer_rows], [request_ids[row] for row in cancer_rows], models
+            )
+            for row, stage2_result in zip(cancer_rows, stage2_results):
+                classification_results[row] = stage2_result
+
+        result_objs = [
+            OmicsResult(request=omics_request, **_build_result_fields(request_id, binary_predictions, classification_result, models))
+            for omics_request, request_id, binary_predictions, classification_result
+            in zip(omics_requests, request_ids, all_binary_predictions, classification_results)
+        ]
+
+        # --- DB 일괄 저장 (결과 upsert + 요청 상태 갱신) ---
+        upsert_target = {'unique_fields': ['request']} if connection.features.supports_update_conflicts_with_target else {}
+        with transaction.atomic():
+            OmicsResult.objects.bulk_create(
+                result_objs, update_conflicts=True, update_fields=RESULT_FIELDS + ['last_updated'], **upsert_target
+            )
+            OmicsRequest.objects.filter(id__in=request_ids).update(status='COMPLETED', error_message=None)
+        logger.info(f"Batch pipeline COMPLETED for {len(result_objs)} OmicsRequest(s).")
+
+    except Exception as e:
+        logger.critical(f"Critical error in batch pipeline ({len(omics_request_ids)} request(s)): {e}", exc_info=True)
+        OmicsRequest.objects.filter(id__in=omics_request_ids).update(
+            status='FAILED', error_message=f"일괄 분석 파이프라인 실행 중 심각한 오류 발생: {str(e)}"
+        )
+        return []
+
+    return request_ids
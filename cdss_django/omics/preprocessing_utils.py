@@ -1,8 +1,10 @@
 # omics/preprocessing_utils.py
 
+import os
+
 import pandas as pd
 import numpy as np
-import pyranges as pr
+from scipy import sparse
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,46 +15,199 @@ def load_feature_list(path):
         features = [line.strip() for line in f]
     return features
 
+class OmicsVector:
+    """
+    단일 환자 오믹스 값 (long-format 특성 이름/값 배열, wide-format DataFrame을 만들지 않음).
+    values가 None이면 특성의 존재 여부(변이 유무) 벡터입니다.
+    """
+    __slots__ = ('features', 'values')
+
+    def __init__(self, features=(), values=None):
+        self.features = np.asarray(features, dtype=object)
+        self.values = None if values is None else np.asarray(values, dtype=np.float64)
+
+    @property
+    def empty(self):
+        return len(self.features) == 0
+
+    def __len__(self):
+        return len(self.features)
+
+
+class FeatureIndex:
+    """
+    모델 특성 목록의 이름 -> 입력 열 위치 맵 (로드 시 한 번 생성).
+    OmicsVector를 모델 입력 행으로 바로 정렬하며, reindex(columns=features, fill_value=0)과 같은 결과를 냅니다.
+    """
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.positions = {name: position for position, name in enumerate(self.features)}
+        self.size = len(self.features)
+
+    def __len__(self):
+        return self.size
+
+    def lookup(self, names):
+        """특성 이름 배열 -> 열 위치 배열 (목록에 없는 특성은 -1)"""
+        get = self.positions.get
+        return np.fromiter((get(name, -1) for name in names), dtype=np.intp, count=len(names))
+
+    def dense(self, vector, dtype=np.float32):
+        """(특성 수,) 행. 중복 특성은 평균(NaN 제외), 없는 특성은 0"""
+        positions = self.lookup(vector.features)
+        values = np.ones(len(positions)) if vector.values is None else vector.values
+        keep = (positions >= 0) & ~np.isnan(values)
+        sums = np.bincount(positions[keep], weights=values[keep], minlength=self.size)
+        counts = np.bincount(positions[keep], minlength=self.size)
+        return np.divide(sums, counts, out=np.zeros(self.size), where=counts > 0).astype(dtype, copy=False)
+
+    def dense_rows(self, vectors, dtype=np.float32):
+        """환자별 벡터 목록 -> (환자 수, 특성 수) 행렬"""
+        matrix = np.zeros((len(vectors), self.size), dtype=dtype)
+        for row, vector in enumerate(vectors):
+            matrix[row] = self.dense(vector, dtype)
+        return matrix
+
+    def sparse_rows(self, vectors, dtype=np.float32):
+        """존재 여부 벡터(변이) 목록 -> (환자 수, 특성 수) CSR 행렬 (값은 1)"""
+        rows, columns = [], []
+        for row, vector in enumerate(vectors):
+            positions = np.unique(self.lookup(vector.features))
+            positions = positions[positions >= 0]
+            rows.append(np.full(len(positions), row, dtype=np.intp))
+            columns.append(positions)
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.intp)
+        columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.intp)
+        return sparse.csr_matrix(
+            (np.ones(len(rows), dtype=dtype), (rows, columns)), shape=(len(vectors), self.size)
+        )
+
 def preprocess_long_format(raw_df, feature_col, value_col):
-    """Long-format 데이터를 단일 환자의 wide-format으로 변환"""
+    """Long-format 데이터를 단일 환자의 OmicsVector로 변환 (중복 특성은 모델 입력 정렬 시 평균)"""
     if raw_df.empty or not all(c in raw_df.columns for c in [feature_col, value_col]):
         logger.warning(f"preprocess_long_format: 필수 컬럼({feature_col}, {value_col})이 없습니다.")
-        return pd.DataFrame()
+        return OmicsVector()
 
-    df_subset = raw_df[[feature_col, value_col]].copy()
-    df_subset['patient_id_temp'] = 'single_patient'
-    
-    processed_df = df_subset.pivot_table(
-        index='patient_id_temp', columns=feature_col, values=value_col, aggfunc='mean'
-    )
-    return processed_df
+    values = pd.to_numeric(raw_df[value_col], errors='coerce').to_numpy(dtype=np.float64)
+    return OmicsVector(raw_df[feature_col].astype(str).to_numpy(), values)
 
-def map_cnv_segments_to_genes(raw_segment_df, gtf_cached_df):
-    """Segment 레벨의 CNV 데이터를 Gene 레벨로 변환"""
-    if gtf_cached_df is None:
-        raise ValueError("GTF data is not cached or provided.")
-    
-    gr_genes = pr.PyRanges(gtf_cached_df)
-    
-    gr_segments = raw_segment_df[['Chromosome', 'Start', 'End', 'Segment_Mean']].copy()
-    gr_segments['Chromosome'] = 'chr' + gr_segments['Chromosome'].astype(str)
-    gr_segments = pr.PyRanges(gr_segments)
-    
-    overlapped = gr_genes.join(gr_segments)
-    if overlapped.df.empty:
-        logger.warning("CNV 세그먼트와 유전자 위치 정보가 겹치지 않습니다.")
-        return pd.DataFrame()
+class GeneIntervalIndex:
+    """
+    GENCODE 유전자 구간을 염색체별로 시작 위치 정렬해 둔 인덱스 (app_resources.load_gene_interval_index에서 한 번 생성/저장).
 
-    gene_level_cnv = overlapped.df.groupby('gene_name')['Segment_Mean'].mean()
-    
-    patient_cnv_df = gene_level_cnv.to_frame().T
-    patient_cnv_df.index = ['single_patient']
-    return patient_cnv_df
+    세그먼트마다 searchsorted로 겹칠 수 있는 유전자 범위(시작 < 세그먼트 끝, 시작 > 세그먼트 시작 - 최대 유전자 길이)를 찾고,
+    끝 위치로 실제 겹침만 남긴 뒤 bincount로 유전자별 Segment_Mean 평균을 계산합니다.
+    (PyRanges join + groupby('gene_name').mean()과 같은 결과, 구간은 [Start, End) 기준)
+    """
+
+    def __init__(self, chromosomes, bounds, starts, ends, gene_codes, gene_names, max_lengths):
+        self.chromosomes = np.asarray(chromosomes).astype(str)
+        self.bounds = np.asarray(bounds, dtype=np.int64)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.gene_codes = np.asarray(gene_codes, dtype=np.intp)
+        self.gene_names = np.asarray(gene_names).astype(str)
+        self.max_lengths = np.asarray(max_lengths, dtype=np.int64)
+        self._slices = {
+            chromosome: (int(self.bounds[i]), int(self.bounds[i + 1]), int(self.max_lengths[i]))
+            for i, chromosome in enumerate(self.chromosomes)
+        }
+
+    @classmethod
+    def from_gtf(cls, gtf_df):
+        """Chromosome/Start/End/gene_name 열을 가진 GTF DataFrame으로 인덱스 생성"""
+        frame = gtf_df[['Chromosome', 'Start', 'End', 'gene_name']].dropna()
+        chromosomes = frame['Chromosome'].astype(str).to_numpy()
+        starts = frame['Start'].to_numpy(dtype=np.int64)
+        ends = frame['End'].to_numpy(dtype=np.int64)
+        gene_names, gene_codes = np.unique(frame['gene_name'].astype(str).to_numpy(), return_inverse=True)
+
+        order = np.lexsort((starts, chromosomes))
+        chromosomes, starts, ends, gene_codes = chromosomes[order], starts[order], ends[order], gene_codes[order]
+        unique_chromosomes, first = np.unique(chromosomes, return_index=True)
+        bounds = np.append(first, len(chromosomes))
+        lengths = ends - starts
+        max_lengths = [int(lengths[lo:hi].max()) if hi > lo else 0 for lo, hi in zip(bounds[:-1], bounds[1:])]
+        return cls(unique_chromosomes, bounds, starts, ends, gene_codes, gene_names, max_lengths)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(
+                f, chromosomes=self.chromosomes, bounds=self.bounds, starts=self.starts, ends=self.ends,
+                gene_codes=self.gene_codes, gene_names=self.gene_names, max_lengths=self.max_lengths
+            )
+
+    def map_segments(self, chromosomes, starts, ends, values):
+        """세그먼트 배열 -> 겹치는 유전자별 평균 값 OmicsVector (NaN 값 세그먼트는 제외)"""
+        chromosomes = np.asarray(chromosomes).astype(str)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        n_genes = len(self.gene_names)
+        sums = np.zeros(n_genes, dtype=np.float64)
+        counts = np.zeros(n_genes, dtype=np.int64)
+
+        valid = ~np.isnan(values)
+        for chromosome in np.unique(chromosomes[valid]):
+            if chromosome not in self._slices:
+                continue
+            lo, hi, max_length = self._slices[chromosome]
+            mask = valid & (chromosomes == chromosome)
+            segment_starts, segment_ends, segment_values = starts[mask], ends[mask], values[mask]
+
+            gene_starts = self.starts[lo:hi]
+            first = np.searchsorted(gene_starts, segment_starts - max_length, side='right')
+            last = np.searchsorted(gene_starts, segment_ends, side='left')
+            candidates = np.maximum(last - first, 0)
+            total = int(candidates.sum())
+            if not total:
+                continue
+
+            # (세그먼트, 후보 유전자) 쌍을 반복문 없이 펼치기
+            segment_index = np.repeat(np.arange(len(candidates)), candidates)
+            offsets = np.arange(total) - np.repeat(np.cumsum(candidates) - candidates, candidates)
+            gene_positions = first[segment_index] + offsets
+            overlap = self.ends[lo:hi][gene_positions] > segment_starts[segment_index]
+
+            codes = self.gene_codes[lo:hi][gene_positions[overlap]]
+            sums += np.bincount(codes, weights=segment_values[segment_index[overlap]], minlength=n_genes)
+            counts += np.bincount(codes, minlength=n_genes)
+
+        present = counts > 0
+        return OmicsVector(self.gene_names[present], sums[present] / counts[present])
+
+
+def map_cnv_segments_to_genes(raw_segment_df, gene_index):
+    """Segment 레벨의 CNV 데이터를 Gene 레벨 OmicsVector로 변환 (gene_index: GeneIntervalIndex)"""
+    if gene_index is None:
+        raise ValueError("Gene interval index is not loaded or provided.")
+    required_columns = ['Chromosome', 'Start', 'End', 'Segment_Mean']
+    if raw_segment_df.empty or not all(c in raw_segment_df.columns for c in required_columns):
+        logger.warning(f"map_cnv_segments_to_genes: 필수 컬럼({', '.join(required_columns)})이 없습니다.")
+        return OmicsVector()
+
+    # '1'과 'chr1' 표기를 모두 GTF의 'chr1' 형식으로 맞춤
+    chromosomes = 'chr' + raw_segment_df['Chromosome'].astype(str).str.replace(r'^chr', '', regex=True)
+    gene_level_cnv = gene_index.map_segments(
+        chromosomes.to_numpy(),
+        pd.to_numeric(raw_segment_df['Start'], errors='coerce').fillna(0).to_numpy(),
+        pd.to_numeric(raw_segment_df['End'], errors='coerce').fillna(0).to_numpy(),
+        pd.to_numeric(raw_segment_df['Segment_Mean'], errors='coerce').to_numpy()
+    )
+    if gene_level_cnv.empty:
+        logger.warning("CNV 세그먼트와 유전자 위치 정보가 겹치지 않습니다.")
+    return gene_level_cnv
 
 def preprocess_mutation_file(raw_df):
-    """MAF 형식의 데이터를 받아 유전자별 변이 유무(0/1)로 변환"""
+    """MAF 형식의 데이터를 받아 의미 있는 변이가 있는 유전자의 존재 여부 벡터로 변환"""
     if raw_df.empty or 'Variant_Classification' not in raw_df.columns or 'Hugo_Symbol' not in raw_df.columns:
-        return pd.DataFrame()
+        return OmicsVector()
 
     meaningful_variants = [
         'Frame_Shift_Del', 'Frame_Shift_Ins', 'In_Frame_Del', 'In_Frame_Ins',
@@ -60,7 +215,140 @@ def preprocess_mutation_file(raw_df):
     ]
     
     filtered_df = raw_df[raw_df['Variant_Classification'].isin(meaningful_variants)]
-    if filtered_df.empty: return pd.DataFrame()
+    if filtered_df.empty: return OmicsVector()
     
-    processed_df = pd.crosstab(index=['single_patient'], columns=filtered_df['Hugo_Symbol'])
-    return (processed_df > 0).astype(int)
\ No newline at end of file
+    return OmicsVector(filtered_df['Hugo_Symbol'].dropna().astype(str).unique())
+
+def detect_delimiter(path, default='\t'):
+    """첫 데이터 줄(주석 제외)로 구분자 판별 - 탭이 있으면 TSV, 쉼표만 있으면 CSV"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            if '\t' in line:
+                return '\t'
+            return ',' if ',' in line else default
+    return default
+
+
+class ParsedOmicsFile:
+    """
+    업로드 파일 하나를 한 번 읽어 정규화한 결과.
+    binary는 1단계(암 vs 정상, PCA 입력), expert는 2단계(전문가 모델 입력)용 OmicsVector입니다.
+    """
+
+    def __init__(self, omics_type, name, binary=None, expert=None, error=None):
+        self.omics_type = omics_type
+        self.name = name
+        self.binary = binary if binary is not None else OmicsVector()
+        self.expert = expert if expert is not None else self.binary
+        self.error = error
+
+
+def _missing_column_error(raw_df, column):
+    return f"lacks '{column}'. Columns found: {raw_df.columns.tolist()}"
+
+
+class _StreamedFeatureValues:
+    """
+    청크로 읽은 (특성 이름, 값)을 FeatureIndex 크기로 미리 할당한 배열에 바로 누적합니다.
+    모델이 쓰지 않는 특성은 버리므로 메모리는 파일 크기가 아니라 모델 특성 수에 비례합니다.
+    중복 특성은 평균하며, NaN은 원본 값 합계에서는 제외하고 log2(값+1)/0 채움 합계에서는 0으로 셉니다.
+    """
+
+    def __init__(self, feature_index):
+        self.feature_index = feature_index
+        size = feature_index.size
+        self.sums = np.zeros(size)  # NaN 제외 값 합계
+        self.log_sums = np.zeros(size)  # log2(값+1) 합계 (NaN은 0)
+        self.counts = np.zeros(size, dtype=np.int64)  # NaN 제외 개수
+        self.rows = np.zeros(size, dtype=np.int64)  # NaN 포함 개수
+
+    def add(self, names, values):
+        positions = self.feature_index.lookup(names)
+        matched = positions >= 0
+        positions, values = positions[matched], values[matched]
+        np.add.at(self.rows, positions, 1)
+        valid = ~np.isnan(values)
+        np.add.at(self.sums, positions[valid], values[valid])
+        np.add.at(self.log_sums, positions[valid], np.log2(values[valid] + 1))
+        np.add.at(self.counts, positions[valid], 1)
+
+    def _vector(self, totals, counts):
+        present = counts > 0
+        names = np.asarray(self.feature_index.features, dtype=object)[present]
+        return OmicsVector(names, totals[present] / counts[present])
+
+    def mean(self):
+        """중복 특성 평균 (NaN 제외, 값이 모두 NaN인 특성은 제외 - 모델 입력에서는 어차피 0)"""
+        return self._vector(self.sums, self.counts)
+
+    def mean_nan_as_zero(self):
+        """NaN을 0으로 채운 뒤의 중복 특성 평균"""
+        return self._vector(self.sums, self.rows)
+
+    def log2_mean(self):
+        """log2(값+1)의 중복 특성 평균 (NaN은 0)"""
+        return self._vector(self.log_sums, self.rows)
+
+
+def _stream_long_format(path, feature_index, chunksize, feature_col, value_col, **read_kwargs):
+    """(특성, 값) 두 열만 chunksize 행씩 C 엔진으로 읽어 feature_index에 있는 특성만 누적"""
+    streamed = _StreamedFeatureValues(feature_index)
+    reader = pd.read_csv(
+        path, usecols=[feature_col, value_col], dtype={feature_col: str}, chunksize=chunksize, **read_kwargs
+    )
+    with reader:
+        for chunk in reader:
+            names = chunk[feature_col].to_numpy(dtype=object)
+            values = pd.to_numeric(chunk[value_col], errors='coerce').to_numpy(dtype=np.float64)
+            streamed.add(names, values)
+    return streamed
+
+
+def parse_omics_file(path, omics_type, gene_index=None, feature_index=None, chunksize=100_000):
+    """
+    오믹스 파일을 C 엔진(판별된 구분자)으로 한 번만 읽어 두 단계의 입력 벡터로 변환합니다.
+    RNA-seq/miRNA는 1단계에 원본 값, 2단계에 log2(값+1)을 사용하고, 나머지는 두 단계가 같은 값을 사용합니다.
+
+    feature_index(두 단계 모델이 쓰는 특성의 합집합)가 있으면 RNA-seq/miRNA/메틸화 파일은 chunksize 행씩
+    스트리밍하며 그 특성만 남기므로, 450K 메틸화 파일도 전체 DataFrame을 만들지 않습니다.
+    """
+    name = os.path.basename(path)
+    sep = detect_delimiter(path)
+
+    if omics_type == 'meth':
+        if feature_index is not None:
+            streamed = _stream_long_format(
+                path, feature_index, chunksize, 'feature', 'value', sep=sep, header=None, names=['feature', 'value']
+            )
+            return ParsedOmicsFile(omics_type, name, streamed.mean_nan_as_zero())
+        raw_df = pd.read_csv(path, sep=sep, header=None, names=['feature', 'value'])
+        values = pd.to_numeric(raw_df['value'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        return ParsedOmicsFile(omics_type, name, OmicsVector(raw_df['feature'].astype(str).to_numpy(), values))
+
+    if omics_type in ('gene', 'mirna'):
+        feature_col, value_col = ('gene_name', 'tpm_unstranded') if omics_type == 'gene' else ('miRNA_ID', 'reads_per_million_miRNA_mapped')
+        read_kwargs = {'sep': sep, 'comment': '#', 'on_bad_lines': 'skip'}
+        raw_df = pd.read_csv(path, nrows=0 if feature_index is not None else None, **read_kwargs)
+        missing = [column for column in (value_col, feature_col) if column not in raw_df.columns]
+        if missing:
+            return ParsedOmicsFile(omics_type, name, error=_missing_column_error(raw_df, missing[0]))
+        if feature_index is not None:
+            streamed = _stream_long_format(path, feature_index, chunksize, feature_col, value_col, **read_kwargs)
+            return ParsedOmicsFile(omics_type, name, streamed.mean(), streamed.log2_mean())
+        binary = preprocess_long_format(raw_df, feature_col, value_col)
+        expert = OmicsVector(binary.features, np.log2(np.nan_to_num(binary.values, nan=0.0) + 1))
+        return ParsedOmicsFile(omics_type, name, binary, expert)
+
+    raw_df = pd.read_csv(path, sep=sep, comment='#', on_bad_lines='skip')
+
+    if omics_type == 'cnv':
+        if gene_index is None:
+            return ParsedOmicsFile(omics_type, name)
+        return ParsedOmicsFile(omics_type, name, map_cnv_segments_to_genes(raw_df, gene_index))
+
+    if omics_type == 'mutation':
+        return ParsedOmicsFile(omics_type, name, preprocess_mutation_file(raw_df))
+
+    return ParsedOmicsFile(omics_type, name, error=f"unsupported omics type '{omics_type}'")
@@ -33,6 +33,7 @@ class OmicsResultSerializer(serializers.ModelSerializer):
             'biomarkers',
             'stage1_signal_graph', # 1차 분석 그래프 필드
             'shap_graph',          # 2차 분석 그래프 필드
+            'graph_data',          # 그래프 수치 데이터 (이미지가 아직 렌더링되지 않았어도 제공)
             'last_updated',
             'predicted_cancer_type_name',
         ]
@@ -2,10 +2,12 @@
 
 import logging
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
 from .models import OmicsRequest
 # [수정] prediction_service에서 필요한 모든 함수를 가져옵니다.
-from .prediction_service import run_sequential_diagnosis_pipeline, load_all_prediction_models
-from .app_resources import META_MODEL # 모델 로드 여부를 확인하기 위해 import
+from .prediction_service import run_sequential_diagnosis_pipeline, run_batch_diagnosis_pipeline, model_registry, \
+    render_result_graphs
 
 logger = logging.getLogger(__name__)
 
@@ -20,19 +22,18 @@ def run_analysis_pipeline(self, omics_request_id):
     try:
         # --- [핵심] ---
         # 작업을 시작하기 전, 모델이 메모리에 로드되었는지 확인하고,
-        # 로드되지 않았다면 즉시 로드합니다.
-        if META_MODEL is None:
-            logger.warning(f"[{omics_request_id}] Models not found in Celery worker memory. Forcing reload...")
-            load_all_prediction_models()
-            logger.info(f"[{omics_request_id}] Model loading complete for worker. Resuming pipeline.")
-        else:
-            logger.info(f"[{omics_request_id}] Models already loaded in worker memory. Proceeding.")
+        # 로드되지 않았다면 즉시 로드합니다. (보통은 워커 부모 프로세스가 fork 전에 미리 로드)
+        if model_registry.current is None:
+            logger.warning(f"[{omics_request_id}] Models not found in Celery worker memory. Loading...")
+        model_set = model_registry.get()
         # --- [수정 끝] ---
 
         # === 실제 모든 분석 로직이 담긴 함수를 호출합니다. ===
         # DB 업데이트를 포함한 모든 처리는 이 함수가 책임집니다.
-        run_sequential_diagnosis_pipeline(omics_request_id, save_to_db=True)
+        completed = run_sequential_diagnosis_pipeline(omics_request_id, save_to_db=True, models=model_set)
         # ====================================================
+        if completed:
+            queue_graph_rendering([omics_request_id])
 
         logger.info(f"Celery task for omics_request_id {omics_request_id} has successfully completed its pipeline via prediction_service.")
 
@@ -46,4 +47,74 @@ def run_analysis_pipeline(self, omics_request_id):
             failed_request.error_message = f"파이프라인 실행 중 심각한 오류 발생: {str(e)}"
             failed_request.save(update_fields=['status', 'error_message'])
         except OmicsRequest.DoesNotExist:
-            pass
\ No newline at end of file
+            pass
+
+
+def claim_queued_requests(limit):
+    """
+    분석 대기(QUEUED) 요청을 오래된 순으로 최대 limit개 선점해 PROCESSING으로 바꾸고 ID 목록을 반환합니다.
+    상태 조건부 UPDATE로 선점하므로 여러 워커가 동시에 실행해도 같은 요청을 두 번 처리하지 않습니다.
+    """
+    with transaction.atomic():
+        candidate_ids = list(
+            OmicsRequest.objects.select_for_update(skip_locked=True)
+            .filter(status=OmicsRequest.StatusChoices.QUEUED)
+            .order_by('request_timestamp')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not candidate_ids:
+            return []
+        OmicsRequest.objects.filter(id__in=candidate_ids, status=OmicsRequest.StatusChoices.QUEUED) \
+            .update(status=OmicsRequest.StatusChoices.PROCESSING)
+        return list(
+            OmicsRequest.objects.filter(id__in=candidate_ids, status=OmicsRequest.StatusChoices.PROCESSING)
+            .values_list('id', flat=True)
+        )
+
+
+@shared_task(bind=True)
+def run_batch_analysis_pipeline(self, batch_size=None):
+    """
+    대기 중인 OmicsRequest를 OMICS_BATCH_SIZE개씩 선점해 일괄 분석하는 Celery Task.
+    큐가 빌 때까지 반복하며, 처리한 요청 수를 반환합니다. (먼저 실행된 Task가 모두 처리했으면 바로 종료)
+    """
+    batch_size = batch_size or getattr(settings, 'OMICS_BATCH_SIZE', 64)
+    if model_registry.current is None:
+        logger.warning("Models not found in Celery worker memory. Loading...")
+        model_registry.get()
+
+    processed = 0
+    while True:
+        omics_request_ids = claim_queued_requests(batch_size)
+        if not omics_request_ids:
+            break
+        logger.info(f"Celery task '{self.request.id}' claimed {len(omics_request_ids)} queued omics request(s).")
+        completed_ids = run_batch_diagnosis_pipeline(omics_request_ids)
+        if completed_ids:
+            queue_graph_rendering(completed_ids)
+        processed += len(completed_ids)
+    return processed
+
+
+def queue_graph_rendering(omics_request_ids):
+    """분석 완료 후 그래프 이미지 렌더링 Task를 보냄 (OMICS_GRAPH_TASK_QUEUE가 있으면 저우선 전용 큐로)"""
+    options = {}
+    queue = getattr(settings, 'OMICS_GRAPH_TASK_QUEUE', None)
+    if queue:
+        options['queue'] = queue
+    try:
+        render_omics_result_graphs.apply_async(args=[[str(request_id) for request_id in omics_request_ids]], **options)
+    except Exception as e:
+        # 그래프는 부가 정보이므로 브로커 오류가 분석 결과에 영향을 주지 않도록 함
+        logger.error(f"Failed to queue graph rendering for {len(omics_request_ids)} omics request(s): {e}", exc_info=True)
+
+
+@shared_task(bind=True, ignore_result=True)
+def render_omics_result_graphs(self, omics_request_ids):
+    """완료된 분석 결과의 그래프 이미지를 렌더링하는 Celery Task (분석 완료 상태와 무관하게 뒤에서 실행)"""
+    # 그래프는 저장된 graph_data만으로 그리므로 모델을 로드하지 않음
+    for omics_request_id in omics_request_ids:
+        try:
+            render_result_graphs(omics_request_id)
+        except Exception as e:
+            logger.error(f"Graph rendering failed for omics_request_id {omics_request_id}: {e}", exc_info=True)
\ No newline at end of file
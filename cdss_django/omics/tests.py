@@ -1,3 +1,416 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from patients.models import PatientProfile
+from . import app_resources
+from . import preprocessing_utils as pp_utils
+from .fold_ensemble import FoldEnsemble
+from .model_registry import OmicsModelRegistry, OmicsModelSet
+from .models import OmicsRequest
+from .tasks import claim_queued_requests
+
+User = get_user_model()
+
+
+class _ConstantFoldModel:
+    """입력 행마다 고정 확률을 반환하는 폴드 모델"""
+
+    def __init__(self, proba, n_features=3):
+        self.proba = np.asarray(proba, dtype=np.float64)
+        self.n_features_in_ = n_features
+        self.seen_dtypes = []
+
+    def predict_proba(self, X):
+        self.seen_dtypes.append(X.dtype)
+        return np.tile(self.proba, (len(X), 1))
+
+
+class _BinaryBooster:
+    def predict(self, X):
+        return np.full(len(X), 0.8)
+
+
+class _BinaryLGBMLike:
+    n_classes_ = 2
+    n_features_in_ = 3
+    booster_ = _BinaryBooster()
+
+
+class FoldEnsembleTestCase(TestCase):
+
+    def test_averages_folds_for_stacked_samples(self):
+        folds = [_ConstantFoldModel([0.2, 0.8]), _ConstantFoldModel([0.6, 0.4])]
+        ensemble = FoldEnsemble(folds, parallel_min_rows=2)
+
+        proba = ensemble.predict_proba(np.zeros((4, 3)))
+
+        self.assertEqual(proba.shape, (4, 2))
+        np.testing.assert_allclose(proba, np.tile([0.4, 0.6], (4, 1)))
+        self.assertTrue(all(dtype == np.float32 for fold in folds for dtype in fold.seen_dtypes))
+
+    def test_single_row_and_fold_count(self):
+        ensemble = FoldEnsemble([_ConstantFoldModel([0.5, 0.5])] * 5)
+
+        self.assertEqual(len(ensemble), 5)
+        self.assertEqual(ensemble.predict_proba(np.zeros(3)).shape, (1, 2))
+        self.assertEqual(ensemble.predict_fold_proba(np.zeros((2, 3))).shape, (5, 2, 2))
+
+    def test_binary_booster_output_expanded_to_two_columns(self):
+        proba = FoldEnsemble([_BinaryLGBMLike()]).predict_proba(np.zeros((2, 3)))
+        np.testing.assert_allclose(proba, [[0.2, 0.8], [0.2, 0.8]])
+
+    def test_rejects_feature_count_mismatch(self):
+        with self.assertRaises(ValueError):
+            FoldEnsemble([_ConstantFoldModel([0.5, 0.5])]).predict_proba(np.zeros((1, 4)))
+
+
+class FeatureIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.index = pp_utils.FeatureIndex(['TP53', 'BRCA1', 'EGFR', 'KRAS'])
+
+    def test_dense_matches_pivot_and_reindex(self):
+        raw_df = pd.DataFrame({
+            'gene_name': ['EGFR', 'TP53', 'TP53', 'NOT_IN_MODEL', 'BRCA1'],
+            'value': [1.5, 2.0, 4.0, 7.0, np.nan],
+        })
+        expected = raw_df.assign(patient='p').pivot_table(index='patient', columns='gene_name', values='value', aggfunc='mean') \
+            .reindex(columns=self.index.features, fill_value=0).fillna(0).to_numpy()
+
+        matrix = self.index.dense_rows([pp_utils.preprocess_long_format(raw_df, 'gene_name', 'value')])
+
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_allclose(matrix, expected)
+
+    def test_sparse_presence_rows(self):
+        vectors = [pp_utils.OmicsVector(['KRAS', 'TP53', 'TP53', 'UNKNOWN']), pp_utils.OmicsVector()]
+
+        matrix = self.index.sparse_rows(vectors)
+
+        self.assertEqual(matrix.shape, (2, 4))
+        np.testing.assert_array_equal(matrix.toarray(), [[1, 0, 0, 1], [0, 0, 0, 0]])
+
+
+class ParseOmicsFileTestCase(TestCase):
+
+    def _write(self, content, suffix):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_gene_file_parsed_once_for_both_stages(self):
+        for sep, suffix in (('\t', '.tsv'), (',', '.csv')):
+            path = self._write(
+                "# gene-model: GENCODE v36\n"
+                + sep.join(['gene_id', 'gene_name', 'tpm_unstranded']) + "\n"
+                + sep.join(['ENSG1', 'TP53', '3']) + "\n"
+                + sep.join(['ENSG2', 'TP53', '7']) + "\n"
+                + sep.join(['ENSG3', 'EGFR', '0']) + "\n",
+                suffix
+            )
+            self.assertEqual(pp_utils.detect_delimiter(path), sep)
+
+            parsed = pp_utils.parse_omics_file(path, 'gene')
+
+            self.assertIsNone(parsed.error)
+            index = pp_utils.FeatureIndex(['EGFR', 'TP53'])
+            np.testing.assert_allclose(index.dense(parsed.binary), [0.0, 5.0])
+            np.testing.assert_allclose(index.dense(parsed.expert), [0.0, (2.0 + 3.0) / 2])
+
+    def test_streamed_parse_matches_full_read(self):
+        index = pp_utils.FeatureIndex(['EGFR', 'TP53', 'KRAS'])
+        gene_path = self._write(
+            "gene_id\tgene_name\ttpm_unstranded\n"
+            "ENSG1\tTP53\t3\nENSG2\tNOT_IN_MODEL\t9\nENSG3\tTP53\tNA\nENSG4\tTP53\t7\nENSG5\tEGFR\t1\n",
+            '.tsv'
+        )
+        meth_path = self._write("cg01\t0.5\ncg02\tNA\nKRAS\t0.25\nKRAS\t0.75\nTP53\tNA\n", '.txt')
+
+        for path, omics_type in ((gene_path, 'gene'), (meth_path, 'meth')):
+            full = pp_utils.parse_omics_file(path, omics_type)
+            streamed = pp_utils.parse_omics_file(path, omics_type, feature_index=index, chunksize=2)
+
+            self.assertLessEqual(len(streamed.binary), len(index))
+            for stage in ('binary', 'expert'):
+                np.testing.assert_allclose(
+                    index.dense(getattr(streamed, stage)), index.dense(getattr(full, stage)), rtol=1e-6
+                )
+
+    def test_missing_value_column_reported(self):
+        path = self._write("gene_name\tcount\nTP53\t1\n", '.tsv')
+
+        parsed = pp_utils.parse_omics_file(path, 'gene')
+
+        self.assertIn('tpm_unstranded', parsed.error)
+        self.assertTrue(parsed.binary.empty and parsed.expert.empty)
+
+
+class GeneIntervalIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.gtf_df = pd.DataFrame({
+            'Chromosome': ['chr1', 'chr1', 'chr1', 'chr2', 'chrX', 'chrY'],
+            'Start': [100, 150, 5000, 100, 10, 10],
+            'End': [3000, 200, 6000, 400, 50, 50],
+            'gene_name': ['LONG', 'SHORT', 'FAR', 'CHR2', 'PAR', 'PAR'],
+        })
+        self.index = pp_utils.GeneIntervalIndex.from_gtf(self.gtf_df)
+
+    def _brute_force(self, segments):
+        pairs = []
+        for _, gene in self.gtf_df.iterrows():
+            for _, segment in segments.iterrows():
+                chromosome = 'chr' + str(segment['Chromosome']).replace('chr', '')
+                if gene['Chromosome'] == chromosome and gene['Start'] < segment['End'] and segment['Start'] < gene['End']:
+                    pairs.append((gene['gene_name'], segment['Segment_Mean']))
+        return pd.DataFrame(pairs, columns=['gene_name', 'value']).groupby('gene_name')['value'].mean().to_dict()
+
+    def _as_dict(self, vector):
+        return dict(zip(vector.features, vector.values))
+
+    def test_matches_interval_join_mean(self):
+        segments = pd.DataFrame({
+            'Chromosome': ['1', '1', 'chr1', '2', 'X', 'Y', '3'],
+            'Start': [0, 2500, 5999, 400, 0, 40, 0],
+            'End': [160, 5001, 7000, 500, 20, 60, 100],
+            'Segment_Mean': [0.5, -1.0, 2.0, 9.0, 1.0, 3.0, 4.0],
+        })
+
+        vector = pp_utils.map_cnv_segments_to_genes(segments, self.index)
+
+        expected = self._brute_force(segments)
+        self.assertEqual(set(self._as_dict(vector)), set(expected))
+        for gene_name, value in self._as_dict(vector).items():
+            self.assertAlmostEqual(value, expected[gene_name])
+
+    def test_save_and_load_round_trip(self):
+        handle, path = tempfile.mkstemp(suffix='.npz')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        self.index.save(path)
+
+        loaded = pp_utils.GeneIntervalIndex.load(path)
+        segments = (['chr1'], [120], [180], [1.5])
+
+        self.assertEqual(self._as_dict(loaded.map_segments(*segments)), self._as_dict(self.index.map_segments(*segments)))
+
+    def test_rebuilt_index_is_saved_without_leaving_temp_files(self):
+        import joblib
+
+        resource_dir = tempfile.mkdtemp()
+        gtf_path = os.path.join(resource_dir, 'gencode_v22_processed.pkl')
+        index_path = os.path.join(resource_dir, 'gencode_v22_gene_index.npz')
+        joblib.dump(self.gtf_df, gtf_path)
+        self.addCleanup(shutil.rmtree, resource_dir, ignore_errors=True)
+
+        with patch.object(app_resources, 'GTF_CACHE_PATH', gtf_path), \
+                patch.object(app_resources, 'GENE_INDEX_PATH', index_path):
+            built = app_resources.load_gene_interval_index()
+
+        self.assertEqual(sorted(os.listdir(resource_dir)), ['gencode_v22_gene_index.npz', 'gencode_v22_processed.pkl'])
+        segments = (['chr1'], [120], [180], [1.5])
+        loaded = pp_utils.GeneIntervalIndex.load(index_path)
+        self.assertEqual(self._as_dict(loaded.map_segments(*segments)), self._as_dict(built.map_segments(*segments)))
+
+
+class OmicsModelRegistryTestCase(TestCase):
+
+    def setUp(self):
+        handle, self.model_path = tempfile.mkstemp(suffix='.pkl')
+        with os.fdopen(handle, 'w') as f:
+            f.write('v1')
+        self.addCleanup(os.remove, self.model_path)
+        self.fail_build = False
+        self.fold_path = self.model_path + '.fold'
+        with open(self.fold_path, 'w') as f:
+            f.write('fold')
+        self.addCleanup(lambda: os.path.exists(self.fold_path) and os.remove(self.fold_path))
+        self.built = []
+
+        def builder(version):
+            if self.fail_build:
+                raise FileNotFoundError('meta model missing')
+            model_set = OmicsModelSet(version)
+            with model_set.track('meta/model', self.model_path):
+                with open(self.model_path) as f:
+                    model_set.meta_model = f.read()
+            # 빌더처럼 개별 모델 실패는 기록만 하고 계속 진행
+            try:
+                with model_set.track('expert/gene/fold_1', self.fold_path):
+                    with open(self.fold_path) as f:
+                        model_set.omics_models['gene'] = f.read()
+            except OSError:
+                model_set.omics_models['gene'] = []
+            self.built.append(version)
+            return model_set
+
+        self.registry = OmicsModelRegistry(builder)
+
+    def test_loads_once_and_reload_swaps_without_touching_held_set(self):
+        first = self.registry.get()
+        self.assertIs(self.registry.get(), first)
+
+        with open(self.model_path, 'w') as f:
+            f.write('v2-model')
+        self.assertTrue(first.is_stale())
+        second = self.registry.reload()
+
+        self.assertEqual(self.built, [1, 2])
+        self.assertEqual((first.version, first.meta_model), (1, 'v1'))
+        self.assertEqual((second.version, second.meta_model), (2, 'v2-model'))
+        self.assertIs(self.registry.get(), second)
+
+    def test_partial_reload_keeps_current_set_until_file_fixed(self):
+        first = self.registry.get()
+
+        os.remove(self.fold_path)  # 복사 중이라 아직 없는 모델 파일
+        self.assertTrue(first.is_stale())
+        with self.assertRaises(RuntimeError):
+            self.registry.reload()
+        self.assertIs(self.registry.current, first)
+
+        with open(self.fold_path, 'w') as f:
+            f.write('fold-v2')
+        second = self.registry.reload()
+        self.assertEqual(second.omics_models['gene'], 'fold-v2')
+
+    def test_failed_initial_resource_is_tracked(self):
+        os.remove(self.fold_path)
+        first = self.registry.get()
+
+        self.assertEqual(first.omics_models['gene'], [])
+        self.assertIn('expert/gene/fold_1', first.failures)
+        with open(self.fold_path, 'w') as f:
+            f.write('fold')
+        self.assertTrue(first.is_stale())
+
+    def test_source_file_change_marks_set_stale(self):
+        first = self.registry.get()
+        first.record_source('gene_interval_index/gtf', self.fold_path)
+        self.assertFalse(first.is_stale())
+
+        with open(self.fold_path, 'w') as f:
+            f.write('new gtf cache')
+        self.assertTrue(first.is_stale())
+
+    def test_failed_reload_keeps_current_set(self):
+        first = self.registry.get()
+        self.fail_build = True
+
+        with self.assertRaises(FileNotFoundError):
+            self.registry.reload()
+
+        self.assertIs(self.registry.current, first)
+        status = self.registry.status()
+        self.assertEqual(status['version'], 1)
+        self.assertIn('meta model missing', status['last_error'])
+        self.assertEqual(status['models']['meta/model']['file_bytes'], 2)
+
+
+class _LabelEncoder:
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def inverse_transform(self, indices):
+        return self.classes_[indices]
+
+
+class _NaNRejectingMetaModel:
+    """sklearn 모델처럼 결측값 입력을 거부하는 메타 모델 (행별 입력 합으로 확률 결정)"""
+
+    def predict_proba(self, X):
+        values = np.asarray(X, dtype=np.float64)
+        if np.isnan(values).any():
+            raise ValueError("Input contains NaN.")
+        first = values[:, :2].sum(axis=1)
+        return np.column_stack([first, 2.0 - first]) / 2.0
+
+
+class StageTwoBatchTestCase(TestCase):
+
+    def setUp(self):
+        self.models = OmicsModelSet(1)
+        for omics_type, proba in (('gene', [0.7, 0.3]), ('mirna', [0.4, 0.6])):
+            self.models.omics_models[omics_type] = FoldEnsemble([_ConstantFoldModel(proba, n_features=2)])
+            self.models.feature_lists[omics_type] = ['A', 'B']
+            self.models.feature_indexes[omics_type] = pp_utils.FeatureIndex(['A', 'B'])
+            self.models.label_encoders[omics_type] = _LabelEncoder(['LIHC', 'LUSC'])
+        self.models.meta_feature_names = ['pred_gene_LIHC', 'pred_mirna_LIHC', 'pred_gene_LUSC', 'pred_mirna_LUSC']
+        self.models.meta_model = _NaNRejectingMetaModel()
+        self.models.meta_label_encoder = _LabelEncoder(['LIHC', 'LUSC'])
+
+    def _parsed(self, omics_type):
+        return [pp_utils.ParsedOmicsFile(omics_type, f'{omics_type}.tsv', pp_utils.OmicsVector(['A'], [1.0]))]
+
+    def test_batch_matches_single_requests_with_different_omics(self):
+        from .prediction_service import run_cancer_type_classification_batch
+
+        parsed_files_list = [self._parsed('gene'), self._parsed('mirna')]
+        batch = run_cancer_type_classification_batch(parsed_files_list, ['r1', 'r2'], self.models)
+        single = [
+            run_cancer_type_classification_batch([parsed_files], [request_id], self.models)[0]
+            for parsed_files, request_id in zip(parsed_files_list, ['r1', 'r2'])
+        ]
+
+        self.assertEqual(batch, single)
+        self.assertNotEqual(batch[0]['predicted_cancer_type'], 'Prediction Failed')
+
+
+class ClaimQueuedRequestsTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='omicsbatch', password='testpass123')
+        self.patient = PatientProfile.objects.create(openemr_id='OMICS001', first_name='Batch', last_name='Patient')
+
+    def _request(self, status):
+        return OmicsRequest.objects.create(patient=self.patient, requester=self.user, status=status)
+
+    def test_claims_only_queued_requests_once(self):
+        queued = [self._request(OmicsRequest.StatusChoices.QUEUED) for _ in range(3)]
+        self._request(OmicsRequest.StatusChoices.CREATED)
+
+        first = claim_queued_requests(2)
+        second = claim_queued_requests(10)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(set(first) | set(second), {request.id for request in queued})
+        self.assertEqual(claim_queued_requests(10), [])
+        self.assertEqual(
+            OmicsRequest.objects.filter(status=OmicsRequest.StatusChoices.PROCESSING).count(), 3
+        )
+
+
+class GraphDataTestCase(TestCase):
+
+    def test_stage1_signal_sorted_by_probability(self):
+        from .prediction_service import _stage1_signal_data
+
+        signal = _stage1_signal_data({
+            'liver_cancer': {'label': 'Cancer', 'prob': 0.9},
+            'lung_cancer': {'label': 'Normal', 'prob': 0.95},
+            'kidney_cancer': 'not a prediction',
+        })
+
+        self.assertEqual([item['cancer_type'] for item in signal], ['lung_cancer', 'liver_cancer'])
+
+    def test_stage2_importance_computed_once_per_model_version(self):
+        from .prediction_service import _stage2_importance_data
+
+        class MetaModel:
+            feature_importances_ = np.array([0.1, 0.5, 0.2])
+
+        first = _stage2_importance_data(MetaModel(), ['a', 'b', 'c'], 'test-v1', top_n=2)
+        MetaModel.feature_importances_ = np.array([0.9, 0.0, 0.0])
+
+        self.assertEqual(first['features'], ['b', 'c'])
+        self.assertIs(_stage2_importance_data(MetaModel(), ['a', 'b', 'c'], 'test-v1', top_n=2), first)
+        self.assertEqual(_stage2_importance_data(MetaModel(), ['a', 'b', 'c'], 'test-v2', top_n=2)['features'][0], 'a')
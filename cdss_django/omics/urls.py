@@ -6,6 +6,7 @@ from .views import (
     OmicsRequestViewSet,
     OmicsDataFileViewSet,
     OmicsModelRequirementsView,
+    OmicsModelRegistryStatusView,
     StartTumorSegmentationView,
     ClassifyCancerTypeView,
     PatientOmicsRequestListView,
@@ -34,6 +35,10 @@ urlpatterns = [
               OmicsModelRequirementsView.as_view(),
               name='omics-model-requirements'),
 
+    path('models/status/',
+              OmicsModelRegistryStatusView.as_view(),
+              name='omics-model-registry-status'),
+
     path('segmentation/start/',
               StartTumorSegmentationView.as_view(),
               name='start-tumor-segmentation'),
@@ -23,7 +23,8 @@ from .serializers import (
     OmicsRequestListSerializer,
     OmicsResultSerializer
 )
-from .tasks import run_analysis_pipeline
+from .tasks import run_analysis_pipeline, run_batch_analysis_pipeline
+from .prediction_service import model_registry
 
 from omics.models import OmicsRequest
 from omics.serializers import OmicsRequestListSerializer
@@ -109,9 +110,14 @@ class OmicsRequestViewSet(viewsets.ModelViewSet):
         if not omics_request.data_files.exists():
             return Response({'error': 'Files must be uploaded before starting analysis.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        run_analysis_pipeline.delay(str(omics_request.id))
+        # 작업이 먼저 끝나 상태를 덮어쓰지 않도록 QUEUED 저장 후 작업을 보냄
         omics_request.status = 'QUEUED'
         omics_request.save(update_fields=['status'])
+        if getattr(settings, 'OMICS_BATCH_SCORING', False):
+            # 일괄 분석: 잠시 모인 대기 요청들을 한 Task가 선점해 행렬 단위로 처리
+            run_batch_analysis_pipeline.apply_async(countdown=getattr(settings, 'OMICS_BATCH_WINDOW_SECONDS', 5))
+        else:
+            run_analysis_pipeline.delay(str(omics_request.id))
         return Response({'status': 'Analysis task has been successfully queued.'}, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=True, methods=['get'], url_path='formatted-result')
@@ -133,7 +139,8 @@ class OmicsRequestViewSet(viewsets.ModelViewSet):
                 'predicted_cancer_type': result.predicted_cancer_type_name,
                 'probabilities': result.all_cancer_type_probabilities,
                 'completed_at': result.last_updated,
-                'biomarkers': result.biomarkers or []
+                'biomarkers': result.biomarkers or [],
+                'graph_data': result.graph_data or {}
             }
             logger.info(f"Successfully formatted result for OmicsRequest ID: {pk}")
             return Response(formatted_data, status=status.HTTP_200_OK)
@@ -172,6 +179,14 @@ class OmicsModelRequirementsView(APIView):
         return Response(response_data)
 
 
+class OmicsModelRegistryStatusView(APIView):
+    """이 프로세스에 로드된 오믹스 모델 세트의 버전/로드 상태와 모델별 로드 시간/메모리 사용량 조회"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, format=None):
+        return Response(model_registry.status())
+
+
 # ===================================================================
 # 다중 AI 영상 분석을 위한 라우터(Router) API View
 # ===================================================================